@@ -1,4 +1,3 @@
-import asyncio
 import os
 
 from incident_response_slackbot.config import load_config, get_config
@@ -8,13 +7,13 @@ from incident_response_slackbot.handlers import (
     InboundIncidentEndChatHandler,
     InboundIncidentStartChatHandler,
 )
-from openai_slackbot.bot import start_bot
+from openai_slackbot.bot import run_bot
 
 if __name__ == "__main__":
     current_dir = os.path.dirname(os.path.abspath(__file__))
     load_config(os.path.join(current_dir, "config.toml"))
 
-    message_handler = InboundDirectMessageHandler
+    message_handlers = [InboundDirectMessageHandler]
     action_handlers = [
         InboundIncidentStartChatHandler,
         InboundIncidentDoNothingHandler,
@@ -24,11 +23,20 @@ if __name__ == "__main__":
     template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 
     config = get_config()
-    asyncio.run(
-        start_bot(
-            openai_organization_id=config.openai_organization_id,
-            slack_message_handler=message_handler,
-            slack_action_handlers=action_handlers,
-            slack_template_path=template_path,
-        )
+    run_bot(
+        openai_organization_id=config.openai_organization_id,
+        slack_message_handlers=message_handlers,
+        slack_action_handlers=action_handlers,
+        slack_template_path=template_path,
+        llm_config=config.llm,
+        http_config=config.http,
+        user_directory_config=config.users,
+        executor_config=config.executor,
+        dedup_config=config.dedup,
+        metrics_config=config.metrics,
+        tracing_config=config.tracing,
+        events_config=config.events,
+        shutdown_config=config.shutdown,
+        job_queue_config=config.job_queue,
+        outbox_config=config.outbox,
     )
@@ -3,10 +3,31 @@ import typing as t
 
 import toml
 from dotenv import load_dotenv
+from openai_slackbot.clients.http import HTTPConfig
+from openai_slackbot.clients.llm import LLMConfig
+from openai_slackbot.clients.outbox import OutboxConfig
+from openai_slackbot.clients.users import UserDirectoryConfig
+from openai_slackbot.handlers import ExecutorConfig
+from openai_slackbot.jobs import JobQueueConfig
+from openai_slackbot.llm.routing import ModelRoute, with_default_routes
+from openai_slackbot.metrics import MetricsConfig
+from openai_slackbot.server import EventsConfig
+from openai_slackbot.shutdown import ShutdownConfig
+from openai_slackbot.tracing import TracingConfig
+from openai_slackbot.utils.dedup import DedupConfig
 from pydantic import BaseModel
+from pydantic.functional_validators import AfterValidator
 
 _CONFIG = None
 
+# Models used for each LLM task, unless overridden in the config.
+DEFAULT_MODEL_ROUTES: t.Dict[str, ModelRoute] = {
+    "greeting": ModelRoute(model="gpt-4-32k", temperature=0.3),
+    "awareness": ModelRoute(model="gpt-4-32k", temperature=0),
+    "summary": ModelRoute(model="gpt-4-32k", temperature=0.3),
+    "nudge": ModelRoute(model="gpt-4-32k", temperature=0.5),
+}
+
 
 class Config(BaseModel):
     # OpenAI organization ID associated with OpenAI API key.
@@ -15,6 +36,45 @@ class Config(BaseModel):
     # Slack channel where triage alerts are posted.
     feed_channel_id: str
 
+    # Model, max tokens and temperature to use for each LLM task.
+    model_routes: t.Annotated[
+        t.Dict[str, ModelRoute], AfterValidator(with_default_routes(DEFAULT_MODEL_ROUTES))
+    ] = DEFAULT_MODEL_ROUTES
+
+    # LLM gateway settings, e.g. per-model concurrency and token budgets.
+    llm: LLMConfig = LLMConfig()
+
+    # Connection pool settings for Slack API requests.
+    http: HTTPConfig = HTTPConfig()
+
+    # Cache settings for Slack user profile lookups.
+    users: UserDirectoryConfig = UserDirectoryConfig()
+
+    # Background execution of event handlers. If not set, handlers run inline.
+    executor: t.Optional[ExecutorConfig] = ExecutorConfig()
+
+    # Dropping of events that Slack delivers more than once. If not set, every event is handled.
+    dedup: t.Optional[DedupConfig] = DedupConfig()
+
+    # Local HTTP endpoint serving metrics in the Prometheus text format.
+    metrics: MetricsConfig = MetricsConfig()
+
+    # Per-event traces of handler, Slack and LLM call timings.
+    tracing: TracingConfig = TracingConfig()
+
+    # How events are received from Slack: over Socket Mode, or over HTTP by one or more workers.
+    events: EventsConfig = EventsConfig()
+
+    # Waiting for the events being handled when the bot stops, and journaling the rest.
+    shutdown: ShutdownConfig = ShutdownConfig()
+
+    # Durable queue of handler events, retried when handling fails. If not set,
+    # events are handled once, on the executor.
+    job_queue: t.Optional[JobQueueConfig] = None
+
+    # Background delivery of the Slack writes that handlers record in the outbox.
+    outbox: OutboxConfig = OutboxConfig()
+
 
 def load_config(config_path: str = None) -> Config:
     load_dotenv()
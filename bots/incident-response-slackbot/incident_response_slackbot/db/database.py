@@ -31,9 +31,13 @@ class Database:
     def _save(self):
         """
         Save the current state of the database to the pickle file.
+        The file is replaced atomically, so that other worker processes
+        never load a partially written file.
         """
-        with open(self.file_path, "wb") as f:
+        tmp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
             pickle.dump(self.data, f)
+        os.replace(tmp_path, self.file_path)
 
     # Add a new entry to the database
     def add(self, user_id, message_ts):
@@ -14,6 +14,7 @@ from incident_response_slackbot.openai_utils import (
     messages_to_string,
 )
 from openai_slackbot.handlers import BaseActionHandler, BaseMessageHandler
+from openai_slackbot.utils.filters import MessageFilter
 
 logger = getLogger(__name__)
 
@@ -28,9 +29,21 @@ class InboundDirectMessageHandler(BaseMessageHandler):
         super().__init__(slack_client)
         self.config = get_config()
 
+    def message_filter(self):
+        # Chats with users happen in direct messages, so other messages are dropped
+        # before they are looked up in the database.
+        return MessageFilter(
+            channel_types={"im"}, subtypes={None, "file_share"}, exclude_bot_messages=True
+        )
+
     async def should_handle(self, args):
         return True
 
+    def ordering_key(self, args):
+        # Messages from the same user belong to the same chat, so keep them in order.
+        user_id = args.event.get("user")
+        return ("user", user_id) if user_id else None
+
     async def handle(self, args):
         event = args.event
         user_id = event.get("user")
@@ -65,15 +78,16 @@ class InboundDirectMessageHandler(BaseMessageHandler):
             thread_ts=message_ts,
         )
 
-        # Send the end message to the user
+        # Send the end message to the user. These messages are sent in the
+        # background, in order, and retried if they fail.
         thank_you = "Thanks for your time!"
-        await self._slack_client.post_message(
+        self._slack_client.outbox.post_message(
             channel=user_id,
             text=thank_you,
         )
 
         # Send message to the channel
-        await self._slack_client.post_message(
+        self._slack_client.outbox.post_message(
             channel=self.config.feed_channel_id,
             text=f"Sent message to <@{user_id}>:\n> {thank_you}",
             thread_ts=message_ts,
@@ -82,7 +96,7 @@ class InboundDirectMessageHandler(BaseMessageHandler):
         summary = await get_thread_summary(messages)
 
         # Send message to the channel
-        await self._slack_client.post_message(
+        self._slack_client.outbox.post_message(
             channel=self.config.feed_channel_id,
             text=f"Here is the summary of the chat:\n> {summary}",
             thread_ts=message_ts,
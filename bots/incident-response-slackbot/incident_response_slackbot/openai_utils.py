@@ -1,10 +1,7 @@
 import json
 
-import openai
-from incident_response_slackbot.config import load_config, get_config
-
-load_config()
-config = get_config()
+from incident_response_slackbot.config import get_config
+from openai_slackbot.clients.llm import get_llm_client
 
 # Convert slack threaded messages to string
 def messages_to_string(messages):
@@ -17,9 +14,6 @@ async def get_clean_output(completion: str) -> str:
 
 
 async def create_greeting(username, details):
-    if not openai.api_key:
-        raise Exception("OpenAI API key not found.")
-
     prompt = f"""
     You are a helpful cybersecurity AI analyst assistant to the security team that wants to keep
     your company secure. You just received an alert with the following details:
@@ -35,11 +29,11 @@ async def create_greeting(username, details):
         {"role": "user", "content": ""},
     ]
 
-    completion = openai.chat.completions.create(
-        model="gpt-4-32k",
+    completion = await get_llm_client().create_chat_completion(
+        call_site="greeting",
         messages=messages,
-        temperature=0.3,
         stream=False,
+        **get_config().model_routes["greeting"].completion_kwargs(),
     )
     response = await get_clean_output(completion)
     return response
@@ -86,11 +80,11 @@ async def get_user_awareness(inbound_direct_message: str) -> str:
     ]
 
     # Call the API
-    response = openai.chat.completions.create(
-        model="gpt-4-32k",
+    response = await get_llm_client().create_chat_completion(
+        call_site="awareness",
         messages=messages,
-        temperature=0,
         stream=False,
+        **get_config().model_routes["awareness"].completion_kwargs(),
         functions=aware_decision_function,
         function_call={"name": "is_user_aware"},
     )
@@ -100,9 +94,6 @@ async def get_user_awareness(inbound_direct_message: str) -> str:
 
 
 async def get_thread_summary(messages):
-    if not openai.api_key:
-        raise Exception("OpenAI API key not found.")
-
     text_messages = messages_to_string(messages)
 
     prompt = f"""
@@ -118,20 +109,17 @@ async def get_thread_summary(messages):
         {"role": "user", "content": ""},
     ]
 
-    completion = openai.chat.completions.create(
-        model="gpt-4-32k",
+    completion = await get_llm_client().create_chat_completion(
+        call_site="summary",
         messages=messages,
-        temperature=0.3,
         stream=False,
+        **get_config().model_routes["summary"].completion_kwargs(),
     )
     response = await get_clean_output(completion)
     return response
 
 
 async def generate_awareness_question():
-    if not openai.api_key:
-        raise Exception("OpenAI API key not found.")
-
     prompt = f"""
     You are a helpful cybersecurity AI analyst assistant to the security team that wants to keep
     your company secure. You have received an alert regarding the user you're chatting with, and
@@ -145,11 +133,11 @@ async def generate_awareness_question():
         {"role": "user", "content": ""},
     ]
 
-    completion = openai.chat.completions.create(
-        model="gpt-4-32k",
+    completion = await get_llm_client().create_chat_completion(
+        call_site="nudge",
         messages=messages,
-        temperature=0.5,
         stream=False,
+        **get_config().model_routes["nudge"].completion_kwargs(),
     )
     response = await get_clean_output(completion)
     return response
@@ -1,23 +1,43 @@
 import os
 from logging import getLogger
 
-from incident_response_slackbot.config import load_config, get_config
+from incident_response_slackbot.config import get_config
 from incident_response_slackbot.db.database import Database
+from openai_slackbot.clients.http import create_slack_web_client, init_http_session
 from openai_slackbot.clients.slack import CreateSlackMessageResponse, SlackClient
 from openai_slackbot.utils.envvars import string
-from slack_bolt.app.async_app import AsyncApp
 
 logger = getLogger(__name__)
 
 DATABASE = Database()
 
-load_config()
-config = get_config()
+_SLACK_CLIENT = None
+
+
+async def get_slack_client() -> SlackClient:
+    """
+    This function returns the Slack client shared by all alerts posted from this
+    process. On first use, it opens the shared connection pool and warms up the
+    connection to Slack, so that a burst of alerts reuses the same connections.
+    """
+    global _SLACK_CLIENT
+    if _SLACK_CLIENT is None:
+        await init_http_session(get_config().http)
+        slack_template_path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            "../incident_response_slackbot/templates",
+        )
+        _SLACK_CLIENT = SlackClient(
+            create_slack_web_client(string("SLACK_BOT_TOKEN")), slack_template_path
+        )
+        await _SLACK_CLIENT.warm_up()
+    return _SLACK_CLIENT
+
 
 async def post_alert(alert):
     """
     This function posts an alert to the Slack channel.
-    It first initializes the Slack client with the bot token and template path.
+    It first gets the shared Slack client.
     Then, it extracts the user_id, alert_name, and properties from the alert.
     Finally, it posts the alert to the Slack channel and sends the initial details.
 
@@ -25,13 +45,7 @@ async def post_alert(alert):
         alert (dict): The alert to be posted. It should contain 'user_id', 'name', and 'properties'.
     """
 
-    slack_bot_token = string("SLACK_BOT_TOKEN")
-    app = AsyncApp(token=slack_bot_token)
-    slack_template_path = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)),
-        "../incident_response_slackbot/templates",
-    )
-    slack_client = SlackClient(app.client, slack_template_path)
+    slack_client = await get_slack_client()
 
     # Extracting the user_id, alert_name, and properties from the alert
     user_id = alert.get("user_id")
@@ -76,7 +90,7 @@ async def incident_feed_begin(
             },
         )
         message = await slack_client.post_message(
-            channel=config.feed_channel_id,
+            channel=get_config().feed_channel_id,
             blocks=blocks,
             text=f"{alert_name} via <@{user_id}>",
         )
@@ -113,5 +127,5 @@ async def initial_details(*, slack_client: SlackClient, message, properties):
     details = get_alert_details(**properties)
 
     await slack_client.post_message(
-        channel=config.feed_channel_id, text=f"{details}", thread_ts=thread_ts
+        channel=get_config().feed_channel_id, text=f"{details}", thread_ts=thread_ts
     )
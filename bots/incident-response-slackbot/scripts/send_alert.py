@@ -5,6 +5,8 @@ import time
 
 import toml
 from alert_feed import post_alert
+from incident_response_slackbot.config import load_config
+from openai_slackbot.clients.http import close_http_session
 
 
 def load_alerts():
@@ -21,10 +23,14 @@ def generate_random_alert(alerts):
 
 
 async def main():
+    load_config()
     alerts = load_alerts()
 
     alert = generate_random_alert(alerts)
-    await post_alert(alert)
+    try:
+        await post_alert(alert)
+    finally:
+        await close_http_session()
 
 
 if __name__ == "__main__":
@@ -37,26 +37,18 @@ def mock_slack_client():
 
 
 @pytest.fixture(autouse=True)
-@patch("openai.ChatCompletion.create")
-def mock_chat_completion(mock_create):
-    mock_create.return_value = {
-        "id": "chatcmpl-1234567890",
-        "object": "chat.completion",
-        "created": 1640995200,
-        "model": "gpt-4-32k",
-        "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30},
-        "choices": [
-            {
-                "message": {
-                    "role": "assistant",
-                    "content": "This is a mock response from the OpenAI API.",
-                },
-                "finish_reason": "stop",
-                "index": 0,
-            }
-        ],
-    }
-    yield
+def mock_llm_client():
+    # Mock the shared LLM client used by openai_utils
+    llm_client = MagicMock()
+    llm_client.create_chat_completion = AsyncMock(
+        return_value=MagicMock(
+            choices=[
+                MagicMock(message=MagicMock(content="This is a mock response from the OpenAI API."))
+            ]
+        )
+    )
+    with patch("incident_response_slackbot.openai_utils.get_llm_client", return_value=llm_client):
+        yield llm_client
 
 
 @pytest.fixture
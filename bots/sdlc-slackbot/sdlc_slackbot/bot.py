@@ -3,8 +3,6 @@ import hashlib
 import json
 import os
 import re
-import threading
-import time
 import traceback
 from logging import getLogger
 
@@ -13,14 +11,15 @@ import validators
 from database import *
 from gdoc import gdoc_get
 from openai_slackbot.bot import init_bot, start_app
+from openai_slackbot.clients.http import close_http_session
+from openai_slackbot.clients.slack import get_slack_client
+from openai_slackbot.llm.gateway import Priority
+from openai_slackbot.metrics import stop_metrics_server
 from openai_slackbot.utils.envvars import string
 from peewee import *
 from playhouse.db_url import *
 from playhouse.shortcuts import model_to_dict
 from sdlc_slackbot.config import get_config, load_config
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
-from slack_sdk import WebClient
 from utils import *
 
 logger = getLogger(__name__)
@@ -55,6 +54,10 @@ def extract_urls(text):
     return [url for url in urls if validators.url(url)]
 
 
+# Linked Slack threads are read up to this many bytes, to bound memory and prompt size.
+slack_thread_max_bytes = 200_000
+
+
 async def async_fetch_slack(url):
     parts = url.split("/")
     channel = parts[-2]
@@ -62,8 +65,12 @@ async def async_fetch_slack(url):
     ts = ts[1:]  # trim p
     seconds = ts[:-6]
     nanoseconds = ts[-6:]
-    result = await app.client.conversations_replies(channel=channel, ts=f"{seconds}.{nanoseconds}")
-    return " ".join(message.get("text", "") for message in result.data.get("messages", []))
+    texts = []
+    async for message in slack_client.iter_thread_messages(
+        channel, f"{seconds}.{nanoseconds}", max_bytes=slack_thread_max_bytes
+    ):
+        texts.append(message.get("text", ""))
+    return " ".join(texts)
 
 
 content_fetchers = [
@@ -81,7 +88,9 @@ async def fetch_content(url):
             if asyncio.iscoroutinefunction(fetcher):
                 return await fetcher(url)  # Await the result if it's a coroutine function
             else:
-                return fetcher(url)  # Call it directly if it's not a coroutine function
+                # Blocking fetchers, e.g. Google Docs, run on a thread so they don't
+                # stall the event loop.
+                return await asyncio.to_thread(fetcher, url)
 
 
 form = [
@@ -170,12 +179,14 @@ def model_params_to_str(params):
     return re.sub(multiple_whitespace_pat, " ", "\n".join(map(str, ss))).strip()
 
 
-def summarize_params(params):
+async def summarize_params(params):
     summary = {}
     for k, v in params.items():
         if k not in skip_params:
-            summary[k] = ask_ai(
-                config.base_prompt + config.summary_prompt, v[: config.context_limit]
+            summary[k] = await ask_ai(
+                config.base_prompt + config.summary_prompt,
+                v[: config.context_limit],
+                call_site="summary",
             )
         else:
             summary[k] = v
@@ -194,12 +205,12 @@ async def handle_message_events(say, message):
         await say(blocks=form, thread_ts=message["ts"])
 
 
-def get_response_with_retry(prompt, context, max_retries=1):
+async def get_response_with_retry(prompt, context, max_retries=1):
     prompt = prompt.strip().replace("\n", " ")
     retries = 0
     while retries <= max_retries:
         try:
-            response = ask_ai(prompt, context)
+            response = await ask_ai(prompt, context)
             return response
         except json.JSONDecodeError as e:
             logger.error(f"JSON error on attempt {retries + 1}: {e}")
@@ -276,7 +287,7 @@ async def submit_form(ack, body, say):
         context = model_params_to_str(params)
         if len(context) > config.context_limit:
             logger.info(f"context too long: {len(context)}. Summarizing...")
-            summarized_context = summarize_params(params)
+            summarized_context = await summarize_params(params)
             context = model_params_to_str(summarized_context)
             # FIXME: is there a better way to handle this? currently, if the summary is still too long
             # we just give up and cut it off
@@ -284,7 +295,9 @@ async def submit_form(ack, body, say):
                 logger.info(f"Summarized context too long: {len(context)}. Cutting off...")
                 context = context[: config.context_limit]
 
-        response = get_response_with_retry(config.base_prompt + config.initial_prompt, context)
+        response = await get_response_with_retry(
+            config.base_prompt + config.initial_prompt, context
+        )
         if not response:
             return
 
@@ -347,7 +360,7 @@ async def submit_followup_questions(ack, body, say):
 
         context = model_params_to_str(params)
 
-        response = ask_ai(config.base_prompt, context)
+        response = await ask_ai(config.base_prompt, context)
         text_to_update = response
         if (
             isinstance(response, dict)
@@ -371,11 +384,13 @@ async def submit_followup_questions(ack, body, say):
         await say(text=config.irrecoverable_error_message, thread_ts=ts)
 
 
-def update_resources():
+async def update_resources():
     while True:
-        time.sleep(monitor_thread_sleep_seconds)
+        await asyncio.sleep(monitor_thread_sleep_seconds)
         try:
-            for assessment in Assessment.select():
+            # Database calls block, so they run on a thread, off the event loop
+            # that also acks Slack events.
+            for assessment in await asyncio.to_thread(list, Assessment.select()):
                 logger.info(f"checking {assessment.project_name} for updates")
 
                 assessment_params = model_to_dict(assessment)
@@ -385,8 +400,8 @@ def update_resources():
 
                 previous_content = ""
 
-                for resource in assessment.resources:
-                    new_content = asyncio.run(fetch_content(resource.url))
+                for resource in await asyncio.to_thread(list, assessment.resources):
+                    new_content = await fetch_content(resource.url)
 
                     if resource.content_hash != hash_content(new_content):
                         # just save previous content in memory temporarily
@@ -395,7 +410,7 @@ def update_resources():
                         new_params[resource.url] = new_content
                         changed = True
                         resource.content_hash = hash_content(new_content)
-                        resource.save()
+                        await asyncio.to_thread(resource.save)
 
                 if not changed:
                     continue
@@ -415,7 +430,12 @@ def update_resources():
 
                 context_json = json.dumps(context, indent=2)
 
-                new_response = ask_ai(config.base_prompt + config.update_prompt, context_json)
+                new_response = await ask_ai(
+                    config.base_prompt + config.update_prompt,
+                    context_json,
+                    call_site="update",
+                    priority=Priority.background,
+                )
 
                 if new_response["outcome"] == "unchanged":
                     continue
@@ -424,9 +444,9 @@ def update_resources():
                 clean_response = clean_normalized_response(normalized_response)
 
                 for item in clean_response:
-                    assessment.update(**item).execute()
+                    await asyncio.to_thread(assessment.update(**item).execute)
 
-                asyncio.run(send_update_notification(assessment_params, new_response))
+                await send_update_notification(assessment_params, new_response)
         except Exception as e:
             logger.error(f"error: {e} updating resources")
             traceback.print_exc()
@@ -434,22 +454,23 @@ def update_resources():
 
 monitor_thread_sleep_seconds = 6
 
-if __name__ == "__main__":
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    load_config(os.path.join(current_dir, "config.toml"))
 
-    template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+async def main(template_path):
+    global app, slack_client
 
-    config = get_config()
-
-    app = asyncio.run(
-        init_bot(
-            openai_organization_id=config.openai_organization_id,
-            slack_message_handler=None,
-            slack_action_handlers=[],
-            slack_template_path=template_path,
-        )
+    init_db()
+    app = await init_bot(
+        openai_organization_id=config.openai_organization_id,
+        slack_message_handlers=[],
+        slack_action_handlers=[],
+        slack_template_path=template_path,
+        llm_config=config.llm,
+        http_config=config.http,
+        user_directory_config=config.users,
+        metrics_config=config.metrics,
     )
+    # Share the bot's client, so that its calls share the rate limits and the outbox.
+    slack_client = get_slack_client()
 
     # Register your custom event handlers
     app.event("app_mention")(handle_app_mention_events)
@@ -458,8 +479,25 @@ if __name__ == "__main__":
     app.action("submit_form")(submit_form)
     app.action(re.compile("submit_followup_questions.*"))(submit_followup_questions)
 
-    t = threading.Thread(target=update_resources)
-    t.start()
+    # Run the resource monitor on the same event loop as the app, so it can share
+    # the async Slack and LLM clients.
+    monitor = asyncio.create_task(update_resources())
 
     # Start the app
-    asyncio.run(start_app(app))
+    try:
+        await start_app(app)
+    finally:
+        monitor.cancel()
+        await stop_metrics_server()
+        await close_http_session()
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    load_config(os.path.join(current_dir, "config.toml"))
+
+    template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+    config = get_config()
+
+    asyncio.run(main(template_path))
@@ -3,11 +3,23 @@ import typing as t
 
 import toml
 from dotenv import load_dotenv
+from openai_slackbot.clients.http import HTTPConfig
+from openai_slackbot.clients.llm import LLMConfig
+from openai_slackbot.clients.users import UserDirectoryConfig
+from openai_slackbot.llm.routing import ModelRoute, with_default_routes
+from openai_slackbot.metrics import MetricsConfig
 from pydantic import BaseModel, ValidationError, field_validator, model_validator
 from pydantic.functional_validators import AfterValidator, BeforeValidator
 
 _CONFIG = None
 
+# Models used for each LLM task, unless overridden in the config.
+DEFAULT_MODEL_ROUTES: t.Dict[str, ModelRoute] = {
+    "assess": ModelRoute(model="gpt-4-32k"),
+    "update": ModelRoute(model="gpt-4-32k"),
+    "summary": ModelRoute(model="gpt-4-32k"),
+}
+
 
 def validate_channel(channel_id: str) -> str:
     if not channel_id.startswith("C"):
@@ -34,6 +46,23 @@ class Config(BaseModel):
     # Slack channel for notifications
     notification_channel_id: t.Annotated[str, AfterValidator(validate_channel)]
 
+    # Model, max tokens and temperature to use for each LLM task.
+    model_routes: t.Annotated[
+        t.Dict[str, ModelRoute], AfterValidator(with_default_routes(DEFAULT_MODEL_ROUTES))
+    ] = DEFAULT_MODEL_ROUTES
+
+    # LLM gateway settings, e.g. per-model concurrency and token budgets.
+    llm: LLMConfig = LLMConfig()
+
+    # Connection pool settings for Slack API requests.
+    http: HTTPConfig = HTTPConfig()
+
+    # Cache settings for Slack user profile lookups.
+    users: UserDirectoryConfig = UserDirectoryConfig()
+
+    # Local HTTP endpoint serving metrics in the Prometheus text format.
+    metrics: MetricsConfig = MetricsConfig()
+
 
 def load_config(path: str):
     load_dotenv()
@@ -4,11 +4,8 @@ import os.path
 import re
 from logging import getLogger
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# The Google client libraries are slow to import, so they are imported on first
+# use instead of when the bot starts.
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/documents.readonly"]
@@ -57,6 +54,10 @@ def read_structural_elements(elements):
 
 
 def gdoc_creds():
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
@@ -84,6 +85,8 @@ def gdoc_creds():
 
 def gdoc_get(gdoc_url):
     # https://docs.google.com/document/d/<ID>/edit
+    from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
 
     result = None
     logger.info(gdoc_url)
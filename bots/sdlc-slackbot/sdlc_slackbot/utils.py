@@ -3,7 +3,9 @@ import os
 from logging import getLogger
 
 # import anthropic
-import openai
+from openai_slackbot.clients.llm import get_llm_client
+from openai_slackbot.llm.gateway import Priority
+from sdlc_slackbot.config import get_config
 
 logger = getLogger(__name__)
 
@@ -57,9 +59,9 @@ def submit_block(action_id):
     )
 
 
-def ask_ai(prompt, context):
+async def ask_ai(prompt, context, call_site="assess", priority=Priority.interactive):
     # return ask_claude(prompt, context) # YOU CAN USE CLAUDE HERE
-    response = ask_gpt(prompt, context)
+    response = await ask_gpt(prompt, context, call_site=call_site, priority=priority)
 
     # Removing leading and trailing backticks and whitespace
     clean_response = response.strip("`\n ")
@@ -82,13 +84,15 @@ def ask_ai(prompt, context):
         return None
 
 
-def ask_gpt(prompt, context):
-    response = openai.chat.completions.create(
-        model="gpt-4-32k",
+async def ask_gpt(prompt, context, call_site="assess", priority=Priority.interactive):
+    response = await get_llm_client().create_chat_completion(
+        call_site=call_site,
+        priority=priority,
         messages=[
             {"role": "system", "content": prompt},
             {"role": "user", "content": context},
         ],
+        **get_config().model_routes[call_site].completion_kwargs(),
     )
     return response.choices[0].message.content
 
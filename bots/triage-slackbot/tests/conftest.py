@@ -73,6 +73,14 @@ def mock_config():
     return load_config(config_path)
 
 
+@pytest.fixture
+def mock_llm_client():
+    llm_client = MagicMock()
+    llm_client.create_chat_completion = AsyncMock()
+    with patch("triage_slackbot.openai_utils.get_llm_client", return_value=llm_client):
+        yield llm_client
+
+
 @pytest.fixture()
 def mock_post_message_response():
     return AsyncMock(
@@ -1,5 +1,5 @@
 import json
-from unittest.mock import call, patch
+from unittest.mock import MagicMock, call
 
 import pytest
 from triage_slackbot.handlers import (
@@ -7,27 +7,19 @@ from triage_slackbot.handlers import (
     InboundRequestHandler,
     InboundRequestRecategorizeHandler,
 )
-from triage_slackbot.openai_utils import openai
 
 
 def get_mock_chat_completion_response(category: str):
     category_args = json.dumps({"category": category})
-    return {
-        "choices": [
-            {
-                "message": {
-                    "function_call": {
-                        "arguments": category_args,
-                    }
-                }
-            }
-        ]
-    }
+    return MagicMock(
+        choices=[MagicMock(message=MagicMock(function_call=MagicMock(arguments=category_args)))]
+    )
 
 
-def assert_chat_completion_called(mock_chat_completion, mock_config):
-    mock_chat_completion.create.assert_called_once_with(
-        model="gpt-4-32k-0613",
+def assert_chat_completion_called(mock_llm_client, mock_config):
+    mock_llm_client.create_chat_completion.assert_awaited_once_with(
+        call_site="classify",
+        model="gpt-4-32k",
         messages=[
             {
                 "role": "system",
@@ -58,22 +50,23 @@ def assert_chat_completion_called(mock_chat_completion, mock_config):
     )
 
 
-@patch.object(openai, "ChatCompletion")
 async def test_inbound_request_handler_handle(
-    mock_chat_completion,
+    mock_llm_client,
     mock_config,
     mock_slack_client,
     mock_inbound_request,
 ):
     # Setup mocks
-    mock_chat_completion.create.return_value = get_mock_chat_completion_response("appsec")
+    mock_llm_client.create_chat_completion.return_value = get_mock_chat_completion_response(
+        "appsec"
+    )
 
     # Call handler
     handler = InboundRequestHandler(mock_slack_client)
     await handler.maybe_handle(mock_inbound_request)
 
     # Assert that handler calls OpenAI API
-    assert_chat_completion_called(mock_chat_completion, mock_config)
+    assert_chat_completion_called(mock_llm_client, mock_config)
 
     mock_slack_client._client.assert_has_calls(
         [
@@ -221,15 +214,14 @@ async def test_inbound_request_handler_handle(
     )
 
 
-@patch.object(openai, "ChatCompletion")
 async def test_inbound_request_handler_handle_autorespond(
-    mock_chat_completion,
+    mock_llm_client,
     mock_config,
     mock_slack_client,
     mock_inbound_request,
 ):
     # Setup mocks
-    mock_chat_completion.create.return_value = get_mock_chat_completion_response(
+    mock_llm_client.create_chat_completion.return_value = get_mock_chat_completion_response(
         "physical_security"
     )
 
@@ -238,7 +230,7 @@ async def test_inbound_request_handler_handle_autorespond(
     await handler.maybe_handle(mock_inbound_request)
 
     # Assert that handler calls OpenAI API
-    assert_chat_completion_called(mock_chat_completion, mock_config)
+    assert_chat_completion_called(mock_llm_client, mock_config)
 
     mock_slack_client._client.assert_has_calls(
         [
@@ -341,6 +333,7 @@ async def test_inbound_request_recategorize_to_listed_category_handler(
 ):
     handler = InboundRequestRecategorizeHandler(mock_slack_client)
     await handler.maybe_handle(mock_appsec_oncall_recategorize_to_privacy_message)
+    await mock_slack_client.outbox.flush(timeout=1)
     mock_slack_client._client.assert_has_calls(
         [
             call.reactions_add(
@@ -468,6 +461,9 @@ async def test_inbound_request_recategorize_to_other_category_handler(
 ):
     handler = InboundRequestRecategorizeHandler(mock_slack_client)
     await handler.maybe_handle(mock_appsec_oncall_recategorize_to_other_message)
+    await mock_slack_client.outbox.flush(timeout=1)
+    # Writes recorded in the outbox are sent in the background, in order per
+    # channel, so the autoresponse in another channel may be sent first.
     mock_slack_client._client.assert_has_calls(
         [
             call.reactions_add(
@@ -483,6 +479,15 @@ async def test_inbound_request_recategorize_to_other_category_handler(
                 thread_ts="t1",
                 text=":thumbsdown: <@U1234567890> reassigned the inbound message from Application Security to: Other.",
             ),
+            call.chat_postMessage(
+                channel="C23456",
+                thread_ts="t1",
+                text="<mockpermalink|Autoresponded> to inbound request.",
+            ),
+        ]
+    )
+    mock_slack_client._client.assert_has_calls(
+        [
             call.chat_postMessage(
                 channel="C12345",
                 thread_ts="t0",
@@ -508,11 +513,6 @@ async def test_inbound_request_recategorize_to_other_category_handler(
                 ],
             ),
             call.chat_getPermalink(channel="", message_ts=""),
-            call.chat_postMessage(
-                channel="C23456",
-                thread_ts="t1",
-                text="<mockpermalink|Autoresponded> to inbound request.",
-            ),
         ]
     )
 
@@ -530,12 +530,36 @@ async def test_inbound_request_recategorize_to_other_category_handler(
         {"thread_ts": "t0"},
     ],
 )
-@patch.object(openai, "ChatCompletion")
 async def test_inbound_request_handler_skip_handle(
-    mock_chat_completion, event_args_override, mock_slack_client, mock_inbound_request
+    mock_llm_client, event_args_override, mock_slack_client, mock_inbound_request
 ):
     mock_inbound_request.event = {**mock_inbound_request.event, **event_args_override}
     handler = InboundRequestHandler(mock_slack_client)
 
     await handler.maybe_handle(mock_inbound_request)
-    mock_chat_completion.create.assert_not_called()
+    mock_llm_client.create_chat_completion.assert_not_awaited()
+
+
+@pytest.mark.parametrize(
+    "event_args_override",
+    [
+        {},
+        {"subtype": "file_share"},
+        {"subtype": "thread_broadcast", "thread_ts": "t0"},
+        {"channel": "C0"},
+        {"subtype": "bot_message"},
+        {"subtype": "message_changed"},
+        {"thread_ts": "t0"},
+    ],
+)
+async def test_inbound_request_handler_message_filter(
+    event_args_override, mock_slack_client, mock_inbound_request
+):
+    # The filter drops events before should_handle, so it must not drop any that
+    # should_handle accepts.
+    mock_inbound_request.event = {**mock_inbound_request.event, **event_args_override}
+    handler = InboundRequestHandler(mock_slack_client)
+
+    assert handler.message_filter().matches(mock_inbound_request.event) == (
+        await handler.should_handle(mock_inbound_request)
+    )
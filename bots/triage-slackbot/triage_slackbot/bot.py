@@ -1,7 +1,6 @@
-import asyncio
 import os
 
-from openai_slackbot.bot import start_bot
+from openai_slackbot.bot import run_bot
 from triage_slackbot.config import get_config, load_config
 from triage_slackbot.handlers import (
     InboundRequestAcknowledgeHandler,
@@ -15,7 +14,7 @@ if __name__ == "__main__":
     current_dir = os.path.dirname(os.path.abspath(__file__))
     load_config(os.path.join(current_dir, "config.toml"))
 
-    message_handler = InboundRequestHandler
+    message_handlers = [InboundRequestHandler]
     action_handlers = [
         InboundRequestAcknowledgeHandler,
         InboundRequestRecategorizeHandler,
@@ -26,11 +25,20 @@ if __name__ == "__main__":
     template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 
     config = get_config()
-    asyncio.run(
-        start_bot(
-            openai_organization_id=config.openai_organization_id,
-            slack_message_handler=message_handler,
-            slack_action_handlers=action_handlers,
-            slack_template_path=template_path,
-        )
+    run_bot(
+        openai_organization_id=config.openai_organization_id,
+        slack_message_handlers=message_handlers,
+        slack_action_handlers=action_handlers,
+        slack_template_path=template_path,
+        llm_config=config.llm,
+        http_config=config.http,
+        user_directory_config=config.users,
+        executor_config=config.executor,
+        dedup_config=config.dedup,
+        metrics_config=config.metrics,
+        tracing_config=config.tracing,
+        events_config=config.events,
+        shutdown_config=config.shutdown,
+        job_queue_config=config.job_queue,
+        outbox_config=config.outbox,
     )
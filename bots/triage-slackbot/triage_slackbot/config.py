@@ -3,6 +3,18 @@ import typing as t
 
 import toml
 from dotenv import load_dotenv
+from openai_slackbot.clients.http import HTTPConfig
+from openai_slackbot.clients.llm import LLMConfig
+from openai_slackbot.clients.outbox import OutboxConfig
+from openai_slackbot.clients.users import UserDirectoryConfig
+from openai_slackbot.handlers import ExecutorConfig
+from openai_slackbot.jobs import JobQueueConfig
+from openai_slackbot.llm.routing import ModelRoute, with_default_routes
+from openai_slackbot.metrics import MetricsConfig
+from openai_slackbot.server import EventsConfig
+from openai_slackbot.shutdown import ShutdownConfig
+from openai_slackbot.tracing import TracingConfig
+from openai_slackbot.utils.dedup import DedupConfig
 from pydantic import BaseModel, ValidationError, field_validator, model_validator
 from pydantic.functional_validators import AfterValidator, BeforeValidator
 from triage_slackbot.category import OTHER_KEY, RequestCategory
@@ -18,6 +30,12 @@ def convert_categories(v: t.List[t.Dict]):
     return categories
 
 
+# Models used for each LLM task, unless overridden in the config.
+DEFAULT_MODEL_ROUTES: t.Dict[str, ModelRoute] = {
+    "classify": ModelRoute(model="gpt-4-32k", temperature=0),
+}
+
+
 def validate_channel(channel_id: str) -> str:
     if not channel_id.startswith("C"):
         raise ValueError("channel ID must start with 'C'")
@@ -44,6 +62,49 @@ class Config(BaseModel):
     # route the request to a specific conversation.
     other_category_enabled: bool
 
+    # Maximum number of tokens of an inbound request's text that is sent to the
+    # classifier. Longer requests are cut off, which keeps the prompt small.
+    inbound_request_max_tokens: int = 2000
+
+    # Model, max tokens and temperature to use for each LLM task.
+    model_routes: t.Annotated[
+        t.Dict[str, ModelRoute], AfterValidator(with_default_routes(DEFAULT_MODEL_ROUTES))
+    ] = DEFAULT_MODEL_ROUTES
+
+    # LLM gateway settings, e.g. per-model concurrency and token budgets.
+    llm: LLMConfig = LLMConfig()
+
+    # Connection pool settings for Slack API requests.
+    http: HTTPConfig = HTTPConfig()
+
+    # Cache settings for Slack user profile lookups.
+    users: UserDirectoryConfig = UserDirectoryConfig()
+
+    # Background execution of event handlers. If not set, handlers run inline.
+    executor: t.Optional[ExecutorConfig] = ExecutorConfig()
+
+    # Dropping of events that Slack delivers more than once. If not set, every event is handled.
+    dedup: t.Optional[DedupConfig] = DedupConfig()
+
+    # Local HTTP endpoint serving metrics in the Prometheus text format.
+    metrics: MetricsConfig = MetricsConfig()
+
+    # Per-event traces of handler, Slack and LLM call timings.
+    tracing: TracingConfig = TracingConfig()
+
+    # How events are received from Slack: over Socket Mode, or over HTTP by one or more workers.
+    events: EventsConfig = EventsConfig()
+
+    # Waiting for the events being handled when the bot stops, and journaling the rest.
+    shutdown: ShutdownConfig = ShutdownConfig()
+
+    # Durable queue of handler events, retried when handling fails. If not set,
+    # events are handled once, on the executor.
+    job_queue: t.Optional[JobQueueConfig] = None
+
+    # Background delivery of the Slack writes that handlers record in the outbox.
+    outbox: OutboxConfig = OutboxConfig()
+
     @model_validator(mode="after")
     def check_category_keys(config: "Config") -> "Config":
         if config.other_category_enabled:
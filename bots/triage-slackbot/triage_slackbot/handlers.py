@@ -4,6 +4,8 @@ from logging import getLogger
 
 from openai_slackbot.clients.slack import CreateSlackMessageResponse, SlackClient
 from openai_slackbot.handlers import BaseActionHandler, BaseHandler, BaseMessageHandler
+from openai_slackbot.tracing import traced
+from openai_slackbot.utils.filters import MessageFilter
 from openai_slackbot.utils.slack import (
     RenderedSlackBlock,
     block_id_exists,
@@ -94,6 +96,7 @@ class InboundRequestHandlerMixin(BaseHandler):
             .get("selected_conversation")
         )
 
+    @traced()
     async def notify_oncall(
         self,
         *,
@@ -206,6 +209,7 @@ class InboundRequestHandlerMixin(BaseHandler):
         oncall_slack_id = predicted_category.oncall_slack_id
         return render_slack_id_to_mention(oncall_slack_id) if oncall_slack_id else None
 
+    @traced()
     async def _maybe_autorespond(
         self,
         predicted_category: RequestCategory,
@@ -264,7 +268,7 @@ class InboundRequestHandler(BaseMessageHandler, InboundRequestHandlerMixin):
 
         logging_extra = self.logging_extra(args)
 
-        text = extract_text_from_event(event)
+        text = extract_text_from_event(event, max_tokens=self.config.inbound_request_max_tokens)
         if not text:
             logger.info("No text in event, done processing", extra=logging_extra)
             return
@@ -298,6 +302,13 @@ class InboundRequestHandler(BaseMessageHandler, InboundRequestHandlerMixin):
         )
         logger.info("Notified on-call", extra=logging_extra)
 
+    def message_filter(self):
+        return MessageFilter(
+            channels={self.config.inbound_request_channel_id},
+            subtypes={None, "file_share", "thread_broadcast"},
+            exclude_thread_replies=True,
+        )
+
     async def should_handle(self, args):
         event = args.event
 
@@ -315,10 +326,12 @@ class InboundRequestHandler(BaseMessageHandler, InboundRequestHandlerMixin):
             )
         )
 
+    @traced()
     async def _predict_category(self, body) -> RequestCategory:
         predicted_category = await get_predicted_category(body)
         return self.config.categories[predicted_category]
 
+    @traced()
     async def _update_feed(
         self,
         *,
@@ -484,7 +497,8 @@ class InboundRequestRecategorizeHandler(BaseActionHandler, InboundRequestHandler
                 "inbound_message_url": inbound_message_url,
             }
 
-            await self._slack_client.update_message(
+            # These writes are sent in the background, in order, and retried if they fail.
+            self._slack_client.outbox.update_message(
                 blocks=[],
                 channel=notify_oncall_msg_channel,
                 ts=notify_oncall_msg_ts,
@@ -497,7 +511,7 @@ class InboundRequestRecategorizeHandler(BaseActionHandler, InboundRequestHandler
             )
 
             # Indicate that the previous predicted category is not accurate.
-            await self._slack_client.add_reaction(
+            self._slack_client.outbox.add_reaction(
                 channel=feed_message_channel,
                 name="thumbsdown",
                 timestamp=feed_message_ts,
@@ -506,7 +520,7 @@ class InboundRequestRecategorizeHandler(BaseActionHandler, InboundRequestHandler
             # If the feed message is in a different channel than the notify on-call message,
             # post recategorization update to the feed channel.
             if notify_oncall_msg_channel != feed_message_channel:
-                await self._slack_client.post_message(
+                self._slack_client.outbox.post_message(
                     blocks=[],
                     channel=feed_message_channel,
                     thread_ts=feed_message_ts,
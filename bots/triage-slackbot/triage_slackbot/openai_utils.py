@@ -1,7 +1,7 @@
 import json
 from functools import cache
 
-import openai
+from openai_slackbot.clients.llm import get_llm_client
 from triage_slackbot.category import OTHER_KEY, RequestCategory
 from triage_slackbot.config import get_config
 
@@ -42,11 +42,11 @@ async def get_predicted_category(inbound_request_content: str) -> str:
     ]
 
     # Call the API
-    response = openai.chat.completions.create(
-        model="gpt-4-32k",
+    response = await get_llm_client().create_chat_completion(
+        call_site="classify",
         messages=messages,
-        temperature=0,
         stream=False,
+        **config.model_routes["classify"].completion_kwargs(),
         functions=predict_category_functions(config.categories.values()),
         function_call={"name": "get_predicted_category"},
     )
@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from openai_slackbot.benchmark.fakes import FaultProfile
+from openai_slackbot.benchmark.runner import BenchmarkConfig, run_benchmark
+from openai_slackbot.benchmark.scenarios import SCENARIOS
+from openai_slackbot.benchmark.startup import measure_startup
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m openai_slackbot.benchmark",
+        description="Benchmarks a bot against local fake Slack and OpenAI servers.",
+    )
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--events", type=int, default=100, help="number of events to deliver")
+    parser.add_argument(
+        "--rate", type=float, default=10, help="events per second, or 0 to deliver all at once"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's logs")
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="measure the bot's time to ready against its budget instead of handling events",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="number of startups to measure")
+    for api, latency_ms in (("slack", 30), ("openai", 500)):
+        group = parser.add_argument_group(f"fake {api} server")
+        group.add_argument(f"--{api}-latency-ms", type=float, default=latency_ms)
+        group.add_argument(f"--{api}-latency-sigma", type=float, default=0.5)
+        group.add_argument(f"--{api}-error-rate", type=float, default=0)
+        group.add_argument(f"--{api}-rate-limit-rate", type=float, default=0)
+    return parser.parse_args()
+
+
+def fault_profile(args: argparse.Namespace, api: str) -> FaultProfile:
+    return FaultProfile(
+        latency_ms=getattr(args, f"{api}_latency_ms"),
+        latency_sigma=getattr(args, f"{api}_latency_sigma"),
+        error_rate=getattr(args, f"{api}_error_rate"),
+        rate_limit_rate=getattr(args, f"{api}_rate_limit_rate"),
+    )
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+
+    if args.startup:
+        startup = measure_startup(SCENARIOS[args.scenario](), runs=args.runs)
+        print(json.dumps(startup.to_dict(), indent=2) if args.json else startup.format())
+        sys.exit(0 if startup.within_budget else 1)
+
+    config = BenchmarkConfig(
+        events=args.events,
+        rate_per_second=args.rate or None,
+        slack=fault_profile(args, "slack"),
+        openai=fault_profile(args, "openai"),
+        seed=args.seed,
+    )
+    result = asyncio.run(run_benchmark(SCENARIOS[args.scenario](), config))
+    print(json.dumps(result.to_dict(), indent=2) if args.json else result.format())
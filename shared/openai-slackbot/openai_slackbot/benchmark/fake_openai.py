@@ -0,0 +1,89 @@
+import itertools
+import json
+import time
+import typing as t
+from collections import Counter
+from logging import getLogger
+
+from aiohttp import web
+from openai_slackbot.benchmark.fakes import FakeServer, FaultProfile
+
+logger = getLogger(__name__)
+
+# Returns the assistant message to answer a chat completion request with.
+Responder = t.Callable[[t.Dict[str, t.Any]], t.Dict[str, t.Any]]
+
+
+def default_responder(request: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    """Answers forced function calls with empty arguments and everything else with a short text."""
+    function_call = request.get("function_call")
+    if isinstance(function_call, dict):
+        return {
+            "role": "assistant",
+            "content": None,
+            "function_call": {"name": function_call["name"], "arguments": "{}"},
+        }
+    return {"role": "assistant", "content": "OK"}
+
+
+class FakeOpenAIServer(FakeServer):
+    """
+    FakeOpenAIServer serves an OpenAI-compatible chat completions endpoint at
+    /v1/chat/completions. Answers come from a responder, so that benchmark
+    scenarios can return what their bot expects to parse.
+    """
+
+    def __init__(
+        self,
+        profile: t.Optional[FaultProfile] = None,
+        seed: int = 0,
+        responder: t.Optional[Responder] = None,
+    ) -> None:
+        super().__init__(profile, seed)
+        # Number of completion requests per model.
+        self.calls: t.Counter[str] = Counter()
+        self._responder = responder or default_responder
+        self._ids = itertools.count(1)
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/v1"
+
+    def add_routes(self, app: web.Application) -> None:
+        app.router.add_post("/v1/chat/completions", self._handle_chat_completion)
+
+    async def _handle_chat_completion(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        model = body.get("model", "")
+        self.calls[model] += 1
+
+        fault = await self.delay()
+        if fault == "ratelimited":
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": None}},
+                status=429,
+                headers={"retry-after": str(self.profile.retry_after_seconds)},
+            )
+        if fault == "error":
+            return web.json_response(
+                {"error": {"message": "The server had an error", "type": "server_error"}},
+                status=500,
+            )
+
+        message = self._responder(body)
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        completion_tokens = max(1, len(json.dumps(message)) // 4)
+        return web.json_response(
+            {
+                "id": f"chatcmpl-bench{next(self._ids)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
@@ -0,0 +1,274 @@
+import asyncio
+import itertools
+import json
+import time
+import typing as t
+import uuid
+from collections import Counter, defaultdict
+from logging import getLogger
+
+import aiohttp
+from aiohttp import web
+from openai_slackbot.benchmark.fakes import FakeServer, FaultProfile
+
+logger = getLogger(__name__)
+
+TEAM_ID = "T0BENCH"
+APP_ID = "A0BENCH"
+BOT_ID = "B0BENCH"
+BOT_USER_ID = "U0BENCHBOT"
+
+# Methods the bots call while starting up. They are never delayed or failed,
+# and are not counted as calls made while handling events.
+SETUP_METHODS = ("auth.test", "apps.connections.open")
+
+SlackMessageData = t.Dict[str, t.Any]
+
+
+class FakeSlackServer(FakeServer):
+    """
+    FakeSlackServer serves the parts of the Slack Web API that the bots use,
+    backed by an in-memory message store, and a Socket Mode endpoint that
+    delivers synthetic events to a connected bot and records their acks.
+    """
+
+    def __init__(self, profile: t.Optional[FaultProfile] = None, seed: int = 0) -> None:
+        super().__init__(profile, seed)
+        # Number of Web API calls per method.
+        self.calls: t.Counter[str] = Counter()
+        # When each event was acked by the bot, keyed by event_id.
+        self.acks: t.Dict[str, float] = {}
+        self._messages: t.DefaultDict[str, t.Dict[str, SlackMessageData]] = defaultdict(dict)
+        self._envelopes: t.Dict[str, str] = {}
+        self._sockets: t.List[web.WebSocketResponse] = []
+        self._ts = itertools.count(1)
+        self._event_ids = itertools.count(1)
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/api/"
+
+    def add_routes(self, app: web.Application) -> None:
+        app.router.add_route("*", "/api/{method}", self._handle_api)
+        app.router.add_get("/socket-mode", self._handle_socket)
+
+    def next_ts(self) -> str:
+        n = next(self._ts)
+        return f"{1_700_000_000 + n // 1_000_000}.{n % 1_000_000:06d}"
+
+    def add_message(self, channel: str, message: SlackMessageData) -> SlackMessageData:
+        """Stores a message, e.g. to seed a thread that the bot will read, and returns it."""
+        message = {"type": "message", "team": TEAM_ID, "ts": self.next_ts(), **message}
+        self._messages[channel][message["ts"]] = message
+        return message
+
+    async def wait_connected(self, connections: int = 1, timeout: float = 30) -> None:
+        """Waits until the bot has opened `connections` Socket Mode connections."""
+        deadline = time.monotonic() + timeout
+        while len(self._sockets) < connections:
+            if time.monotonic() > deadline:
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(0.01)
+
+    async def refresh(self, connection: int = 0) -> None:
+        """Asks the bot to replace a connection, like Slack's periodic refreshes do."""
+        await self._sockets[connection].send_json(
+            {"type": "disconnect", "reason": "refresh_requested"}
+        )
+
+    async def send_event(self, event: t.Dict[str, t.Any], connection: int = -1) -> str:
+        """
+        Delivers an Events API event over one of the bot's Socket Mode
+        connections, the most recently opened one by default, and returns its
+        event_id.
+        """
+        if not self._sockets:
+            raise Exception("No bot is connected over Socket Mode")
+
+        if event.get("type") == "message" and event.get("ts") and event.get("channel"):
+            self._messages[event["channel"]][event["ts"]] = {
+                k: v for k, v in event.items() if k not in ("channel", "event_ts")
+            }
+
+        event_id = f"Ev{next(self._event_ids):010d}"
+        envelope_id = str(uuid.uuid4())
+        self._envelopes[envelope_id] = event_id
+        await self._sockets[connection].send_json(
+            {
+                "envelope_id": envelope_id,
+                "type": "events_api",
+                "accepts_response_payload": False,
+                "retry_attempt": 0,
+                "retry_reason": "",
+                "payload": {
+                    "token": "benchmark",
+                    "team_id": TEAM_ID,
+                    "api_app_id": APP_ID,
+                    "event": event,
+                    "type": "event_callback",
+                    "event_id": event_id,
+                    "event_time": int(time.time()),
+                    "authorizations": [
+                        {"team_id": TEAM_ID, "user_id": BOT_USER_ID, "is_bot": True}
+                    ],
+                },
+            }
+        )
+        return event_id
+
+    async def _handle_socket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.append(ws)
+        await ws.send_json(
+            {"type": "hello", "num_connections": 1, "connection_info": {"app_id": APP_ID}}
+        )
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                envelope_id = json.loads(message.data).get("envelope_id")
+                if envelope_id in self._envelopes:
+                    self.acks[self._envelopes.pop(envelope_id)] = time.perf_counter()
+        finally:
+            self._sockets.remove(ws)
+        return ws
+
+    async def _handle_api(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await _read_params(request)
+        self.calls[method] += 1
+
+        if method not in SETUP_METHODS:
+            fault = await self.delay()
+            if fault == "ratelimited":
+                return web.json_response(
+                    {"ok": False, "error": "ratelimited"},
+                    status=429,
+                    headers={"Retry-After": str(self.profile.retry_after_seconds)},
+                )
+            if fault == "error":
+                return web.json_response({"ok": False, "error": "fatal_error"}, status=500)
+
+        api_method = getattr(self, f"_api_{method.replace('.', '_')}", None)
+        response = api_method(params) if api_method else {"ok": True}
+        return web.json_response(response)
+
+    def _api_auth_test(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        return {
+            "ok": True,
+            "url": "https://benchmark.slack.com/",
+            "team": "benchmark",
+            "user": "benchmark-bot",
+            "team_id": TEAM_ID,
+            "user_id": BOT_USER_ID,
+            "bot_id": BOT_ID,
+        }
+
+    def _api_apps_connections_open(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        return {"ok": True, "url": f"ws{self.url[len('http'):]}/socket-mode"}
+
+    def _api_chat_postMessage(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        channel = params["channel"]
+        message = {
+            "user": BOT_USER_ID,
+            "bot_id": BOT_ID,
+            "app_id": APP_ID,
+            "text": params.get("text", ""),
+        }
+        for key in ("blocks", "thread_ts"):
+            if params.get(key):
+                message[key] = params[key]
+        message = self.add_message(channel, message)
+        return {"ok": True, "channel": channel, "ts": message["ts"], "message": message}
+
+    def _api_chat_update(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        channel, ts = params["channel"], params["ts"]
+        message = self._messages[channel].get(ts)
+        if message is None:
+            return {"ok": False, "error": "message_not_found"}
+        for key in ("text", "blocks"):
+            if key in params:
+                message[key] = params[key]
+        return {
+            "ok": True,
+            "channel": channel,
+            "ts": ts,
+            "text": message["text"],
+            "message": message,
+        }
+
+    def _api_chat_getPermalink(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        channel, ts = params["channel"], params["message_ts"]
+        return {
+            "ok": True,
+            "channel": channel,
+            "permalink": f"https://benchmark.slack.com/archives/{channel}/p{ts.replace('.', '')}",
+        }
+
+    def _api_users_info(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        return {"ok": True, "user": _user(params["user"])}
+
+    def _api_users_list(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        members = [_user(f"U{i:08d}") for i in range(int(params.get("limit") or 200))]
+        return {"ok": True, "members": members, "response_metadata": {"next_cursor": ""}}
+
+    def _api_conversations_history(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        inclusive = str(params.get("inclusive", "")).lower() in ("1", "true")
+        latest, oldest = params.get("latest"), params.get("oldest")
+        messages = [
+            message
+            for ts, message in sorted(self._messages[params["channel"]].items(), reverse=True)
+            if message.get("thread_ts", ts) == ts
+            and (latest is None or ts < latest or (inclusive and ts == latest))
+            and (oldest is None or ts > oldest or (inclusive and ts == oldest))
+        ]
+        return _page(messages, params)
+
+    def _api_conversations_replies(self, params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        thread_ts = params["ts"]
+        messages = [
+            message
+            for ts, message in sorted(self._messages[params["channel"]].items())
+            if ts == thread_ts or message.get("thread_ts") == thread_ts
+        ]
+        if not messages:
+            return {"ok": False, "error": "thread_not_found"}
+        return _page(messages, params)
+
+
+async def _read_params(request: web.Request) -> t.Dict[str, t.Any]:
+    params: t.Dict[str, t.Any] = dict(request.query)
+    if request.content_type == "application/json":
+        params.update(await request.json())
+    elif request.can_read_body:
+        params.update(await request.post())
+    # Structured arguments are JSON encoded when sent as form parameters.
+    for key in ("blocks", "attachments"):
+        if isinstance(params.get(key), str):
+            params[key] = json.loads(params[key])
+    return params
+
+
+def _page(messages: t.List[SlackMessageData], params: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    offset = int(params.get("cursor") or 0)
+    limit = int(params.get("limit") or 100)
+    next_offset = offset + limit
+    has_more = next_offset < len(messages)
+    return {
+        "ok": True,
+        "messages": messages[offset:next_offset],
+        "has_more": has_more,
+        "response_metadata": {"next_cursor": str(next_offset) if has_more else ""},
+    }
+
+
+def _user(user_id: str) -> t.Dict[str, t.Any]:
+    name = f"user-{user_id.lower()}"
+    return {
+        "id": user_id,
+        "team_id": TEAM_ID,
+        "name": name,
+        "real_name": name,
+        "profile": {"display_name": name, "real_name": name},
+    }
@@ -0,0 +1,82 @@
+import asyncio
+import random
+import typing as t
+from logging import getLogger
+
+from aiohttp import web
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+
+class FaultProfile(BaseModel):
+    # Median response latency, in milliseconds.
+    latency_ms: float = 20
+
+    # Spread of response latencies. Latencies are log-normally distributed
+    # around the median with this sigma, so a few responses are much slower.
+    latency_sigma: float = 0.5
+
+    # Fraction of requests that fail with a server error.
+    error_rate: float = 0
+
+    # Fraction of requests that are rejected with a 429.
+    rate_limit_rate: float = 0
+
+    # Retry-After returned with 429 responses, in seconds.
+    retry_after_seconds: int = 1
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Returns a response latency, in seconds."""
+        if self.latency_ms <= 0:
+            return 0
+        return self.latency_ms / 1000 * rng.lognormvariate(0, self.latency_sigma)
+
+    def sample_fault(self, rng: random.Random) -> t.Optional[str]:
+        """Returns the fault to inject into a response: "error", "ratelimited" or None."""
+        roll = rng.random()
+        if roll < self.error_rate:
+            return "error"
+        if roll < self.error_rate + self.rate_limit_rate:
+            return "ratelimited"
+        return None
+
+
+class FakeServer:
+    """
+    FakeServer is the base of the local servers that stand in for external APIs
+    in benchmarks. It listens on an ephemeral port and delays responses and
+    injects faults according to a FaultProfile.
+    """
+
+    def __init__(self, profile: t.Optional[FaultProfile] = None, seed: int = 0) -> None:
+        self.profile = profile or FaultProfile()
+        self.url = ""
+        self._random = random.Random(seed)
+        self._runner: t.Optional[web.AppRunner] = None
+
+    def add_routes(self, app: web.Application) -> None:
+        raise NotImplementedError
+
+    async def start(self, host: str = "127.0.0.1") -> str:
+        app = web.Application()
+        self.add_routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, 0).start()
+        _, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        logger.debug(f"Started {self.__class__.__name__} on {self.url}")
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def delay(self) -> t.Optional[str]:
+        """Waits for a sampled response latency, then returns the fault to inject, if any."""
+        latency = self.profile.sample_latency(self._random)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return self.profile.sample_fault(self._random)
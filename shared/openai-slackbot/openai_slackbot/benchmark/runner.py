@@ -0,0 +1,251 @@
+import asyncio
+import contextlib
+import os
+import tempfile
+import time
+import typing as t
+from logging import getLogger
+
+from openai_slackbot.benchmark.fake_openai import FakeOpenAIServer
+from openai_slackbot.benchmark.fake_slack import SETUP_METHODS, FakeSlackServer
+from openai_slackbot.benchmark.fakes import FaultProfile
+from openai_slackbot.benchmark.scenarios import BotSetup, Scenario
+from openai_slackbot.bot import init_bot
+from openai_slackbot.clients.http import HTTPConfig, close_http_session
+from openai_slackbot.handlers import BaseHandler
+from pydantic import BaseModel
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_bolt.app.async_app import AsyncApp
+
+logger = getLogger(__name__)
+
+# Environment the bots read their tokens and the OpenAI base URL from.
+BENCHMARK_ENV = {
+    "SLACK_BOT_TOKEN": "xoxb-benchmark",
+    "SOCKET_APP_TOKEN": "xapp-benchmark",
+    "OPENAI_API_KEY": "sk-benchmark",
+}
+
+
+class BenchmarkConfig(BaseModel):
+    # Number of synthetic events to deliver.
+    events: int = 100
+
+    # Events delivered per second. If not set, all events are delivered at once.
+    rate_per_second: t.Optional[float] = 10
+
+    # Latencies and faults of the fake Slack Web API.
+    slack: FaultProfile = FaultProfile(latency_ms=30)
+
+    # Latencies and faults of the fake OpenAI API.
+    openai: FaultProfile = FaultProfile(latency_ms=500)
+
+    # Seconds to wait for events still being handled after the last one was delivered.
+    drain_timeout_seconds: float = 300
+
+    # Seed for sampled latencies and faults.
+    seed: int = 0
+
+
+class BenchmarkResult:
+    def __init__(
+        self,
+        *,
+        scenario: str,
+        events: int,
+        duration_seconds: float,
+        latencies: t.List[float],
+        ack_latencies: t.List[float],
+        slack_calls: t.Dict[str, int],
+        openai_calls: int,
+    ) -> None:
+        self.scenario = scenario
+        self.events = events
+        self.completed = len(latencies)
+        self.duration_seconds = duration_seconds
+        self.latencies = sorted(latencies)
+        self.ack_latencies = sorted(ack_latencies)
+        self.slack_calls = slack_calls
+        self.openai_calls = openai_calls
+
+    @property
+    def events_per_second(self) -> float:
+        return self.completed / self.duration_seconds if self.duration_seconds else 0
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        per_event = max(self.completed, 1)
+        return {
+            "scenario": self.scenario,
+            "events": self.events,
+            "completed": self.completed,
+            "duration_seconds": round(self.duration_seconds, 3),
+            "events_per_second": round(self.events_per_second, 2),
+            "latency_seconds": _percentiles(self.latencies),
+            "ack_latency_seconds": _percentiles(self.ack_latencies),
+            "slack_calls_per_event": round(sum(self.slack_calls.values()) / per_event, 2),
+            "openai_calls_per_event": round(self.openai_calls / per_event, 2),
+            "slack_calls": dict(sorted(self.slack_calls.items())),
+        }
+
+    def format(self) -> str:
+        result = self.to_dict()
+        lines = [
+            f"scenario:               {result['scenario']}",
+            f"events:                 {result['completed']}/{result['events']} completed"
+            f" in {result['duration_seconds']}s",
+            f"throughput:             {result['events_per_second']} events/s",
+        ]
+        for name, key in (("latency", "latency_seconds"), ("ack latency", "ack_latency_seconds")):
+            percentiles = ", ".join(f"{p} {v * 1000:.0f}ms" for p, v in result[key].items())
+            lines.append(f"{name + ':':<24}{percentiles}")
+        lines.append(f"slack calls per event:  {result['slack_calls_per_event']}")
+        lines.append(f"openai calls per event: {result['openai_calls_per_event']}")
+        for method, count in result["slack_calls"].items():
+            lines.append(f"  {method:<22}{count}")
+        return "\n".join(lines)
+
+
+class _CompletionRecorder:
+    def __init__(self) -> None:
+        self.completed: t.Dict[str, float] = {}
+        self._expected = 0
+        self._done = asyncio.Event()
+
+    def instrument(self, handler_class: t.Type[BaseHandler]) -> t.Type[BaseHandler]:
+        """Returns a subclass of the handler that records when each event is done."""
+        recorder = self
+
+        class Instrumented(handler_class):  # type: ignore[valid-type, misc]
+            async def _maybe_handle(self, args, root=None):
+                try:
+                    return await super()._maybe_handle(args, root)
+                finally:
+                    recorder.complete(args.body.get("event_id"))
+
+        # Handler settings such as the executor's per-handler concurrency are keyed by name.
+        Instrumented.__name__ = Instrumented.__qualname__ = handler_class.__name__
+        return Instrumented
+
+    def complete(self, event_id: t.Optional[str]) -> None:
+        if event_id is not None:
+            self.completed[event_id] = time.perf_counter()
+        if self._expected and len(self.completed) >= self._expected:
+            self._done.set()
+
+    async def wait(self, expected: int, timeout: float) -> None:
+        self._expected = expected
+        if len(self.completed) >= expected:
+            return
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Only {len(self.completed)} of {expected} events were handled in time")
+
+
+async def init_scenario_bot(
+    bot: BotSetup,
+    slack: FakeSlackServer,
+    instrument: t.Callable[[t.Type[BaseHandler]], t.Type[BaseHandler]] = lambda handler: handler,
+) -> AsyncApp:
+    """Runs init_bot for a scenario's bot against the fake Slack server."""
+    http_config = getattr(bot.config, "http", None) or HTTPConfig()
+    return await init_bot(
+        openai_organization_id=bot.config.openai_organization_id,
+        slack_message_handlers=[instrument(handler) for handler in bot.message_handlers],
+        slack_action_handlers=[instrument(handler) for handler in bot.action_handlers],
+        slack_template_path=bot.template_path,
+        llm_config=getattr(bot.config, "llm", None),
+        http_config=http_config.model_copy(update={"slack_api_url": slack.api_url}),
+        user_directory_config=getattr(bot.config, "users", None),
+        executor_config=getattr(bot.config, "executor", None),
+        dedup_config=getattr(bot.config, "dedup", None),
+    )
+
+
+async def run_benchmark(scenario: Scenario, config: BenchmarkConfig) -> BenchmarkResult:
+    """
+    Runs a bot's real init_bot wiring against local fake Slack and OpenAI
+    servers, delivers `config.events` synthetic events over Socket Mode and
+    measures how long the bot takes to handle them.
+    """
+    slack = FakeSlackServer(config.slack, seed=config.seed)
+    openai = FakeOpenAIServer(config.openai, seed=config.seed + 1, responder=scenario.respond)
+    await slack.start()
+    await openai.start()
+
+    recorder = _CompletionRecorder()
+    socket_mode_handler: t.Optional[AsyncSocketModeHandler] = None
+    try:
+        with _environ({**BENCHMARK_ENV, "OPENAI_BASE_URL": openai.api_url}):
+            with tempfile.TemporaryDirectory() as work_dir:
+                bot = scenario.setup(work_dir, slack)
+                app = await init_scenario_bot(bot, slack, instrument=recorder.instrument)
+                socket_mode_handler = AsyncSocketModeHandler(app, BENCHMARK_ENV["SOCKET_APP_TOKEN"])
+                await socket_mode_handler.connect_async()
+                await slack.wait_connected()
+
+                slack.calls.clear()
+                openai.calls.clear()
+                sent: t.Dict[str, float] = {}
+                start = time.perf_counter()
+                for i in range(config.events):
+                    if config.rate_per_second:
+                        await asyncio.sleep(
+                            max(0, start + i / config.rate_per_second - time.perf_counter())
+                        )
+                    event = scenario.make_event(i, slack)
+                    sent_at = time.perf_counter()
+                    sent[await slack.send_event(event)] = sent_at
+
+                await recorder.wait(config.events, config.drain_timeout_seconds)
+                duration = time.perf_counter() - start
+    finally:
+        if socket_mode_handler is not None:
+            await socket_mode_handler.close_async()
+        await close_http_session()
+        await slack.stop()
+        await openai.stop()
+
+    return BenchmarkResult(
+        scenario=scenario.name,
+        events=config.events,
+        duration_seconds=duration,
+        latencies=[
+            recorder.completed[event_id] - sent_at
+            for event_id, sent_at in sent.items()
+            if event_id in recorder.completed
+        ],
+        ack_latencies=[
+            slack.acks[event_id] - sent_at
+            for event_id, sent_at in sent.items()
+            if event_id in slack.acks
+        ],
+        slack_calls={
+            method: count for method, count in slack.calls.items() if method not in SETUP_METHODS
+        },
+        openai_calls=sum(openai.calls.values()),
+    )
+
+
+@contextlib.contextmanager
+def _environ(values: t.Dict[str, str]) -> t.Iterator[None]:
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _percentiles(values: t.List[float]) -> t.Dict[str, float]:
+    """Returns the nearest-rank p50, p95 and p99 of sorted `values`."""
+    if not values:
+        return {}
+    return {
+        f"p{p}": round(values[min(len(values) - 1, max(0, -(-p * len(values) // 100) - 1))], 4)
+        for p in (50, 95, 99)
+    }
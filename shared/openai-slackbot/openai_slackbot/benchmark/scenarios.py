@@ -0,0 +1,224 @@
+import abc
+import json
+import os
+import typing as t
+import uuid
+
+from openai_slackbot.benchmark.fake_openai import default_responder
+from openai_slackbot.benchmark.fake_slack import BOT_ID, BOT_USER_ID, FakeSlackServer
+from openai_slackbot.handlers import BaseActionHandler, BaseMessageHandler
+
+
+class BotSetup(t.NamedTuple):
+    message_handlers: t.List[t.Type[BaseMessageHandler]]
+    action_handlers: t.List[t.Type[BaseActionHandler]]
+    template_path: str
+    # The bot's loaded config. Its shared library settings (llm, http, users,
+    # executor and dedup) are passed to init_bot like the bot itself does.
+    config: t.Any
+
+
+class Scenario(abc.ABC):
+    """
+    Scenario wires a bot up against the fake servers and generates the
+    synthetic events and LLM answers of a benchmark run.
+    """
+
+    name: str
+
+    # Module that starts the bot, imported to measure the bot's import time.
+    bot_module: t.Optional[str] = None
+
+    # Seconds from starting the bot's process until it is connected to Slack
+    # that the startup benchmark allows.
+    startup_budget_seconds: t.Optional[float] = None
+
+    @abc.abstractmethod
+    def setup(self, work_dir: str, slack: FakeSlackServer) -> BotSetup:
+        """Loads the bot's config, seeds any state it needs and returns its handlers."""
+        ...
+
+    @abc.abstractmethod
+    def make_event(self, i: int, slack: FakeSlackServer) -> t.Dict[str, t.Any]:
+        """Returns the `i`th synthetic event to deliver to the bot."""
+        ...
+
+    def respond(self, request: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        """Returns the assistant message to answer a chat completion request with."""
+        return default_responder(request)
+
+
+def user_id(i: int) -> str:
+    return f"U{i:08d}"
+
+
+def function_call(name: str, arguments: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    return {
+        "role": "assistant",
+        "content": None,
+        "function_call": {"name": name, "arguments": json.dumps(arguments)},
+    }
+
+
+TRIAGE_CONFIG = """
+openai_organization_id = "org-benchmark"
+openai_prompt = "Triage the following request into appsec, privacy or physical_security."
+inbound_request_channel_id = "C0INBOUND"
+feed_channel_id = "C0FEED"
+other_category_enabled = true
+
+[[ categories ]]
+key = "appsec"
+display_name = "Application Security"
+oncall_slack_id = "U0APPSEC"
+autorespond = false
+
+[[ categories ]]
+key = "privacy"
+display_name = "Privacy"
+oncall_slack_id = "U0PRIVACY"
+autorespond = false
+
+[[ categories ]]
+key = "physical_security"
+display_name = "Physical Security"
+autorespond = true
+autorespond_message = "Please reach out to physical-security@company.com."
+"""
+
+
+class TriageScenario(Scenario):
+    """Inbound requests posted to the triage bot's inbound channel."""
+
+    name = "triage"
+    bot_module = "triage_slackbot.bot"
+    startup_budget_seconds = 1.5
+    categories = ("appsec", "privacy", "physical_security")
+
+    def setup(self, work_dir: str, slack: FakeSlackServer) -> BotSetup:
+        from triage_slackbot import handlers
+        from triage_slackbot.config import load_config
+        from triage_slackbot.handlers import (
+            InboundRequestAcknowledgeHandler,
+            InboundRequestHandler,
+            InboundRequestRecategorizeHandler,
+            InboundRequestRecategorizeSelectConversationHandler,
+            InboundRequestRecategorizeSelectHandler,
+        )
+
+        config_path = os.path.join(work_dir, "triage.toml")
+        with open(config_path, "w") as f:
+            f.write(TRIAGE_CONFIG)
+        config = load_config(config_path)
+        self._channel = config.inbound_request_channel_id
+
+        return BotSetup(
+            message_handlers=[InboundRequestHandler],
+            action_handlers=[
+                InboundRequestAcknowledgeHandler,
+                InboundRequestRecategorizeHandler,
+                InboundRequestRecategorizeSelectHandler,
+                InboundRequestRecategorizeSelectConversationHandler,
+            ],
+            template_path=os.path.join(os.path.dirname(handlers.__file__), "templates"),
+            config=config,
+        )
+
+    def make_event(self, i: int, slack: FakeSlackServer) -> t.Dict[str, t.Any]:
+        ts = slack.next_ts()
+        category = self.categories[i % len(self.categories)]
+        return {
+            "type": "message",
+            "channel": self._channel,
+            "channel_type": "channel",
+            "user": user_id(i % 50),
+            "text": f"Could someone from {category} take a look at request {i}?",
+            "client_msg_id": str(uuid.uuid4()),
+            "ts": ts,
+            "event_ts": ts,
+        }
+
+    def respond(self, request: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        if request.get("function_call") == {"name": "get_predicted_category"}:
+            content = request["messages"][-1]["content"]
+            category = next((c for c in self.categories if c in content), self.categories[0])
+            return function_call("get_predicted_category", {"category": category})
+        return super().respond(request)
+
+
+INCIDENT_CONFIG = """
+openai_organization_id = "org-benchmark"
+feed_channel_id = "C0FEED"
+"""
+
+
+class IncidentScenario(Scenario):
+    """Direct messages from users that the incident response bot is chatting with."""
+
+    name = "incident"
+    bot_module = "incident_response_slackbot.bot"
+    startup_budget_seconds = 1.5
+    users = 20
+
+    def setup(self, work_dir: str, slack: FakeSlackServer) -> BotSetup:
+        from incident_response_slackbot import handlers
+        from incident_response_slackbot.config import load_config
+
+        config_path = os.path.join(work_dir, "incident.toml")
+        with open(config_path, "w") as f:
+            f.write(INCIDENT_CONFIG)
+        config = load_config(config_path)
+
+        # Keep the chat state of the run out of the installed package.
+        handlers.DATABASE.file_path = os.path.join(work_dir, "data.pkl")
+        for i in range(self.users):
+            alert = slack.add_message(
+                config.feed_channel_id,
+                {
+                    "user": BOT_USER_ID,
+                    "bot_id": BOT_ID,
+                    "text": f"Alert for <@{user_id(i)}>",
+                    "blocks": [
+                        {"type": "section", "text": {"type": "mrkdwn", "text": "Alert"}},
+                        {"type": "actions", "elements": []},
+                    ],
+                },
+            )
+            handlers.DATABASE.add(user_id(i), alert["ts"])
+
+        return BotSetup(
+            message_handlers=[handlers.InboundDirectMessageHandler],
+            action_handlers=[
+                handlers.InboundIncidentStartChatHandler,
+                handlers.InboundIncidentDoNothingHandler,
+                handlers.InboundIncidentEndChatHandler,
+            ],
+            template_path=os.path.join(os.path.dirname(handlers.__file__), "templates"),
+            config=config,
+        )
+
+    def make_event(self, i: int, slack: FakeSlackServer) -> t.Dict[str, t.Any]:
+        ts = slack.next_ts()
+        user = user_id(i % self.users)
+        return {
+            "type": "message",
+            "channel": f"D{user[1:]}",
+            "channel_type": "im",
+            "user": user,
+            "text": "Sorry, which alert do you mean?",
+            "client_msg_id": str(uuid.uuid4()),
+            "ts": ts,
+            "event_ts": ts,
+        }
+
+    def respond(self, request: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        if request.get("function_call") == {"name": "is_user_aware"}:
+            # Users never answer, so every chat stays open and each message is nudged.
+            return function_call("is_user_aware", {"has_answered": False, "is_aware": False})
+        return {"role": "assistant", "content": "Were you aware of this alert?"}
+
+
+SCENARIOS: t.Dict[str, t.Type[Scenario]] = {
+    TriageScenario.name: TriageScenario,
+    IncidentScenario.name: IncidentScenario,
+}
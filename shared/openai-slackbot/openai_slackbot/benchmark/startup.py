@@ -0,0 +1,145 @@
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+
+# This module is also the entry point of the measured bot process, so it only
+# imports the standard library up front to keep the bot's imports cold.
+if t.TYPE_CHECKING:
+    from openai_slackbot.benchmark.scenarios import Scenario
+
+# Phases of a bot's startup, in order. Together they are its time to ready.
+PHASES = ("interpreter", "import", "init", "connect")
+
+
+class StartupResult:
+    def __init__(
+        self,
+        *,
+        scenario: str,
+        samples: t.List[t.Dict[str, float]],
+        budget_seconds: t.Optional[float],
+    ) -> None:
+        self.scenario = scenario
+        self.samples = samples
+        self.budget_seconds = budget_seconds
+
+    @property
+    def time_to_ready(self) -> float:
+        """Median seconds from starting the bot's process until it is connected to Slack."""
+        return statistics.median(sum(sample[phase] for phase in PHASES) for sample in self.samples)
+
+    @property
+    def within_budget(self) -> bool:
+        return self.budget_seconds is None or self.time_to_ready <= self.budget_seconds
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "scenario": self.scenario,
+            "runs": len(self.samples),
+            "time_to_ready_seconds": round(self.time_to_ready, 3),
+            "budget_seconds": self.budget_seconds,
+            "within_budget": self.within_budget,
+            "phase_seconds": {
+                phase: round(statistics.median(sample[phase] for sample in self.samples), 3)
+                for phase in PHASES
+            },
+        }
+
+    def format(self) -> str:
+        result = self.to_dict()
+        budget = result["budget_seconds"]
+        lines = [
+            f"scenario:               {result['scenario']}",
+            f"time to ready:          {result['time_to_ready_seconds'] * 1000:.0f}ms"
+            f" (median of {result['runs']} runs)",
+            f"budget:                 "
+            + (f"{budget * 1000:.0f}ms" if budget is not None else "none")
+            + ("" if result["within_budget"] else " EXCEEDED"),
+        ]
+        for phase, seconds in result["phase_seconds"].items():
+            lines.append(f"  {phase:<22}{seconds * 1000:.0f}ms")
+        return "\n".join(lines)
+
+
+def measure_startup(scenario: "Scenario", runs: int = 5) -> StartupResult:
+    """
+    Starts the scenario's bot `runs` times, each in a fresh Python process
+    against a fake Slack server, and measures how long it takes to import the
+    bot, initialize it and connect to Slack over Socket Mode.
+    """
+    from openai_slackbot.benchmark.runner import BENCHMARK_ENV
+
+    if not scenario.bot_module:
+        raise ValueError(f"Scenario {scenario.name} has no bot module to start")
+
+    samples = []
+    for _ in range(runs):
+        started_at = time.time()
+        process = subprocess.run(
+            [sys.executable, "-m", __name__, scenario.name, scenario.bot_module],
+            env={**os.environ, **BENCHMARK_ENV},
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise Exception(f"Starting the {scenario.name} bot failed:\n{process.stderr}")
+
+        sample = json.loads(process.stdout.strip().splitlines()[-1])
+        sample["interpreter"] = sample.pop("started_at") - started_at
+        samples.append(sample)
+
+    return StartupResult(
+        scenario=scenario.name, samples=samples, budget_seconds=scenario.startup_budget_seconds
+    )
+
+
+def _start_bot(scenario_name: str, bot_module: str) -> t.Dict[str, float]:
+    started_at = time.time()
+    start = time.perf_counter()
+    importlib.import_module(bot_module)
+    imported = time.perf_counter()
+
+    import asyncio
+
+    phases = asyncio.run(_init_and_connect(scenario_name))
+    return {"started_at": started_at, "import": imported - start, **phases}
+
+
+async def _init_and_connect(scenario_name: str) -> t.Dict[str, float]:
+    from openai_slackbot.benchmark.fake_slack import FakeSlackServer
+    from openai_slackbot.benchmark.runner import init_scenario_bot
+    from openai_slackbot.benchmark.scenarios import SCENARIOS
+    from openai_slackbot.clients.http import close_http_session
+    from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+
+    slack = FakeSlackServer()
+    await slack.start()
+    socket_mode_handler = None
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            start = time.perf_counter()
+            bot = SCENARIOS[scenario_name]().setup(work_dir, slack)
+            app = await init_scenario_bot(bot, slack)
+            initialized = time.perf_counter()
+
+            socket_mode_handler = AsyncSocketModeHandler(app, os.environ["SOCKET_APP_TOKEN"])
+            await socket_mode_handler.connect_async()
+            await slack.wait_connected()
+            connected = time.perf_counter()
+    finally:
+        if socket_mode_handler is not None:
+            await socket_mode_handler.close_async()
+        await close_http_session()
+        await slack.stop()
+
+    return {"init": initialized - start, "connect": connected - initialized}
+
+
+if __name__ == "__main__":
+    print(json.dumps(_start_bot(sys.argv[1], sys.argv[2])))
@@ -1,9 +1,51 @@
+import asyncio
+import signal
 import typing as t
 from logging import getLogger
 
-import openai
-from openai_slackbot.clients.slack import SlackClient
-from openai_slackbot.handlers import BaseActionHandler, BaseMessageHandler
+from openai_slackbot.clients.http import (
+    HTTPConfig,
+    close_http_session,
+    create_slack_web_client,
+    init_http_session,
+)
+from openai_slackbot.clients.llm import LLMConfig, init_llm_client
+from openai_slackbot.clients.outbox import OutboxConfig
+from openai_slackbot.clients.ratelimit import SlackRateLimiter
+from openai_slackbot.clients.slack import SlackClient, init_slack_client
+from openai_slackbot.clients.threads import ThreadCache
+from openai_slackbot.clients.users import UserDirectoryConfig
+from openai_slackbot.handlers import (
+    BaseActionHandler,
+    BaseHandler,
+    BaseMessageHandler,
+    ExecutorConfig,
+    KeyedExecutor,
+    MessageRouter,
+)
+from openai_slackbot.jobs import JobQueue, JobQueueConfig, JobRunner
+from openai_slackbot.metrics import (
+    JOB_QUEUE_LAG,
+    QUEUE_DEPTH,
+    MetricsConfig,
+    start_metrics_server,
+    stop_metrics_server,
+)
+from openai_slackbot.server import (
+    EventsConfig,
+    EventsMode,
+    SocketModeMonitor,
+    run_workers,
+    start_http_app,
+)
+from openai_slackbot.shutdown import (
+    GracefulShutdown,
+    ShutdownConfig,
+    get_graceful_shutdown,
+    init_graceful_shutdown,
+)
+from openai_slackbot.tracing import TracingConfig, init_tracing
+from openai_slackbot.utils.dedup import DedupConfig, EventDeduplicator
 from openai_slackbot.utils.envvars import string
 from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
 from slack_bolt.app.async_app import AsyncApp
@@ -14,64 +56,272 @@ logger = getLogger(__name__)
 async def register_app_handlers(
     *,
     app: AsyncApp,
-    message_handler: t.Optional[t.Type[BaseMessageHandler]],
+    message_handlers: t.List[t.Type[BaseMessageHandler]],
     action_handlers: t.List[t.Type[BaseActionHandler]],
     slack_client: SlackClient,
-):
-    if message_handler:
-        app.event("message")(message_handler(slack_client).maybe_handle)
+    executor_config: t.Optional[ExecutorConfig] = None,
+    dedup_config: t.Optional[DedupConfig] = None,
+    graceful_shutdown: t.Optional[GracefulShutdown] = None,
+    job_runner: t.Optional[JobRunner] = None,
+) -> t.Optional[KeyedExecutor]:
+    # Without an executor config, handlers run inline on the Bolt listener.
+    executor = KeyedExecutor(executor_config) if executor_config else None
+    deduplicator = EventDeduplicator(dedup_config) if dedup_config else None
+
+    def bind(handler: BaseHandler) -> BaseHandler:
+        if deduplicator:
+            handler.use_deduplicator(deduplicator)
+        if graceful_shutdown:
+            graceful_shutdown.register(handler)
+        if job_runner:
+            job_runner.register(handler)
+        if executor and executor_config:
+            handler.use_executor(executor)
+            handler_name = handler.__class__.__name__
+            if handler_name in executor_config.handler_concurrency:
+                executor.set_handler_concurrency(
+                    handler_name, executor_config.handler_concurrency[handler_name]
+                )
+        return handler
+
+    if message_handlers:
+        router = MessageRouter()
+        for message_handler in message_handlers:
+            router.add(bind(message_handler(slack_client)))
+        app.event("message")(router.dispatch)
 
     if action_handlers:
         for action_handler in action_handlers:
-            handler = action_handler(slack_client)
+            handler = bind(action_handler(slack_client))
             app.action(handler.action_id)(handler.maybe_handle)
 
+    return executor
+
 
 async def init_bot(
     *,
     openai_organization_id: str,
-    slack_message_handler: t.Optional[t.Type[BaseMessageHandler]],
+    slack_message_handlers: t.List[t.Type[BaseMessageHandler]],
     slack_action_handlers: t.List[t.Type[BaseActionHandler]],
     slack_template_path: str,
+    llm_config: t.Optional[LLMConfig] = None,
+    http_config: t.Optional[HTTPConfig] = None,
+    user_directory_config: t.Optional[UserDirectoryConfig] = None,
+    executor_config: t.Optional[ExecutorConfig] = None,
+    dedup_config: t.Optional[DedupConfig] = None,
+    metrics_config: t.Optional[MetricsConfig] = None,
+    tracing_config: t.Optional[TracingConfig] = None,
+    events_config: t.Optional[EventsConfig] = None,
+    shutdown_config: t.Optional[ShutdownConfig] = None,
+    job_queue_config: t.Optional[JobQueueConfig] = None,
+    outbox_config: t.Optional[OutboxConfig] = None,
 ):
+    events_config = events_config or EventsConfig()
     slack_bot_token = string("SLACK_BOT_TOKEN")
     openai_api_key = string("OPENAI_API_KEY")
 
     # Init OpenAI API
-    openai.organization = openai_organization_id
-    openai.api_key = openai_api_key
+    llm_client = init_llm_client(
+        api_key=openai_api_key, organization=openai_organization_id, config=llm_config
+    )
+
+    init_tracing(tracing_config)
 
     # Init slack bot
-    app = AsyncApp(token=slack_bot_token)
-    slack_client = SlackClient(app.client, slack_template_path)
-    await register_app_handlers(
+    http_config = http_config or HTTPConfig()
+    await init_http_session(http_config)
+    slack_web_client = create_slack_web_client(slack_bot_token, base_url=http_config.slack_api_url)
+    if events_config.mode == EventsMode.http:
+        app = AsyncApp(client=slack_web_client, signing_secret=string("SLACK_SIGNING_SECRET"))
+        # Each HTTP worker gets its share of the workspace's rate limits.
+        rate_limit_share = 1 / events_config.workers
+        # A worker only sees its own posts and the events routed to it, so its
+        # cached threads can miss messages handled by the other workers.
+        thread_cache = ThreadCache(max_threads=0) if events_config.workers > 1 else None
+    else:
+        app = AsyncApp(client=slack_web_client)
+        rate_limit_share = 1.0
+        thread_cache = None
+    slack_client = init_slack_client(
+        app.client,
+        slack_template_path,
+        rate_limiter=SlackRateLimiter(share=rate_limit_share),
+        user_directory_config=user_directory_config,
+        outbox_config=outbox_config,
+        thread_cache=thread_cache,
+    )
+    await slack_client.warm_up()
+    app.use(slack_client.observe_message_events)
+    if user_directory_config and user_directory_config.prefetch:
+        slack_client.users.start_prefetch()
+    graceful_shutdown = init_graceful_shutdown(shutdown_config)
+    job_queue = JobQueue(job_queue_config) if job_queue_config else None
+    job_runner = JobRunner(job_queue, job_queue_config) if job_queue else None
+    executor = await register_app_handlers(
         app=app,
-        message_handler=slack_message_handler,
+        message_handlers=slack_message_handlers,
         action_handlers=slack_action_handlers,
         slack_client=slack_client,
+        executor_config=executor_config,
+        dedup_config=dedup_config,
+        graceful_shutdown=graceful_shutdown,
+        job_runner=job_runner,
     )
+    graceful_shutdown.use_outbox(slack_client.outbox)
+    slack_client.outbox.start()
+    if job_runner:
+        graceful_shutdown.use_job_runner(job_runner)
+        job_runner.start()
+    graceful_shutdown.replay()
+
+    # Init metrics
+    QUEUE_DEPTH.set_function(llm_client.gateway.queue_depth, queue="llm_gateway")
+    if executor:
+        QUEUE_DEPTH.set_function(lambda: executor.stats()["pending"], queue="handler_executor")
+    QUEUE_DEPTH.set_function(slack_client.outbox.pending, queue="slack_outbox")
+    if job_queue:
+        QUEUE_DEPTH.set_function(lambda: job_queue.stats()["available"], queue="jobs")
+        JOB_QUEUE_LAG.set_function(job_queue.lag)
+    if metrics_config and metrics_config.enabled:
+        await start_metrics_server(metrics_config)
+
+    # The OpenAI client loads while the bot connects to Slack.
+    llm_client.start_preload()
 
     return app
 
 
-async def start_app(app):
+async def start_app(app, events_config: t.Optional[EventsConfig] = None):
+    events_config = events_config or EventsConfig()
     socket_app_token = string("SOCKET_APP_TOKEN")
-    handler = AsyncSocketModeHandler(app, socket_app_token)
-    await handler.start_async()
+
+    # Every connection dispatches to the same app, so they share its handlers and executor.
+    handlers = []
+    for connection in range(events_config.connections):
+        handler = AsyncSocketModeHandler(app, socket_app_token)
+        SocketModeMonitor(handler.client, connection=str(connection))
+        handlers.append(handler)
+
+    async def connect_staggered():
+        for handler in handlers[1:]:
+            await asyncio.sleep(events_config.connection_stagger_seconds)
+            await handler.connect_async()
+
+    connecting = asyncio.create_task(connect_staggered())
+    try:
+        await handlers[0].start_async()
+    finally:
+        connecting.cancel()
+        for handler in handlers:
+            await handler.close_async()
 
 
 async def start_bot(
     *,
     openai_organization_id: str,
-    slack_message_handler: t.Optional[t.Type[BaseMessageHandler]],
+    slack_message_handlers: t.List[t.Type[BaseMessageHandler]],
     slack_action_handlers: t.List[t.Type[BaseActionHandler]],
     slack_template_path: str,
+    llm_config: t.Optional[LLMConfig] = None,
+    http_config: t.Optional[HTTPConfig] = None,
+    user_directory_config: t.Optional[UserDirectoryConfig] = None,
+    executor_config: t.Optional[ExecutorConfig] = None,
+    dedup_config: t.Optional[DedupConfig] = None,
+    metrics_config: t.Optional[MetricsConfig] = None,
+    tracing_config: t.Optional[TracingConfig] = None,
+    events_config: t.Optional[EventsConfig] = None,
+    shutdown_config: t.Optional[ShutdownConfig] = None,
+    job_queue_config: t.Optional[JobQueueConfig] = None,
+    outbox_config: t.Optional[OutboxConfig] = None,
 ):
+    events_config = events_config or EventsConfig()
     app = await init_bot(
         openai_organization_id=openai_organization_id,
-        slack_message_handler=slack_message_handler,
+        slack_message_handlers=slack_message_handlers,
         slack_action_handlers=slack_action_handlers,
         slack_template_path=slack_template_path,
+        llm_config=llm_config,
+        http_config=http_config,
+        user_directory_config=user_directory_config,
+        executor_config=executor_config,
+        dedup_config=dedup_config,
+        metrics_config=metrics_config,
+        tracing_config=tracing_config,
+        events_config=events_config,
+        shutdown_config=shutdown_config,
+        job_queue_config=job_queue_config,
+        outbox_config=outbox_config,
     )
 
-    await start_app(app)
+    if events_config.mode == EventsMode.http:
+        serving = asyncio.ensure_future(start_http_app(app, events_config))
+    else:
+        serving = asyncio.ensure_future(start_app(app, events_config))
+
+    # SIGTERM stops the bot gracefully, like SIGINT does through asyncio.run.
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    stopping = asyncio.ensure_future(stop.wait())
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    try:
+        await asyncio.wait([serving, stopping], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        stopping.cancel()
+        # Stop receiving events before waiting for the ones being handled.
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+        graceful_shutdown = get_graceful_shutdown()
+        await graceful_shutdown.drain()
+        graceful_shutdown.close()
+        await stop_metrics_server()
+        await close_http_session()
+
+    if not serving.cancelled():
+        # Raises the error that stopped the app, if any.
+        serving.result()
+
+
+def run_bot(
+    *,
+    events_config: t.Optional[EventsConfig] = None,
+    metrics_config: t.Optional[MetricsConfig] = None,
+    **kwargs: t.Any,
+) -> None:
+    """
+    Runs start_bot with `kwargs` until interrupted. In HTTP mode with more than
+    one worker, each worker process runs its own bot, and worker N serves its
+    metrics on the metrics port + N and keeps its outbox and shutdown journal
+    at their paths + ".N". Workers are forked before any event loop is started,
+    so they don't share one.
+    """
+    events_config = events_config or EventsConfig()
+    forks_workers = events_config.mode == EventsMode.http and events_config.workers > 1
+
+    def run(worker: int = 0) -> None:
+        worker_kwargs = dict(kwargs)
+        worker_metrics_config = metrics_config and metrics_config.model_copy(
+            update={"port": metrics_config.port + worker}
+        )
+        if forks_workers:
+            # Each worker delivers every write in its outbox, so workers can't share one.
+            outbox_config = worker_kwargs.get("outbox_config")
+            if outbox_config and outbox_config.path:
+                worker_kwargs["outbox_config"] = outbox_config.model_copy(
+                    update={"path": f"{outbox_config.path}.{worker}"}
+                )
+            shutdown_config = worker_kwargs.get("shutdown_config")
+            if shutdown_config and shutdown_config.journal_path:
+                worker_kwargs["shutdown_config"] = shutdown_config.model_copy(
+                    update={"journal_path": f"{shutdown_config.journal_path}.{worker}"}
+                )
+        asyncio.run(
+            start_bot(
+                events_config=events_config, metrics_config=worker_metrics_config, **worker_kwargs
+            )
+        )
+
+    if forks_workers:
+        run_workers(run, events_config.workers)
+    else:
+        run()
@@ -0,0 +1,77 @@
+import typing as t
+from logging import getLogger
+
+import aiohttp
+from pydantic import BaseModel
+from slack_sdk.web.async_client import AsyncWebClient
+
+logger = getLogger(__name__)
+
+_HTTP_SESSION: t.Optional[aiohttp.ClientSession] = None
+
+
+class HTTPConfig(BaseModel):
+    # Maximum number of open connections across all hosts.
+    limit: int = 100
+
+    # Maximum number of open connections to a single host.
+    limit_per_host: int = 20
+
+    # Seconds an idle connection is kept alive for reuse.
+    keepalive_timeout: float = 60.0
+
+    # Seconds resolved host addresses are cached for.
+    ttl_dns_cache: int = 300
+
+    # Total timeout of a single request, in seconds.
+    timeout_seconds: int = 30
+
+    # Base URL of the Slack Web API. Only changed to point a bot at a fake
+    # Slack server, e.g. in benchmarks.
+    slack_api_url: str = AsyncWebClient.BASE_URL
+
+
+async def init_http_session(config: t.Optional[HTTPConfig] = None) -> aiohttp.ClientSession:
+    """
+    Creates the connection pool shared by every Slack client in the process.
+    A session created earlier is closed, so that its connections aren't leaked.
+    """
+    config = config or HTTPConfig()
+
+    global _HTTP_SESSION
+    if _HTTP_SESSION is not None and not _HTTP_SESSION.closed:
+        logger.warning("HTTP session already initialized, replacing it")
+        await _HTTP_SESSION.close()
+
+    _HTTP_SESSION = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=config.limit,
+            limit_per_host=config.limit_per_host,
+            keepalive_timeout=config.keepalive_timeout,
+            ttl_dns_cache=config.ttl_dns_cache,
+        ),
+        timeout=aiohttp.ClientTimeout(total=config.timeout_seconds),
+    )
+    return _HTTP_SESSION
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed:
+        raise Exception("HTTP session not initialized, call init_http_session() first")
+    return _HTTP_SESSION
+
+
+async def close_http_session() -> None:
+    global _HTTP_SESSION
+    if _HTTP_SESSION is not None:
+        await _HTTP_SESSION.close()
+        _HTTP_SESSION = None
+
+
+def create_slack_web_client(token: str, base_url: str = AsyncWebClient.BASE_URL) -> AsyncWebClient:
+    """Creates a Slack web client that sends its requests over the shared HTTP session."""
+    session = get_http_session()
+    return AsyncWebClient(
+        token=token, base_url=base_url, session=session, timeout=int(session.timeout.total)
+    )
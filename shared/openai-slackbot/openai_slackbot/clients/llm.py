@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+import typing as t
+from logging import getLogger
+
+from openai_slackbot import metrics, tracing
+from openai_slackbot.llm.cache import CacheConfig, CompletionCache
+from openai_slackbot.llm.gateway import GatewayConfig, LLMGateway, Priority, estimate_tokens
+from openai_slackbot.llm.hedging import Hedger, HedgingConfig
+from pydantic import BaseModel
+
+if t.TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from openai.types.chat import ChatCompletion
+
+logger = getLogger(__name__)
+
+_LLM_CLIENT: t.Optional["LLMClient"] = None
+
+
+class LLMConfig(BaseModel):
+    # Per-model concurrency and token budgets for LLM requests.
+    gateway: GatewayConfig = GatewayConfig()
+
+    # Completion cache settings. The cache is disabled if not set.
+    cache: t.Optional[CacheConfig] = None
+
+    # Per-call-site deadlines and fallback models for hedged requests.
+    hedging: HedgingConfig = HedgingConfig()
+
+
+class LazyAsyncOpenAI:
+    """
+    LazyAsyncOpenAI creates an AsyncOpenAI client with the given arguments the
+    first time it is used. Importing the openai package takes most of a bot's
+    startup time, and nothing needs it before the first chat completion.
+    """
+
+    def __init__(self, **kwargs: t.Any) -> None:
+        self._kwargs = kwargs
+        self._client: t.Optional["AsyncOpenAI"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def chat(self) -> t.Any:
+        return self.load().chat
+
+    def load(self) -> "AsyncOpenAI":
+        with self._lock:
+            if self._client is None:
+                from openai import AsyncOpenAI
+
+                self._client = AsyncOpenAI(**self._kwargs)
+            return self._client
+
+
+class LLMClient:
+    """
+    LLMClient wraps the OpenAI AsyncOpenAI implementation so that chat
+    completions can be awaited from Slack handlers without blocking the
+    event loop. Every bot should go through this client instead of
+    calling the openai module directly.
+    """
+
+    def __init__(
+        self,
+        client: t.Union["AsyncOpenAI", LazyAsyncOpenAI],
+        gateway: t.Optional[LLMGateway] = None,
+        cache: t.Optional[CompletionCache] = None,
+        hedger: t.Optional[Hedger] = None,
+    ) -> None:
+        self._client = client
+        self._gateway = gateway or LLMGateway()
+        self._cache = cache
+        self._hedger = hedger or Hedger()
+        self._preload: t.Optional[asyncio.Future] = None
+
+    @property
+    def gateway(self) -> LLMGateway:
+        return self._gateway
+
+    @property
+    def cache(self) -> t.Optional[CompletionCache]:
+        return self._cache
+
+    @property
+    def hedger(self) -> Hedger:
+        return self._hedger
+
+    def start_preload(self) -> None:
+        """
+        Loads a lazily created OpenAI client in a background thread, so that
+        the first chat completion doesn't wait for it.
+        """
+        if isinstance(self._client, LazyAsyncOpenAI) and self._preload is None:
+            self._preload = asyncio.get_running_loop().run_in_executor(None, self._client.load)
+
+    async def create_chat_completion(
+        self,
+        *,
+        call_site: str,
+        priority: Priority = Priority.interactive,
+        **kwargs,
+    ) -> "ChatCompletion":
+        """
+        Creates a chat completion. `call_site` identifies the caller (e.g. "classify")
+        and `priority` decides its place in the gateway queue; the remaining arguments
+        are passed through to the chat completions API.
+        """
+        with tracing.span(f"llm.{call_site}") as span:
+            if self._cache:
+                cached_response = self._cache.get(call_site, kwargs)
+                if cached_response is not None:
+                    logger.debug(f"Using cached chat completion for call site: {call_site}")
+                    metrics.LLM_REQUESTS.inc(call_site=call_site, status="cached")
+                    if span:
+                        span.set_attribute("cached", True)
+                    return cached_response
+
+            logger.debug(f"Creating chat completion for call site: {call_site}")
+            start = time.monotonic()
+            policy = self._hedger.policy_for(call_site)
+            request = kwargs
+            if policy:
+
+                async def call(model: str) -> t.Tuple[t.Dict[str, t.Any], "ChatCompletion"]:
+                    model_request = {**kwargs, "model": model}
+                    return model_request, await self._complete(call_site, priority, model_request)
+
+                request, response = await self._hedger.run(
+                    call_site=call_site,
+                    policy=policy,
+                    primary_model=kwargs.get("model", ""),
+                    call=call,
+                    is_valid=lambda answer: bool(getattr(answer[1], "choices", None)),
+                )
+            else:
+                response = await self._complete(call_site, priority, kwargs)
+            latency = time.monotonic() - start
+
+            if self._cache:
+                # Cached under the request that was answered, so that an answer from
+                # the fallback model isn't served as the primary model's.
+                self._cache.set(call_site, request, response, latency)
+            return response
+
+    async def _complete(
+        self, call_site: str, priority: Priority, request: t.Dict[str, t.Any]
+    ) -> "ChatCompletion":
+        async with self._gateway.slot(
+            model=request.get("model", ""),
+            priority=priority,
+            estimated_tokens=estimate_tokens(request),
+        ) as slot:
+            # Latency is measured from when the gateway admits the request, so
+            # queueing shows up in the gateway queue depth instead.
+            start = time.monotonic()
+            try:
+                # Time spent queued in the gateway shows up as the gap before this span.
+                with tracing.span("chat.completions.create", model=request.get("model")):
+                    response = await self._client.chat.completions.create(**request)
+            except Exception:
+                metrics.LLM_REQUESTS.inc(call_site=call_site, status="error")
+                raise
+            finally:
+                metrics.LLM_REQUEST_DURATION.observe(time.monotonic() - start, call_site=call_site)
+            metrics.LLM_REQUESTS.inc(call_site=call_site, status="ok")
+
+            usage = getattr(response, "usage", None)
+            slot.record_usage(getattr(usage, "total_tokens", None))
+            for kind in ("prompt", "completion"):
+                tokens = getattr(usage, f"{kind}_tokens", None)
+                if isinstance(tokens, int):
+                    metrics.LLM_TOKENS.inc(tokens, call_site=call_site, kind=kind)
+            return response
+
+
+def init_llm_client(
+    *,
+    api_key: str,
+    organization: t.Optional[str] = None,
+    config: t.Optional[LLMConfig] = None,
+) -> LLMClient:
+    config = config or LLMConfig()
+
+    global _LLM_CLIENT
+    _LLM_CLIENT = LLMClient(
+        LazyAsyncOpenAI(api_key=api_key, organization=organization),
+        gateway=LLMGateway(config.gateway),
+        cache=CompletionCache(config.cache) if config.cache else None,
+        hedger=Hedger(config.hedging),
+    )
+    return _LLM_CLIENT
+
+
+def get_llm_client() -> LLMClient:
+    global _LLM_CLIENT
+    if _LLM_CLIENT is None:
+        raise Exception("LLM client not initialized, call init_llm_client() first")
+    return _LLM_CLIENT
@@ -0,0 +1,258 @@
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import json
+import sqlite3
+import time
+import typing as t
+from logging import getLogger
+
+from openai_slackbot import metrics
+from openai_slackbot.utils.backoff import exponential_backoff
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+# Sends a recorded write, e.g. ("post_message", {"channel": ..., "text": ...}).
+SendWrite = t.Callable[[str, t.Dict[str, t.Any]], t.Awaitable[t.Any]]
+
+# Returns whether the message that a post_message write would post was already
+# posted since the given time, e.g. by an attempt that failed after Slack got it.
+FindPosted = t.Callable[[t.Dict[str, t.Any], float], t.Awaitable[bool]]
+
+
+class OutboxConfig(BaseModel):
+    # Path of a sqlite database that keeps recorded writes until they are
+    # delivered, across restarts. If not set, they are kept in memory. It can't
+    # be shared between processes, so each HTTP worker appends its number to it.
+    path: t.Optional[str] = None
+
+    # Number of times a write is sent before it is dropped.
+    max_attempts: int = 5
+
+    # Delay before the first retry of a write. It doubles on every retry, up to
+    # `backoff_max_seconds`, with random jitter.
+    backoff_base_seconds: float = 1
+
+    # Maximum delay before retrying a write.
+    backoff_max_seconds: float = 60
+
+    # Seconds that delivered writes are remembered for, so that a handler that
+    # is retried, e.g. by the job queue, doesn't record the same writes again.
+    retention_seconds: float = 86400
+
+
+class OutboxWrite(BaseModel):
+    id: int
+    method: str
+    kwargs: t.Dict[str, t.Any]
+    attempts: int
+    recorded_at: float
+
+
+class _Scope:
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.writes = itertools.count()
+
+
+_SCOPE: contextvars.ContextVar[t.Optional[_Scope]] = contextvars.ContextVar(
+    "slack_outbox_scope", default=None
+)
+
+
+class SlackOutbox:
+    """
+    SlackOutbox records Slack writes whose response the caller doesn't need,
+    and delivers them in the background: in the order they were recorded for
+    each channel, within the rate limits, and retried with backoff until they
+    succeed or run out of attempts.
+    """
+
+    def __init__(
+        self, send: SendWrite, find_posted: FindPosted, config: t.Optional[OutboxConfig] = None
+    ) -> None:
+        self._send = send
+        self._find_posted = find_posted
+        self._config = config or OutboxConfig()
+        self._delivering: t.Dict[str, asyncio.Task] = {}
+        self._db = sqlite3.connect(self._config.path or ":memory:", isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS slack_writes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT UNIQUE,
+                channel TEXT NOT NULL,
+                method TEXT NOT NULL,
+                kwargs TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                recorded_at REAL NOT NULL,
+                done_at REAL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS slack_writes_channel ON slack_writes (channel, done_at, id)"
+        )
+
+    def post_message(self, **kwargs) -> None:
+        self._record("post_message", kwargs)
+
+    def update_message(self, **kwargs) -> None:
+        self._record("update_message", kwargs)
+
+    def add_reaction(self, **kwargs) -> None:
+        self._record("add_reaction", kwargs)
+
+    @contextlib.contextmanager
+    def scope(self, key: t.Optional[str]) -> t.Iterator[None]:
+        """
+        Gives the writes recorded in the block idempotency keys derived from `key`,
+        e.g. the id of the event being handled, so that recording them again when
+        the event is handled again does nothing.
+        """
+        token = _SCOPE.set(_Scope(key) if key else None)
+        try:
+            yield
+        finally:
+            _SCOPE.reset(token)
+
+    def start(self) -> None:
+        """Starts delivering the writes that were recorded but not delivered before a restart."""
+        rows = self._db.execute(
+            "SELECT DISTINCT channel FROM slack_writes WHERE done_at IS NULL"
+        ).fetchall()
+        for (channel,) in rows:
+            self._deliver_later(channel)
+        if rows:
+            logger.info(f"Delivering {self.pending()} Slack writes recorded before restart")
+
+    def pending(self) -> int:
+        (count,) = self._db.execute(
+            "SELECT COUNT(*) FROM slack_writes WHERE done_at IS NULL"
+        ).fetchone()
+        return count
+
+    async def wait_delivered(self, channel: t.Optional[str]) -> None:
+        """Waits until the writes recorded for `channel` are delivered or dropped."""
+        task = self._delivering.get(channel) if channel else None
+        if task is not None and task is not asyncio.current_task():
+            # A cancelled waiter must not cancel the delivery.
+            await asyncio.shield(task)
+
+    async def flush(self, timeout: float) -> bool:
+        """
+        Waits up to `timeout` seconds for all recorded writes to be delivered, then
+        stops delivering. Returns whether all writes were delivered.
+        """
+        tasks = list(self._delivering.values())
+        if not tasks:
+            return True
+
+        _, unfinished = await asyncio.wait(tasks, timeout=timeout)
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        if unfinished:
+            pending = self.pending()
+            if self._config.path:
+                logger.warning(f"Kept {pending} undelivered Slack writes for the next startup")
+            else:
+                logger.error(
+                    f"Dropped {pending} undelivered Slack writes, set outbox.path to keep them"
+                )
+        return not unfinished
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _record(self, method: str, kwargs: t.Dict[str, t.Any]) -> None:
+        channel = kwargs.get("channel")
+        if not channel:
+            raise ValueError(f"Slack writes recorded in the outbox need a channel: {method}")
+
+        scope = _SCOPE.get()
+        key = f"{scope.key}:{next(scope.writes)}" if scope else None
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO slack_writes (key, channel, method, kwargs, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, channel, method, json.dumps(kwargs), time.time()),
+        )
+        if cursor.rowcount == 0:
+            logger.info(f"Skipped {method} in {channel}, already recorded as {key}")
+            return
+        self._deliver_later(channel)
+
+    def _deliver_later(self, channel: str) -> None:
+        if channel not in self._delivering:
+            self._delivering[channel] = asyncio.ensure_future(self._deliver(channel))
+
+    async def _deliver(self, channel: str) -> None:
+        try:
+            while True:
+                write = self._next_write(channel)
+                if write is None:
+                    self._db.execute(
+                        "DELETE FROM slack_writes WHERE done_at < ?",
+                        (time.time() - self._config.retention_seconds,),
+                    )
+                    return
+                await self._attempt(channel, write)
+        finally:
+            # Removed without awaiting after the last write, so a write recorded
+            # from here on starts a new delivery.
+            self._delivering.pop(channel, None)
+
+    def _next_write(self, channel: str) -> t.Optional[OutboxWrite]:
+        row = self._db.execute(
+            "SELECT id, method, kwargs, attempts, recorded_at FROM slack_writes "
+            "WHERE channel = ? AND done_at IS NULL ORDER BY id LIMIT 1",
+            (channel,),
+        ).fetchone()
+        if row is None:
+            return None
+        write_id, method, kwargs, attempts, recorded_at = row
+        return OutboxWrite(
+            id=write_id,
+            method=method,
+            kwargs=json.loads(kwargs),
+            attempts=attempts,
+            recorded_at=recorded_at,
+        )
+
+    async def _attempt(self, channel: str, write: OutboxWrite) -> None:
+        attempts = write.attempts + 1
+        self._db.execute("UPDATE slack_writes SET attempts = ? WHERE id = ?", (attempts, write.id))
+        try:
+            # Posting isn't idempotent, so a retry first checks that an earlier
+            # attempt didn't post the message after all.
+            if attempts > 1 and write.method == "post_message":
+                if await self._find_posted(write.kwargs, write.recorded_at):
+                    logger.info(f"Slack write {write.id} in {channel} was already posted")
+                    self._done(write)
+                    return
+            await self._send(write.method, write.kwargs)
+            self._done(write)
+            metrics.SLACK_OUTBOX_WRITES.inc(method=write.method, status="delivered")
+        except Exception:
+            if attempts >= self._config.max_attempts:
+                self._done(write)
+                metrics.SLACK_OUTBOX_WRITES.inc(method=write.method, status="dropped")
+                logger.exception(f"Dropped {write.method} in {channel} after {attempts} attempts")
+                return
+
+            metrics.SLACK_OUTBOX_WRITES.inc(method=write.method, status="retried")
+            logger.warning(f"Failed {write.method} in {channel}, retrying", exc_info=True)
+            await asyncio.sleep(
+                exponential_backoff(
+                    attempts, self._config.backoff_base_seconds, self._config.backoff_max_seconds
+                )
+            )
+
+    def _done(self, write: OutboxWrite) -> None:
+        self._db.execute(
+            "UPDATE slack_writes SET done_at = ? WHERE id = ?", (time.time(), write.id)
+        )
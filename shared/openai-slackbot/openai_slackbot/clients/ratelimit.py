@@ -0,0 +1,205 @@
+import asyncio
+import time
+import typing as t
+from logging import getLogger
+
+from slack_sdk.errors import SlackApiError
+
+logger = getLogger(__name__)
+
+T = t.TypeVar("T")
+
+# Requests per minute allowed by each Slack Web API rate limit tier,
+# see https://api.slack.com/apis/rate-limits.
+TIER_1 = 1
+TIER_2 = 20
+TIER_3 = 50
+TIER_4 = 100
+
+# Workspace-wide requests per minute for the Web API methods used by the bots.
+# Methods that are not listed are assumed to be Tier 3.
+METHOD_LIMITS: t.Dict[str, float] = {
+    "auth.test": TIER_4,
+    "chat.getPermalink": TIER_4,
+    "chat.postMessage": 300,
+    "chat.update": TIER_3,
+    "conversations.history": TIER_3,
+    "conversations.list": TIER_2,
+    "conversations.replies": TIER_3,
+    "reactions.add": TIER_3,
+    "users.info": TIER_4,
+    "users.list": TIER_2,
+}
+
+# Requests per minute allowed per channel, for methods that are also limited per channel.
+CHANNEL_LIMITS: t.Dict[str, float] = {
+    # Slack allows posting one message per second per channel.
+    "chat.postMessage": 60,
+}
+
+# Retry-After to assume when a rate limited response does not include one.
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+
+# Number of per-channel buckets to keep before idle ones are evicted.
+MAX_CHANNEL_BUCKETS = 1000
+
+
+class TokenBucket:
+    """
+    TokenBucket allows `rate_per_minute` acquisitions per minute with bursts of
+    up to `capacity`. Callers are served in the order they call `acquire`.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: t.Optional[float] = None) -> None:
+        self._rate = rate_per_minute / 60
+        self._capacity = capacity or max(1.0, rate_per_minute / 10)
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated_at) * self._rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def is_idle(self) -> bool:
+        """
+        Returns whether no one is waiting on the bucket and it has refilled to
+        capacity, i.e. it behaves like a new bucket and can be dropped.
+        """
+        now = time.monotonic()
+        return (
+            not self._lock.locked()
+            and now >= self._paused_until
+            and self._tokens + (now - self._updated_at) * self._rate >= self._capacity
+        )
+
+    def pause(self, seconds: float) -> None:
+        """Stops handing out tokens for `seconds`, e.g. after Slack returned a Retry-After."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class SlackRateLimiter:
+    """
+    SlackRateLimiter queues Slack Web API calls per method and, for methods that
+    are limited per channel, per (method, channel) so that calls stay within
+    Slack's rate limit tiers. Calls that are rate limited anyway are retried
+    after the Retry-After returned by Slack.
+
+    When several processes call Slack for the same workspace, each should use
+    `share` of the limits, e.g. 1/N for one of N processes.
+
+    Once there are more than `max_channel_buckets` per-channel buckets, the idle
+    ones are evicted.
+    """
+
+    def __init__(
+        self,
+        method_limits: t.Optional[t.Dict[str, float]] = None,
+        channel_limits: t.Optional[t.Dict[str, float]] = None,
+        max_retries: int = 5,
+        share: float = 1.0,
+        max_channel_buckets: int = MAX_CHANNEL_BUCKETS,
+    ) -> None:
+        self._method_limits = {
+            method: limit * share
+            for method, limit in {**METHOD_LIMITS, **(method_limits or {})}.items()
+        }
+        self._channel_limits = {
+            method: limit * share
+            for method, limit in {**CHANNEL_LIMITS, **(channel_limits or {})}.items()
+        }
+        self._default_limit = TIER_3 * share
+        self._max_retries = max_retries
+        self._buckets: t.Dict[t.Tuple[str, t.Optional[str]], TokenBucket] = {}
+        self._channel_buckets = 0
+        self._max_channel_buckets = max_channel_buckets
+        self._evict_at = max_channel_buckets
+
+    async def call(
+        self, method: str, channel: t.Optional[str], fn: t.Callable[[], t.Awaitable[T]]
+    ) -> T:
+        """Calls `fn`, which performs the Slack API `method` on `channel`, within its rate limits."""
+        for attempt in range(self._max_retries + 1):
+            for bucket in self._buckets_for(method, channel):
+                await bucket.acquire()
+
+            try:
+                return await fn()
+            except SlackApiError as e:
+                if not is_rate_limited(e) or attempt == self._max_retries:
+                    raise e
+
+                retry_after = _retry_after(e)
+                logger.warning(
+                    f"Slack rate limited {method} (channel: {channel}), "
+                    f"retrying in {retry_after}s (attempt {attempt + 1}/{self._max_retries})"
+                )
+                self._buckets_for(method, channel)[0].pause(retry_after)
+
+        raise AssertionError("unreachable")
+
+    def _buckets_for(self, method: str, channel: t.Optional[str]) -> t.List[TokenBucket]:
+        """Returns the buckets to acquire for a call, most specific first."""
+        keys: t.List[t.Tuple[str, t.Optional[str]]] = []
+        if channel and method in self._channel_limits:
+            keys.append((method, channel))
+        keys.append((method, None))
+
+        buckets = []
+        for key in keys:
+            if key not in self._buckets:
+                if key[1] is None:
+                    bucket = TokenBucket(self._method_limits.get(method, self._default_limit))
+                else:
+                    # Per-channel limits don't allow bursts.
+                    bucket = TokenBucket(self._channel_limits[method], capacity=1)
+                    self._channel_buckets += 1
+                    if self._channel_buckets > self._evict_at:
+                        self._evict_idle_channel_buckets()
+                self._buckets[key] = bucket
+            buckets.append(self._buckets[key])
+        return buckets
+
+    def _evict_idle_channel_buckets(self) -> None:
+        idle = [key for key, bucket in self._buckets.items() if key[1] and bucket.is_idle()]
+        for key in idle:
+            del self._buckets[key]
+        self._channel_buckets -= len(idle)
+        # Channels that are still busy are not swept again until the number of
+        # buckets doubles, so that eviction stays cheap when many are busy.
+        self._evict_at = max(self._max_channel_buckets, 2 * self._channel_buckets)
+
+
+def is_rate_limited(e: SlackApiError) -> bool:
+    if getattr(e.response, "status_code", None) == 429:
+        return True
+    try:
+        return e.response.get("error") == "ratelimited"
+    except AttributeError:
+        return False
+
+
+def _retry_after(e: SlackApiError) -> float:
+    headers = getattr(e.response, "headers", None) or {}
+    for header in ("Retry-After", "retry-after"):
+        if header in headers:
+            try:
+                return float(headers[header])
+            except (TypeError, ValueError):
+                break
+    return DEFAULT_RETRY_AFTER_SECONDS
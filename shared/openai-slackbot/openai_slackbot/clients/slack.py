@@ -1,15 +1,25 @@
 import json
-import os
+import time
 import typing as t
 from logging import getLogger
 
-from jinja2 import Environment, FileSystemLoader
+from openai_slackbot import metrics, tracing
+from openai_slackbot.clients.outbox import OutboxConfig, SlackOutbox
+from openai_slackbot.clients.ratelimit import SlackRateLimiter, is_rate_limited
+from openai_slackbot.clients.templates import TemplateRenderer
+from openai_slackbot.clients.threads import ThreadCache
+from openai_slackbot.clients.users import UserDirectory, UserDirectoryConfig
 from pydantic import BaseModel
 from slack_sdk.errors import SlackApiError
 from slack_sdk.web.async_client import AsyncWebClient
 
 logger = getLogger(__name__)
 
+# Number of messages requested per page when paginating through history.
+PAGE_SIZE = 200
+
+_SLACK_CLIENT: t.Optional["SlackClient"] = None
+
 
 class SlackMessage(BaseModel):
     app_id: t.Optional[str] = None
@@ -30,6 +40,7 @@ class CreateSlackMessageResponse(BaseModel):
     message: SlackMessage
 
 
+@tracing.trace_methods
 class SlackClient:
     """
     SlackClient wraps the Slack AsyncWebClient implementation and
@@ -37,45 +48,155 @@ class SlackClient:
     implementation.
     """
 
-    def __init__(self, client: AsyncWebClient, template_path: str) -> None:
+    def __init__(
+        self,
+        client: AsyncWebClient,
+        template_path: str,
+        rate_limiter: t.Optional[SlackRateLimiter] = None,
+        user_directory_config: t.Optional[UserDirectoryConfig] = None,
+        outbox_config: t.Optional[OutboxConfig] = None,
+        thread_cache: t.Optional[ThreadCache] = None,
+    ) -> None:
         self._client = client
-        self._jinja = self._init_jinja(template_path)
+        self._templates = TemplateRenderer(template_path)
+        self._rate_limiter = rate_limiter or SlackRateLimiter()
+        self._users = UserDirectory(self._call, user_directory_config)
+        self._threads = thread_cache or ThreadCache()
+        self._outbox = SlackOutbox(self._send_recorded, self._find_posted, outbox_config)
+
+    @property
+    def users(self) -> UserDirectory:
+        return self._users
+
+    @property
+    def threads(self) -> ThreadCache:
+        return self._threads
+
+    @property
+    def outbox(self) -> SlackOutbox:
+        """
+        Records posts, updates and reactions to be sent in the background, for
+        handlers that don't need their response.
+        """
+        return self._outbox
+
+    async def observe_message_events(self, body: t.Dict[str, t.Any], next) -> None:
+        """Bolt middleware that writes incoming message events through to the thread cache."""
+        if body.get("type") == "event_callback":
+            self._threads.observe_event(body.get("event") or {})
+        await next()
+
+    async def warm_up(self) -> None:
+        """
+        Calls auth.test so that the connection to Slack is set up and the token
+        is verified before the first event has to be handled.
+        """
+        response = await self._call("auth.test")
+        if not response["ok"]:
+            raise Exception(f"Failed to authenticate with Slack: {response['error']}")
+        logger.info(
+            f"Connected to Slack workspace {response.get('team')} as {response.get('user')}"
+        )
 
     async def get_message_link(self, **kwargs) -> str:
-        response = await self._client.chat_getPermalink(**kwargs)
+        response = await self._call("chat.getPermalink", **kwargs)
         if not response["ok"]:
             raise Exception(f"Failed to get Slack message link: {response['error']}")
         return response["permalink"]
 
     async def get_message(self, channel: str, ts: str) -> t.Optional[t.Dict[str, t.Any]]:
         """Follows: https://api.slack.com/messaging/retrieving."""
-        result = await self._client.conversations_history(
+        async for message in self.iter_channel_history(
+            channel, latest=ts, inclusive=True, page_size=1
+        ):
+            return message
+        return None
+
+    def iter_channel_history(
+        self,
+        channel: str,
+        *,
+        latest: t.Optional[str] = None,
+        oldest: t.Optional[str] = None,
+        inclusive: t.Optional[bool] = None,
+        page_size: int = PAGE_SIZE,
+        max_bytes: t.Optional[int] = None,
+    ) -> t.AsyncIterator[t.Dict[str, t.Any]]:
+        """
+        Iterates over the messages of a channel, newest first. Pages are only
+        fetched as the caller iterates, and iteration stops once `max_bytes` of
+        messages have been returned.
+        """
+        return self._paginate(
+            "conversations.history",
+            max_bytes=max_bytes,
             channel=channel,
-            inclusive=True,
-            latest=ts,
-            limit=1,
+            inclusive=inclusive,
+            latest=latest,
+            oldest=oldest,
+            limit=page_size,
+        )
+
+    def iter_thread_messages(
+        self,
+        channel: str,
+        thread_ts: str,
+        *,
+        page_size: int = PAGE_SIZE,
+        max_bytes: t.Optional[int] = None,
+    ) -> t.AsyncIterator[t.Dict[str, t.Any]]:
+        """
+        Iterates over the messages of a thread, oldest first. Pages are only
+        fetched as the caller iterates, and iteration stops once `max_bytes` of
+        messages have been returned.
+        """
+        return self._paginate(
+            "conversations.replies",
+            max_bytes=max_bytes,
+            channel=channel,
+            ts=thread_ts,
+            limit=page_size,
         )
-        return result["messages"][0] if result["messages"] else None
 
     async def post_message(self, **kwargs) -> CreateSlackMessageResponse:
-        response = await self._client.chat_postMessage(**kwargs)
+        # Writes recorded in the outbox for the channel are sent first, to keep them in order.
+        await self._outbox.wait_delivered(kwargs.get("channel"))
+        return await self._post_message(**kwargs)
+
+    async def update_message(self, **kwargs) -> t.Dict[str, t.Any]:
+        await self._outbox.wait_delivered(kwargs.get("channel"))
+        return await self._update_message(**kwargs)
+
+    async def add_reaction(self, **kwargs) -> t.Dict[str, t.Any]:
+        await self._outbox.wait_delivered(kwargs.get("channel"))
+        return await self._add_reaction(**kwargs)
+
+    async def _post_message(self, **kwargs) -> CreateSlackMessageResponse:
+        response = await self._call("chat.postMessage", **kwargs)
         if not response["ok"]:
             raise Exception(f"Failed to post Slack message: {response['error']}")
 
         assert isinstance(response.data, dict)
+        self._threads.add_message(
+            response.data["channel"], response.data["message"], start_thread=True
+        )
         return CreateSlackMessageResponse(**response.data)
 
-    async def update_message(self, **kwargs) -> t.Dict[str, t.Any]:
-        response = await self._client.chat_update(**kwargs)
+    async def _update_message(self, **kwargs) -> t.Dict[str, t.Any]:
+        response = await self._call("chat.update", **kwargs)
         if not response["ok"]:
             raise Exception(f"Failed to update Slack message: {response['error']}")
 
         assert isinstance(response.data, dict)
+        channel = response.data.get("channel", kwargs.get("channel"))
+        ts = response.data.get("ts", kwargs.get("ts"))
+        if channel and ts:
+            self._threads.update_message(channel, {**response.data.get("message", {}), "ts": ts})
         return response.data
 
-    async def add_reaction(self, **kwargs) -> t.Dict[str, t.Any]:
+    async def _add_reaction(self, **kwargs) -> t.Dict[str, t.Any]:
         try:
-            response = await self._client.reactions_add(**kwargs)
+            response = await self._call("reactions.add", **kwargs)
         except SlackApiError as e:
             if e.response["error"] == "already_reacted":
                 return {}
@@ -84,28 +205,57 @@ class SlackClient:
         assert isinstance(response.data, dict)
         return response.data
 
-    async def get_thread_messages(self, channel: str, thread_ts: str) -> t.List[t.Dict[str, t.Any]]:
-        response = await self._client.conversations_replies(channel=channel, ts=thread_ts)
-        if not response["ok"]:
-            raise Exception(f"Failed to get thread messages: {response['error']}")
+    async def _send_recorded(self, method: str, kwargs: t.Dict[str, t.Any]) -> None:
+        send = {
+            "post_message": self._post_message,
+            "update_message": self._update_message,
+            "add_reaction": self._add_reaction,
+        }[method]
+        await send(**kwargs)
 
-        assert isinstance(response.data, dict)
-        return response.data["messages"]
+    async def _find_posted(self, kwargs: t.Dict[str, t.Any], since: float) -> bool:
+        """Returns whether the bot posted a message with the text in `kwargs` since `since`."""
+        channel, thread_ts = kwargs["channel"], kwargs.get("thread_ts")
+        if thread_ts:
+            messages = self.iter_thread_messages(channel, thread_ts)
+        else:
+            # Allows for some clock skew between this host and Slack.
+            messages = self.iter_channel_history(channel, oldest=f"{since - 60:.6f}")
+        async for message in messages:
+            if message.get("bot_id") and message.get("text") == kwargs.get("text"):
+                return True
+        return False
+
+    async def get_thread_messages(
+        self, channel: str, thread_ts: str, refresh: bool = False
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Returns the messages of a thread, oldest first. Threads are served from the
+        thread cache unless they aren't cached yet or `refresh` is set.
+        """
+        if not refresh:
+            messages = self._threads.get(channel, thread_ts)
+            if messages is not None:
+                return messages
+
+        messages = [message async for message in self.iter_thread_messages(channel, thread_ts)]
+        self._threads.set(channel, thread_ts, messages)
+        return messages
 
     async def get_user_display_name(self, user_id: str) -> str:
-        response = await self._client.users_info(user=user_id)
-        if not response["ok"]:
-            raise Exception(f"Failed to get user info: {response['error']}")
-        return response["user"]["profile"]["display_name"]
+        user = await self._users.get_user(user_id)
+        return user["profile"]["display_name"]
 
     async def get_original_blocks(self, thread_ts: str, channel: str) -> None:
         """Given a thread_ts, get original message block"""
-        response = await self._client.conversations_replies(
-            channel=channel,
-            ts=thread_ts,
-        )
         try:
-            messages = response.get("messages", [])
+            # Only the parent message is needed, so don't read the rest of the thread.
+            messages = self._threads.get(channel, thread_ts)
+            if messages is None:
+                messages = []
+                async for message in self.iter_thread_messages(channel, thread_ts, page_size=1):
+                    messages.append(message)
+                    break
             if not messages:
                 raise ValueError(f"Error fetching original message for thread_ts {thread_ts}")
             blocks = messages[0].get("blocks")
@@ -115,10 +265,93 @@ class SlackClient:
         except Exception as e:
             logger.exception(f"Error fetching original message for thread_ts {thread_ts}: {e}")
 
+    async def _call(self, method: str, **kwargs) -> t.Any:
+        """
+        Calls the Slack Web API `method` (e.g. "chat.postMessage") through the rate
+        limiter, which queues the call within Slack's rate limits and retries it
+        when Slack rate limits it anyway. Every attempt is recorded in the Slack
+        request metrics.
+        """
+        api_call = getattr(self._client, method.replace(".", "_"))
+
+        async def attempt() -> t.Any:
+            start = time.monotonic()
+            status = "error"
+            try:
+                with tracing.span(method):
+                    response = await api_call(**kwargs)
+                status = "ok"
+                return response
+            except SlackApiError as e:
+                if is_rate_limited(e):
+                    status = "ratelimited"
+                raise
+            finally:
+                metrics.SLACK_REQUESTS.inc(method=method, status=status)
+                metrics.SLACK_REQUEST_DURATION.observe(time.monotonic() - start, method=method)
+
+        # Time spent waiting on the rate limiter shows up as the gap before the attempt spans.
+        return await self._rate_limiter.call(method, kwargs.get("channel"), attempt)
+
+    async def _paginate(
+        self, method: str, *, max_bytes: t.Optional[int] = None, **kwargs
+    ) -> t.AsyncIterator[t.Dict[str, t.Any]]:
+        """Iterates over the messages returned by a cursor-paginated Slack API method."""
+        params = {key: value for key, value in kwargs.items() if value is not None}
+        total_bytes = 0
+        while True:
+            response = await self._call(method, **params)
+            if not response["ok"]:
+                raise Exception(f"Failed to get messages with {method}: {response['error']}")
+
+            assert isinstance(response.data, dict)
+            for message in response.data["messages"]:
+                if max_bytes is not None:
+                    total_bytes += len(json.dumps(message))
+                    if total_bytes > max_bytes:
+                        logger.warning(
+                            f"Stopped reading {method} for channel {params.get('channel')} "
+                            f"after {max_bytes} bytes"
+                        )
+                        return
+                yield message
+
+            cursor = (response.data.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
     def render_blocks_from_template(self, template_filename: str, context: t.Dict = {}) -> t.Any:
-        rendered_template = self._jinja.get_template(template_filename).render(context)
-        return json.loads(rendered_template)
+        return self._templates.render(template_filename, context)
 
-    def _init_jinja(self, template_path: str):
-        templates_dir = os.path.join(template_path)
-        return Environment(loader=FileSystemLoader(templates_dir))
+
+def init_slack_client(
+    client: AsyncWebClient,
+    template_path: str,
+    rate_limiter: t.Optional[SlackRateLimiter] = None,
+    user_directory_config: t.Optional[UserDirectoryConfig] = None,
+    outbox_config: t.Optional[OutboxConfig] = None,
+    thread_cache: t.Optional[ThreadCache] = None,
+) -> SlackClient:
+    global _SLACK_CLIENT
+    _SLACK_CLIENT = SlackClient(
+        client,
+        template_path,
+        rate_limiter=rate_limiter,
+        user_directory_config=user_directory_config,
+        outbox_config=outbox_config,
+        thread_cache=thread_cache,
+    )
+    return _SLACK_CLIENT
+
+
+def get_slack_client() -> SlackClient:
+    """
+    Returns the SlackClient the bot's handlers use. Code outside the handlers
+    should use it too, so that its calls share the rate limits, the outbox and
+    the thread cache.
+    """
+    global _SLACK_CLIENT
+    if _SLACK_CLIENT is None:
+        raise Exception("Slack client not initialized, call init_slack_client() first")
+    return _SLACK_CLIENT
@@ -0,0 +1,140 @@
+import json
+import os
+import typing as t
+from collections import OrderedDict
+from enum import Enum
+from logging import getLogger
+
+from jinja2 import Environment, FileSystemLoader, Template, meta
+
+logger = getLogger(__name__)
+
+# Default number of context-dependent renders kept in the LRU cache.
+RENDER_CACHE_SIZE = 512
+
+# Cache key value for variables that are missing from the context.
+_MISSING = object()
+
+
+class TemplateRenderer:
+    """
+    TemplateRenderer renders Jinja templates of Slack blocks into JSON structures.
+    Templates are compiled once up front. Templates that don't use any context
+    are rendered once, and renders of other templates are memoised on the context
+    values they use, so the hot path only copies an already parsed structure.
+    """
+
+    def __init__(self, template_path: str, cache_size: int = RENDER_CACHE_SIZE) -> None:
+        self._jinja = Environment(loader=FileSystemLoader(os.path.join(template_path)))
+        self._cache_size = cache_size
+        self._templates: t.Dict[str, Template] = {}
+        # Context variables used by each template, or None if they can't be
+        # determined statically, e.g. because of a dynamic include.
+        self._variables: t.Dict[str, t.Optional[t.FrozenSet[str]]] = {}
+        self._static_renders: t.Dict[str, t.Any] = {}
+        self._renders: t.OrderedDict[t.Hashable, t.Any] = OrderedDict()
+        self._compile_templates()
+
+    def render(self, template_filename: str, context: t.Dict[str, t.Any]) -> t.Any:
+        if template_filename not in self._templates:
+            self._compile(template_filename)
+
+        if template_filename in self._static_renders:
+            return _copy(self._static_renders[template_filename])
+
+        key = self._cache_key(template_filename, context)
+        if key is None:
+            return self._render(template_filename, context)
+
+        if key in self._renders:
+            self._renders.move_to_end(key)
+            return _copy(self._renders[key])
+
+        rendered = self._render(template_filename, context)
+        self._renders[key] = rendered
+        if len(self._renders) > self._cache_size:
+            self._renders.popitem(last=False)
+        return _copy(rendered)
+
+    def _compile_templates(self) -> None:
+        for template_filename in self._jinja.list_templates(extensions=["j2"]):
+            self._compile(template_filename)
+
+        for template_filename, variables in self._variables.items():
+            # Partials (e.g. _body.j2) are only meant to be included and may not be valid JSON.
+            if variables == frozenset() and not os.path.basename(template_filename).startswith("_"):
+                self._static_renders[template_filename] = self._render(template_filename, {})
+        logger.debug(
+            f"Compiled {len(self._templates)} Slack templates, "
+            f"{len(self._static_renders)} of them rendered up front"
+        )
+
+    def _compile(self, template_filename: str) -> None:
+        self._templates[template_filename] = self._jinja.get_template(template_filename)
+        self._variables[template_filename] = self._find_variables(template_filename, set())
+
+    def _find_variables(
+        self, template_filename: str, seen: t.Set[str]
+    ) -> t.Optional[t.FrozenSet[str]]:
+        seen.add(template_filename)
+        source, _, _ = self._jinja.loader.get_source(self._jinja, template_filename)
+        ast = self._jinja.parse(source)
+
+        variables = set(meta.find_undeclared_variables(ast))
+        for referenced in meta.find_referenced_templates(ast):
+            if referenced is None:
+                return None
+            if referenced in seen:
+                continue
+            referenced_variables = self._find_variables(referenced, seen)
+            if referenced_variables is None:
+                return None
+            variables |= referenced_variables
+        return frozenset(variables)
+
+    def _cache_key(
+        self, template_filename: str, context: t.Dict[str, t.Any]
+    ) -> t.Optional[t.Hashable]:
+        variables = self._variables[template_filename]
+        if variables is None:
+            return None
+
+        try:
+            key = (
+                template_filename,
+                tuple(
+                    (name, _freeze(context[name]) if name in context else _MISSING)
+                    for name in sorted(variables)
+                ),
+            )
+        except TypeError:
+            # The context holds values that can't be used as a cache key.
+            return None
+        return key
+
+    def _render(self, template_filename: str, context: t.Dict[str, t.Any]) -> t.Any:
+        return json.loads(self._templates[template_filename].render(context))
+
+
+def _freeze(value: t.Any) -> t.Hashable:
+    """Returns a hashable view of a context value."""
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    if value is None or type(value) is str:
+        return value
+    if type(value) in (int, float, bool) or isinstance(value, Enum):
+        # Values that compare equal but render differently (e.g. 1 and True) get different keys.
+        return (type(value), value)
+    # Other objects may change without their hash changing, so they are not cached.
+    raise TypeError(f"Cannot use {type(value).__name__} in a cache key")
+
+
+def _copy(value: t.Any) -> t.Any:
+    """Copies a parsed JSON structure, which is much cheaper than copy.deepcopy."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
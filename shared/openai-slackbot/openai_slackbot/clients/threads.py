@@ -0,0 +1,128 @@
+import time
+import typing as t
+from collections import OrderedDict
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+SlackMessageData = t.Dict[str, t.Any]
+
+# Default number of threads kept in the cache.
+THREAD_CACHE_SIZE = 256
+
+# Default number of seconds a cached thread is served for, in case an update was missed.
+THREAD_CACHE_TTL_SECONDS = 600
+
+
+class _Thread:
+    def __init__(self, messages: t.List[SlackMessageData], expires_at: float) -> None:
+        # Slack timestamps are fixed-width strings, so they sort chronologically as strings.
+        self.messages = sorted(messages, key=lambda message: message["ts"])
+        self.expires_at = expires_at
+
+    def upsert(self, message: SlackMessageData) -> None:
+        for i, cached in enumerate(self.messages):
+            if cached["ts"] == message["ts"]:
+                self.messages[i] = {**cached, **message}
+                return
+        self.messages.append(message)
+        self.messages.sort(key=lambda message: message["ts"])
+
+    def remove(self, ts: str) -> None:
+        self.messages = [message for message in self.messages if message["ts"] != ts]
+
+
+class ThreadCache:
+    """
+    ThreadCache keeps the messages of recently read Slack threads, keyed by
+    (channel, thread_ts), in a bounded LRU. Messages the bot posts or updates,
+    and message events it receives, are written through to cached threads so
+    that repeated reads of a thread don't have to call conversations.replies.
+    A cache with `max_threads` set to 0 caches nothing.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = THREAD_CACHE_SIZE,
+        ttl_seconds: float = THREAD_CACHE_TTL_SECONDS,
+    ) -> None:
+        self._max_threads = max_threads
+        self._ttl_seconds = ttl_seconds
+        self._threads: t.OrderedDict[t.Tuple[str, str], _Thread] = OrderedDict()
+
+    def get(self, channel: str, thread_ts: str) -> t.Optional[t.List[SlackMessageData]]:
+        """Returns the cached messages of the thread, oldest first, or None on a cache miss."""
+        key = (channel, thread_ts)
+        thread = self._threads.get(key)
+        if thread is None:
+            return None
+        if thread.expires_at <= time.monotonic():
+            del self._threads[key]
+            return None
+
+        self._threads.move_to_end(key)
+        return list(thread.messages)
+
+    def set(self, channel: str, thread_ts: str, messages: t.List[SlackMessageData]) -> None:
+        """Caches all messages of a thread, e.g. as read from conversations.replies."""
+        key = (channel, thread_ts)
+        self._threads[key] = _Thread(messages, time.monotonic() + self._ttl_seconds)
+        self._threads.move_to_end(key)
+        while len(self._threads) > self._max_threads:
+            self._threads.popitem(last=False)
+
+    def add_message(
+        self, channel: str, message: SlackMessageData, start_thread: bool = False
+    ) -> None:
+        """
+        Adds a new message to its cached thread. A message is only added if its
+        thread is already cached, because the rest of the thread is unknown
+        otherwise, unless `start_thread` is set for a message that was just posted
+        at the top level and so is a complete thread on its own.
+        """
+        thread_ts = message.get("thread_ts") or message["ts"]
+        thread = self._threads.get((channel, thread_ts))
+        if thread is not None:
+            thread.upsert(message)
+        elif start_thread and thread_ts == message["ts"]:
+            self.set(channel, thread_ts, [message])
+
+    def update_message(self, channel: str, message: SlackMessageData) -> None:
+        """Updates a message in whichever cached thread contains it."""
+        thread = self._find_thread(channel, message)
+        if thread is not None:
+            thread.upsert(message)
+
+    def remove_message(self, channel: str, ts: str) -> None:
+        if (channel, ts) in self._threads:
+            # Deleting the parent message deletes the whole thread for our purposes.
+            del self._threads[(channel, ts)]
+            return
+        for (thread_channel, _), thread in self._threads.items():
+            if thread_channel == channel:
+                thread.remove(ts)
+
+    def observe_event(self, event: t.Dict[str, t.Any]) -> None:
+        """Applies a message event received from Slack to the cached threads."""
+        channel = event.get("channel")
+        if event.get("type") != "message" or not channel:
+            return
+
+        subtype = event.get("subtype")
+        if subtype == "message_changed" and event.get("message"):
+            self.update_message(channel, event["message"])
+        elif subtype == "message_deleted" and event.get("deleted_ts"):
+            self.remove_message(channel, event["deleted_ts"])
+        elif event.get("ts") and "message" not in event:
+            self.add_message(
+                channel, {k: v for k, v in event.items() if k not in ("channel", "event_ts")}
+            )
+
+    def _find_thread(self, channel: str, message: SlackMessageData) -> t.Optional[_Thread]:
+        thread = self._threads.get((channel, message.get("thread_ts") or message["ts"]))
+        if thread is not None:
+            return thread
+        for (thread_channel, _), thread in self._threads.items():
+            if thread_channel == channel and any(m["ts"] == message["ts"] for m in thread.messages):
+                return thread
+        return None
@@ -0,0 +1,121 @@
+import asyncio
+import time
+import typing as t
+from logging import getLogger
+
+from pydantic import BaseModel
+from slack_sdk.errors import SlackApiError
+
+logger = getLogger(__name__)
+
+SlackCall = t.Callable[..., t.Awaitable[t.Any]]
+
+
+class UserDirectoryConfig(BaseModel):
+    # Seconds a fetched user profile is served from the cache.
+    ttl_seconds: int = 3600
+
+    # Seconds a failed lookup (e.g. an unknown user ID) is cached for.
+    negative_ttl_seconds: int = 300
+
+    # Whether to load every workspace user with users.list in the background at startup.
+    prefetch: bool = False
+
+    # Number of users to request per users.list page.
+    page_size: int = 200
+
+
+class _Entry:
+    def __init__(
+        self,
+        user: t.Optional[t.Dict[str, t.Any]],
+        error: t.Optional[str],
+        expires_at: float,
+    ) -> None:
+        self.user = user
+        self.error = error
+        self.expires_at = expires_at
+
+
+class UserDirectory:
+    """
+    UserDirectory caches Slack user profiles. Failed lookups are cached too,
+    concurrent lookups of the same user share one users.info request, and the
+    whole workspace can optionally be loaded up front with users.list.
+    """
+
+    def __init__(self, call: SlackCall, config: t.Optional[UserDirectoryConfig] = None) -> None:
+        self._call = call
+        self._config = config or UserDirectoryConfig()
+        self._entries: t.Dict[str, _Entry] = {}
+        self._inflight: t.Dict[str, asyncio.Task] = {}
+        self._prefetch_task: t.Optional[asyncio.Task] = None
+
+    async def get_user(self, user_id: str) -> t.Dict[str, t.Any]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry.expires_at <= time.monotonic():
+            task = self._inflight.get(user_id)
+            if task is None:
+                task = asyncio.ensure_future(self._fetch(user_id))
+                self._inflight[user_id] = task
+                task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+            # Shield the shared request so that a cancelled caller doesn't cancel it for the others.
+            entry = await asyncio.shield(task)
+
+        if entry.error is not None:
+            raise Exception(f"Failed to get user info: {entry.error}")
+        assert entry.user is not None
+        return entry.user
+
+    def start_prefetch(self) -> None:
+        """Starts loading every workspace user in the background."""
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.ensure_future(self.prefetch())
+
+    async def prefetch(self) -> int:
+        """Loads every workspace user into the cache with users.list, returns the number loaded."""
+        count = 0
+        cursor = None
+        try:
+            while True:
+                response = await self._call(
+                    "users.list", limit=self._config.page_size, cursor=cursor
+                )
+                if not response["ok"]:
+                    raise Exception(f"Failed to list users: {response['error']}")
+
+                expires_at = time.monotonic() + self._config.ttl_seconds
+                for user in response["members"]:
+                    self._entries[user["id"]] = _Entry(user, None, expires_at)
+                count += len(response["members"])
+
+                cursor = (response.get("response_metadata") or {}).get("next_cursor")
+                if not cursor:
+                    break
+        except Exception:
+            logger.exception(f"Failed to prefetch Slack users after loading {count}")
+            return count
+
+        logger.info(f"Prefetched {count} Slack users")
+        return count
+
+    async def _fetch(self, user_id: str) -> _Entry:
+        try:
+            response = await self._call("users.info", user=user_id)
+        except SlackApiError as e:
+            error = e.response.get("error") if hasattr(e.response, "get") else None
+            if not error or error == "ratelimited":
+                raise e
+            return self._store(user_id, None, error)
+
+        if not response["ok"]:
+            return self._store(user_id, None, response["error"])
+        return self._store(user_id, response["user"], None)
+
+    def _store(
+        self, user_id: str, user: t.Optional[t.Dict[str, t.Any]], error: t.Optional[str]
+    ) -> _Entry:
+        ttl = self._config.ttl_seconds if error is None else self._config.negative_ttl_seconds
+        entry = _Entry(user, error, time.monotonic() + ttl)
+        self._entries[user_id] = entry
+        return entry
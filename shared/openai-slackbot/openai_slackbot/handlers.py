@@ -1,30 +1,376 @@
 import abc
+import asyncio
+import itertools
+import time
 import typing as t
+from collections import defaultdict, deque
+from enum import Enum
 from logging import getLogger
 
+from openai_slackbot import metrics, tracing
 from openai_slackbot.clients.slack import SlackClient
+from openai_slackbot.utils.dedup import EventDeduplicator
+from openai_slackbot.utils.filters import MessageFilter
+from pydantic import BaseModel
+
+if t.TYPE_CHECKING:
+    from openai_slackbot.jobs import JobRunner
 
 logger = getLogger(__name__)
 
 
+class OverflowPolicy(str, Enum):
+    # Drop the new event.
+    reject = "reject"
+
+    # Drop the oldest event that is still waiting for the same key.
+    drop_oldest = "drop_oldest"
+
+
+class ExecutorConfig(BaseModel):
+    # Maximum number of events handled concurrently across all handlers.
+    max_workers: int = 16
+
+    # Maximum number of events waiting per key, not counting the one being handled,
+    # before the overflow policy applies.
+    max_queue_size: int = 50
+
+    # Maximum number of events waiting across all keys. Events over it are rejected.
+    max_pending: int = 1000
+
+    # What to do with an event when its key's queue is full.
+    overflow_policy: OverflowPolicy = OverflowPolicy.reject
+
+    # Maximum number of events handled concurrently per handler, keyed by handler
+    # class name. Handlers that are not listed are only bound by `max_workers`.
+    handler_concurrency: t.Dict[str, int] = {}
+
+
+class KeyedExecutor:
+    """
+    KeyedExecutor runs handler work in the background with a bounded number of
+    workers. Work submitted with the same key runs one at a time in submission
+    order, while work for different keys runs concurrently.
+    """
+
+    def __init__(self, config: t.Optional[ExecutorConfig] = None) -> None:
+        self._config = config or ExecutorConfig()
+        self._workers = asyncio.Semaphore(self._config.max_workers)
+        self._handler_limits: t.Dict[str, asyncio.Semaphore] = {}
+        self._queues: t.DefaultDict[
+            t.Hashable, t.Deque[t.Tuple[str, t.Callable, t.Optional[t.Callable[[], None]]]]
+        ] = defaultdict(deque)
+        self._draining: t.Set[t.Hashable] = set()
+        self._tasks: t.Set[asyncio.Task] = set()
+        self._pending = 0
+        self._rejected = 0
+
+    def set_handler_concurrency(self, handler_name: str, max_concurrency: int) -> None:
+        self._handler_limits[handler_name] = asyncio.Semaphore(max_concurrency)
+
+    def submit(
+        self,
+        key: t.Optional[t.Hashable],
+        handler_name: str,
+        work: t.Callable[[], t.Awaitable[None]],
+        on_drop: t.Optional[t.Callable[[], None]] = None,
+    ) -> bool:
+        """
+        Queues `work` to run after earlier work with the same key. Work without a
+        key is not ordered. Returns False if the work was rejected. If the work is
+        accepted but later dropped by the overflow policy, `on_drop` is called
+        instead of running it.
+        """
+        if self._pending >= self._config.max_pending:
+            return self._reject(key, handler_name)
+
+        if key is None:
+            self._pending += 1
+            self._start(self._run(handler_name, work))
+            return True
+
+        if key not in self._draining:
+            # Nothing is running for this key, so the work starts right away.
+            self._draining.add(key)
+            self._pending += 1
+            self._start(self._drain(key, handler_name, work))
+            return True
+
+        queue = self._queues[key]
+        if len(queue) >= self._config.max_queue_size:
+            if self._config.overflow_policy == OverflowPolicy.reject:
+                return self._reject(key, handler_name)
+            dropped_handler_name, _, dropped_on_drop = queue.popleft()
+            self._pending -= 1
+            self._rejected += 1
+            logger.warning(f"Dropped oldest {dropped_handler_name} event queued for {key}")
+            if dropped_on_drop is not None:
+                dropped_on_drop()
+
+        queue.append((handler_name, work, on_drop))
+        self._pending += 1
+        return True
+
+    async def join(self) -> None:
+        """Waits until all submitted work has finished."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> t.Dict[str, int]:
+        return {
+            "pending": self._pending,
+            "active_keys": len(self._draining),
+            "rejected": self._rejected,
+        }
+
+    def _start(self, coro: t.Coroutine) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(
+        self, key: t.Hashable, handler_name: str, work: t.Callable[[], t.Awaitable[None]]
+    ) -> None:
+        queue = self._queues[key]
+        try:
+            await self._run(handler_name, work)
+            while queue:
+                handler_name, work, _ = queue.popleft()
+                await self._run(handler_name, work)
+        finally:
+            self._draining.discard(key)
+            self._queues.pop(key, None)
+
+    async def _run(self, handler_name: str, work: t.Callable[[], t.Awaitable[None]]) -> None:
+        handler_limit = self._handler_limits.get(handler_name)
+        try:
+            if handler_limit:
+                await handler_limit.acquire()
+            try:
+                async with self._workers:
+                    await work()
+            finally:
+                if handler_limit:
+                    handler_limit.release()
+        except Exception:
+            logger.exception(f"Unhandled error in {handler_name}")
+        finally:
+            self._pending -= 1
+
+    def _reject(self, key: t.Optional[t.Hashable], handler_name: str) -> bool:
+        self._rejected += 1
+        logger.warning(f"Rejected {handler_name} event for {key}, executor queue is full")
+        return False
+
+
+class InFlightEvents:
+    """
+    InFlightEvents keeps the request bodies of the events that handlers have
+    acked but not finished handling, so that the bot can wait for them, or
+    journal them, when it stops.
+    """
+
+    def __init__(self) -> None:
+        self._events: t.Dict[int, t.Tuple[str, t.Dict[str, t.Any]]] = {}
+        self._tasks: t.Dict[int, asyncio.Task] = {}
+        self._ids = itertools.count()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._cancelled = False
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, handler_name: str, body: t.Dict[str, t.Any]) -> int:
+        event_id = next(self._ids)
+        self._events[event_id] = (handler_name, body)
+        self._idle.clear()
+        return event_id
+
+    def start(self, event_id: int) -> bool:
+        """
+        Records that the current task is handling the event. Returns False if the
+        event was cancelled before it started, in which case it must not be handled.
+        """
+        if self._cancelled:
+            return False
+        task = asyncio.current_task()
+        if task is not None:
+            self._tasks[event_id] = task
+        return True
+
+    def remove(self, event_id: int) -> None:
+        self._events.pop(event_id, None)
+        self._tasks.pop(event_id, None)
+        if not self._events:
+            self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for all events to be handled. Returns whether they were."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def cancel(self) -> t.List[t.Tuple[str, t.Dict[str, t.Any]]]:
+        """
+        Cancels the events that are still being handled, and stops the ones still
+        queued from starting. Returns their handler names and request bodies, in
+        the order they were received.
+        """
+        self._cancelled = True
+        unfinished = list(self._events.values())
+        for task in self._tasks.values():
+            task.cancel()
+        return unfinished
+
+
+class ReplayedArgs:
+    """
+    ReplayedArgs stands in for the Bolt listener arguments of an event that is
+    handled again from its request body, e.g. after a restart.
+    """
+
+    def __init__(self, body: t.Dict[str, t.Any]) -> None:
+        self.body = body
+        self.event = body.get("event")
+
+    async def ack(self, *args, **kwargs) -> None:
+        # The event was acked when it was first received.
+        pass
+
+
 class BaseHandler(abc.ABC):
     def __init__(self, slack_client: SlackClient) -> None:
         self._slack_client = slack_client
+        self._executor: t.Optional[KeyedExecutor] = None
+        self._deduplicator: t.Optional[EventDeduplicator] = None
+        self._in_flight: t.Optional[InFlightEvents] = None
+        self._job_runner: t.Optional["JobRunner"] = None
+
+    def use_executor(self, executor: KeyedExecutor) -> None:
+        """Handles events on `executor` instead of inline on the Bolt listener."""
+        self._executor = executor
+
+    def use_deduplicator(self, deduplicator: EventDeduplicator) -> None:
+        """Drops events that `deduplicator` has already seen for this handler."""
+        self._deduplicator = deduplicator
+
+    def use_in_flight_events(self, in_flight: InFlightEvents) -> None:
+        """Keeps the events this handler has acked in `in_flight` until they are handled."""
+        self._in_flight = in_flight
+
+    def use_job_runner(self, job_runner: "JobRunner") -> None:
+        """
+        Handles events as jobs of `job_runner`'s durable queue, which retries them
+        when handling fails, instead of on the executor or inline.
+        """
+        self._job_runner = job_runner
+
+    def dedup_keys(self, args) -> t.List[str]:
+        """Returns the keys that identify the event, for dropping duplicate deliveries."""
+        return []
+
+    def ordering_key(self, args) -> t.Optional[t.Hashable]:
+        """
+        Returns the key whose events must be handled in order, or None if the
+        event can be handled concurrently with any other event.
+        """
+        return None
 
     async def maybe_handle(self, args):
         await args.ack()
 
-        logging_extra = self.logging_extra(args)
-        try:
-            should_handle = await self.should_handle(args)
-            logger.info(
-                f"Handler: {self.__class__.__name__}, should handle: {should_handle}",
-                extra=logging_extra,
-            )
-            if should_handle:
-                await self.handle(args)
-        except Exception:
-            logger.exception("Failed to handle event", extra=logging_extra)
+        handler_name = self.__class__.__name__
+        if self._deduplicator and self._deduplicator.is_duplicate(
+            handler_name, self.dedup_keys(args)
+        ):
+            return
+
+        # The trace starts on receipt, so time spent queued in the executor shows up in it.
+        await self._dispatch(args, tracing.start_trace(handler_name))
+
+    async def replay(self, body: t.Dict[str, t.Any]):
+        """
+        Handles an event again from its request body, e.g. one that was journaled
+        when the bot stopped. It was already acked and deduplicated when it was
+        first received.
+        """
+        await self._dispatch(ReplayedArgs(body), tracing.start_trace(self.__class__.__name__))
+
+    async def run_job(self, body: t.Dict[str, t.Any]) -> t.Optional[str]:
+        """Handles an event from the job queue. Returns the error it failed with, if any."""
+        root = tracing.start_trace(self.__class__.__name__)
+        error = await self._maybe_handle(ReplayedArgs(body), root)
+        return repr(error) if error is not None else None
+
+    async def _dispatch(self, args, root: t.Optional[tracing.Span]):
+        handler_name = self.__class__.__name__
+        if self._job_runner is not None:
+            await self._job_runner.enqueue(handler_name, args.body, self.ordering_key(args))
+            # The job is traced separately when it runs, so this trace ends here.
+            if root:
+                root.set_attribute("queued", True)
+            tracing.finish_trace(root)
+            return
+
+        in_flight = self._in_flight
+        event_id = in_flight.add(handler_name, args.body) if in_flight is not None else None
+
+        def done():
+            if event_id is not None:
+                in_flight.remove(event_id)
+            # Also ends the trace of an event that was cancelled or dropped before it started.
+            tracing.finish_trace(root)
+
+        async def handle():
+            try:
+                if event_id is None or in_flight.start(event_id):
+                    await self._maybe_handle(args, root)
+            finally:
+                done()
+
+        if self._executor is None:
+            await handle()
+        elif not self._executor.submit(self.ordering_key(args), handler_name, handle, done):
+            done()
+
+    async def _maybe_handle(
+        self, args, root: t.Optional[tracing.Span] = None
+    ) -> t.Optional[Exception]:
+        """Handles the event if it should be, and returns the error it failed with, if any."""
+        handler_name = self.__class__.__name__
+        with tracing.resume(root):
+            logging_extra = self.logging_extra(args)
+            try:
+                with tracing.span("should_handle"):
+                    should_handle = await self.should_handle(args)
+                logger.info(
+                    f"Handler: {handler_name}, should handle: {should_handle}",
+                    extra=logging_extra,
+                )
+                metrics.HANDLER_EVENTS.inc(handler=handler_name, handled=str(should_handle).lower())
+                if root and not should_handle:
+                    root.trace.discard()
+                if should_handle:
+                    start = time.monotonic()
+                    # Writes recorded in the outbox are keyed by the event, so
+                    # handling it again doesn't record them twice.
+                    dedup_keys = self.dedup_keys(args)
+                    outbox_scope = f"{handler_name}:{dedup_keys[0]}" if dedup_keys else None
+                    try:
+                        with tracing.span("handle"), self._slack_client.outbox.scope(outbox_scope):
+                            await self.handle(args)
+                    finally:
+                        metrics.HANDLER_DURATION.observe(
+                            time.monotonic() - start, handler=handler_name
+                        )
+            except Exception as e:
+                metrics.HANDLER_ERRORS.inc(handler=handler_name)
+                logger.exception("Failed to handle event", extra=logging_extra)
+                return e
+        return None
 
     @abc.abstractmethod
     async def should_handle(self, args) -> bool:
@@ -40,6 +386,35 @@ class BaseHandler(abc.ABC):
 
 
 class BaseMessageHandler(BaseHandler):
+    def message_filter(self) -> t.Optional[MessageFilter]:
+        """
+        Returns the filter that message events must match to reach this handler,
+        or None to receive every message event. Events that don't match are
+        dropped before any handler work, including should_handle and logging.
+        """
+        return None
+
+    def dedup_keys(self, args) -> t.List[str]:
+        keys = []
+        event_id = args.body.get("event_id")
+        if event_id:
+            keys.append(f"event:{event_id}")
+
+        # Edits carry the original message, which identifies the same request.
+        event = args.event
+        message = event
+        if event.get("subtype") == "message_changed":
+            message = event.get("message") or {}
+        if message.get("client_msg_id"):
+            keys.append(f"client_msg:{message['client_msg_id']}")
+        if event.get("channel") and message.get("ts"):
+            keys.append(f"message:{event['channel']}:{message['ts']}")
+        return keys
+
+    def ordering_key(self, args) -> t.Optional[t.Hashable]:
+        channel = args.event.get("channel")
+        return ("channel", channel) if channel else None
+
     def logging_extra(self, args) -> t.Dict[str, t.Any]:
         fields = {}
         for field in ["type", "subtype", "channel", "ts"]:
@@ -47,6 +422,56 @@ class BaseMessageHandler(BaseHandler):
         return fields
 
 
+_Route = t.Tuple[BaseMessageHandler, t.Optional[MessageFilter]]
+
+
+class MessageRouter:
+    """
+    MessageRouter sends each message event to the message handlers whose filter
+    it matches. Handlers are indexed at startup by the channels or channel types
+    their filter declares, so finding an event's handlers takes a dictionary
+    lookup however many handlers share the process.
+    """
+
+    def __init__(self) -> None:
+        self._by_channel: t.DefaultDict[str, t.List[_Route]] = defaultdict(list)
+        self._by_channel_type: t.DefaultDict[str, t.List[_Route]] = defaultdict(list)
+        # Handlers whose filter declares neither, checked for every event.
+        self._unindexed: t.List[_Route] = []
+
+    def add(self, handler: BaseMessageHandler) -> None:
+        message_filter = handler.message_filter()
+        route = (handler, message_filter)
+        if message_filter is not None and message_filter.channels is not None:
+            for channel in message_filter.channels:
+                self._by_channel[channel].append(route)
+        elif message_filter is not None and message_filter.channel_types is not None:
+            for channel_type in message_filter.channel_types:
+                self._by_channel_type[channel_type].append(route)
+        else:
+            self._unindexed.append(route)
+
+    def route(self, event: t.Dict[str, t.Any]) -> t.List[BaseMessageHandler]:
+        routes = itertools.chain(
+            self._by_channel.get(event.get("channel"), ()),
+            self._by_channel_type.get(event.get("channel_type"), ()),
+            self._unindexed,
+        )
+        return [
+            handler
+            for handler, message_filter in routes
+            if message_filter is None or message_filter.matches(event)
+        ]
+
+    async def dispatch(self, args) -> None:
+        """Bolt listener for message events. Events that no handler takes are only acked."""
+        handlers = self.route(args.event)
+        if len(handlers) == 1:
+            await handlers[0].maybe_handle(args)
+        elif handlers:
+            await asyncio.gather(*(handler.maybe_handle(args) for handler in handlers))
+
+
 class BaseActionHandler(BaseHandler):
     @property
     @abc.abstractmethod
@@ -56,6 +481,17 @@ class BaseActionHandler(BaseHandler):
     async def should_handle(self, args) -> bool:
         return True
 
+    def dedup_keys(self, args) -> t.List[str]:
+        actions = args.body.get("actions") or []
+        if actions and isinstance(actions[0], dict) and actions[0].get("action_ts"):
+            return [f"action:{actions[0]['action_ts']}"]
+        return []
+
+    def ordering_key(self, args) -> t.Optional[t.Hashable]:
+        message = args.body.get("message") or {}
+        thread_ts = message.get("thread_ts") or message.get("ts")
+        return ("thread", thread_ts) if thread_ts else None
+
     def logging_extra(self, args) -> t.Dict[str, t.Any]:
         return {
             "action_type": args.body.get("type"),
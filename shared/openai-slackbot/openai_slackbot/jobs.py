@@ -0,0 +1,349 @@
+import asyncio
+import json
+import sqlite3
+import time
+import typing as t
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+
+from openai_slackbot import metrics
+from openai_slackbot.utils.backoff import exponential_backoff
+from pydantic import BaseModel
+
+if t.TYPE_CHECKING:
+    from openai_slackbot.handlers import BaseHandler
+
+logger = getLogger(__name__)
+
+T = t.TypeVar("T")
+
+
+class JobQueueConfig(BaseModel):
+    # Path of the sqlite database that holds the jobs. Bots that share it, e.g.
+    # the workers of one host, share the jobs.
+    path: str = "jobs.sqlite3"
+
+    # Seconds to wait for the database while another process is writing to it,
+    # before giving up on the operation.
+    busy_timeout_seconds: float = 1
+
+    # Number of jobs run concurrently by this process.
+    workers: int = 16
+
+    # Seconds a job stays leased to the worker running it. If the worker doesn't
+    # finish it by then, e.g. because the process died, it is run again.
+    visibility_timeout_seconds: float = 300
+
+    # Number of times a job is run before it is moved to the dead letters.
+    max_attempts: int = 5
+
+    # Delay before the first retry of a failed job. It doubles on every retry,
+    # up to `backoff_max_seconds`, with random jitter.
+    backoff_base_seconds: float = 2
+
+    # Maximum delay before retrying a failed job.
+    backoff_max_seconds: float = 300
+
+    # Seconds between checks for jobs that became available without this
+    # process being notified, e.g. retries and jobs enqueued by other processes.
+    poll_interval_seconds: float = 0.5
+
+
+class Job(BaseModel):
+    id: int
+    handler: str
+    body: t.Dict[str, t.Any]
+    attempts: int
+    lease_id: t.Optional[str] = None
+    last_error: t.Optional[str] = None
+
+
+class JobQueue:
+    """
+    JobQueue is a durable queue of handler events in a sqlite database. Jobs
+    are leased to one worker at a time, retried with exponential backoff when
+    they fail, and moved to the dead letters after too many attempts. Jobs
+    with the same key are run one at a time, in the order they were enqueued.
+
+    Its methods block while another process writes to the database, so async
+    code should call them on a thread, one thread at a time, like JobRunner does.
+    """
+
+    def __init__(self, config: t.Optional[JobQueueConfig] = None) -> None:
+        self._config = config or JobQueueConfig()
+        # Transactions are managed explicitly, so that leasing is atomic across processes.
+        self._db = sqlite3.connect(
+            self._config.path,
+            isolation_level=None,
+            timeout=self._config.busy_timeout_seconds,
+            check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                handler TEXT NOT NULL,
+                key TEXT,
+                body TEXT NOT NULL,
+                dead INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_id TEXT,
+                last_error TEXT
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_available_at ON jobs (dead, available_at)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, id)")
+
+    def enqueue(
+        self, handler_name: str, body: t.Dict[str, t.Any], key: t.Optional[t.Hashable] = None
+    ) -> int:
+        cursor = self._db.execute(
+            "INSERT INTO jobs (handler, key, body, available_at) VALUES (?, ?, ?, ?)",
+            (handler_name, _encode_key(key), json.dumps(body), time.time()),
+        )
+        return t.cast(int, cursor.lastrowid)
+
+    def lease(self) -> t.Optional[Job]:
+        """
+        Leases the next available job for the visibility timeout, or returns None
+        if there is none. A job is not available while an earlier job with the
+        same key is leased or waiting to be retried.
+        """
+        now = time.time()
+        lease_id = uuid.uuid4().hex
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute(
+                """
+                SELECT id, handler, body, attempts FROM jobs AS job
+                WHERE dead = 0 AND available_at <= ? AND (
+                    key IS NULL OR NOT EXISTS (
+                        SELECT 1 FROM jobs AS earlier
+                        WHERE earlier.key = job.key AND earlier.id < job.id AND earlier.dead = 0
+                    )
+                )
+                ORDER BY available_at, id
+                LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE jobs SET attempts = attempts + 1, available_at = ?, lease_id = ? "
+                    "WHERE id = ?",
+                    (now + self._config.visibility_timeout_seconds, lease_id, row[0]),
+                )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        job_id, handler_name, body, attempts = row
+        return Job(
+            id=job_id,
+            handler=handler_name,
+            body=json.loads(body),
+            attempts=attempts + 1,
+            lease_id=lease_id,
+        )
+
+    def complete(self, job: Job) -> None:
+        """Removes a job that was handled. Does nothing if its lease was lost."""
+        self._db.execute("DELETE FROM jobs WHERE id = ? AND lease_id = ?", (job.id, job.lease_id))
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        Schedules a retry of a job that failed, or moves it to the dead letters if
+        it has no attempts left. Returns whether it will be retried.
+        """
+        if job.attempts >= self._config.max_attempts:
+            self._db.execute(
+                "UPDATE jobs SET dead = 1, lease_id = NULL, last_error = ? "
+                "WHERE id = ? AND lease_id = ?",
+                (error, job.id, job.lease_id),
+            )
+            return False
+
+        self._db.execute(
+            "UPDATE jobs SET available_at = ?, lease_id = NULL, last_error = ? "
+            "WHERE id = ? AND lease_id = ?",
+            (time.time() + self.backoff(job.attempts), error, job.id, job.lease_id),
+        )
+        return True
+
+    def release(self, job: Job) -> None:
+        """Makes a leased job available again right away, without counting the attempt."""
+        self._db.execute(
+            "UPDATE jobs SET attempts = attempts - 1, available_at = ?, lease_id = NULL "
+            "WHERE id = ? AND lease_id = ?",
+            (time.time(), job.id, job.lease_id),
+        )
+
+    def backoff(self, attempts: int) -> float:
+        """Returns the delay before retrying a job that failed `attempts` times."""
+        return exponential_backoff(
+            attempts, self._config.backoff_base_seconds, self._config.backoff_max_seconds
+        )
+
+    def lag(self) -> float:
+        """Returns how many seconds the oldest available job has been waiting to run."""
+        now = time.time()
+        (oldest,) = self._db.execute(
+            "SELECT MIN(available_at) FROM jobs WHERE dead = 0 AND available_at <= ?", (now,)
+        ).fetchone()
+        return now - oldest if oldest is not None else 0.0
+
+    def stats(self) -> t.Dict[str, int]:
+        now = time.time()
+        available, waiting, dead = self._db.execute(
+            """
+            SELECT
+                COALESCE(SUM(dead = 0 AND available_at <= ?), 0),
+                COALESCE(SUM(dead = 0 AND available_at > ?), 0),
+                COALESCE(SUM(dead = 1), 0)
+            FROM jobs
+            """,
+            (now, now),
+        ).fetchone()
+        # Waiting jobs are leased or waiting to be retried.
+        return {"available": available, "waiting": waiting, "dead": dead}
+
+    def dead_letters(self, limit: int = 100) -> t.List[Job]:
+        rows = self._db.execute(
+            "SELECT id, handler, body, attempts, last_error FROM jobs WHERE dead = 1 "
+            "ORDER BY id LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [
+            Job(
+                id=job_id,
+                handler=handler_name,
+                body=json.loads(body),
+                attempts=attempts,
+                last_error=error,
+            )
+            for job_id, handler_name, body, attempts, error in rows
+        ]
+
+    def retry_dead_letters(self) -> int:
+        """Moves all dead letters back to the queue, e.g. after fixing what made them fail."""
+        cursor = self._db.execute(
+            "UPDATE jobs SET dead = 0, attempts = 0, available_at = ? WHERE dead = 1",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class JobRunner:
+    """
+    JobRunner runs the jobs of a JobQueue on the handlers they were enqueued
+    for, with a fixed number of workers. The queue is used on a dedicated
+    thread, so that waiting for the database doesn't block the event loop.
+    """
+
+    def __init__(self, queue: JobQueue, config: t.Optional[JobQueueConfig] = None) -> None:
+        self._queue = queue
+        self._config = config or JobQueueConfig()
+        self._handlers: t.Dict[str, "BaseHandler"] = {}
+        self._workers: t.List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._queue_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-queue")
+
+    def register(self, handler: "BaseHandler") -> None:
+        handler.use_job_runner(self)
+        self._handlers[handler.__class__.__name__] = handler
+
+    async def enqueue(
+        self, handler_name: str, body: t.Dict[str, t.Any], key: t.Optional[t.Hashable] = None
+    ) -> None:
+        await self._call(self._queue.enqueue, handler_name, body, key)
+        self._wakeup.set()
+
+    def start(self) -> None:
+        for _ in range(self._config.workers):
+            self._workers.append(asyncio.ensure_future(self._work()))
+
+    async def stop(self, timeout: float) -> bool:
+        """
+        Stops leasing jobs and waits up to `timeout` seconds for the running ones.
+        Jobs that are still running after that are cancelled and returned to the
+        queue. Returns whether all running jobs finished.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if not self._workers:
+            return True
+
+        _, pending = await asyncio.wait(self._workers, timeout=timeout)
+        for worker in pending:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if pending:
+            logger.warning(f"Returned {len(pending)} unfinished jobs to the queue")
+        return not pending
+
+    def close(self) -> None:
+        self._queue_thread.shutdown()
+        self._queue.close()
+
+    async def _call(self, fn: t.Callable[..., T], *args: t.Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._queue_thread, fn, *args)
+
+    async def _work(self) -> None:
+        while not self._stopping:
+            try:
+                job = await self._call(self._queue.lease)
+            except sqlite3.OperationalError as e:
+                # E.g. another process kept the database locked past the busy timeout.
+                logger.warning(f"Failed to lease a job, retrying: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._config.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                await self._call(self._queue.release, job)
+                raise
+            except sqlite3.OperationalError:
+                # The job is run again once its lease expires.
+                logger.exception(f"Failed to update job {job.id}")
+
+    async def _run(self, job: Job) -> None:
+        handler = self._handlers.get(job.handler)
+        if handler is None:
+            error: t.Optional[str] = f"Unknown handler {job.handler}"
+        else:
+            error = await handler.run_job(job.body)
+
+        if error is None:
+            await self._call(self._queue.complete, job)
+            metrics.JOBS.inc(handler=job.handler, outcome="completed")
+        elif await self._call(self._queue.fail, job, error):
+            metrics.JOBS.inc(handler=job.handler, outcome="retried")
+            logger.warning(f"Job {job.id} for {job.handler} failed, retrying: {error}")
+        else:
+            metrics.JOBS.inc(handler=job.handler, outcome="dead_lettered")
+            logger.error(f"Job {job.id} for {job.handler} failed {job.attempts} times: {error}")
+
+
+def _encode_key(key: t.Optional[t.Hashable]) -> t.Optional[str]:
+    return json.dumps(key) if key is not None else None
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import typing as t
+from collections import defaultdict
+from logging import getLogger
+
+from pydantic import BaseModel
+
+if t.TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion
+
+logger = getLogger(__name__)
+
+# Request fields that determine the completion, and hence the cache key.
+KEY_FIELDS = ["model", "messages", "functions", "function_call", "temperature"]
+
+# Number of cache hits whose recency is kept in memory before it is written to the database.
+RECENCY_FLUSH_SIZE = 100
+
+
+class CacheConfig(BaseModel):
+    # Path of the sqlite database backing the cache. Use ":memory:" to keep
+    # the cache in process memory only.
+    path: str = "llm_cache.sqlite3"
+
+    # Maximum number of cached completions. Once it is reached, expired and then
+    # least recently used completions are evicted, down to 90% of it.
+    max_entries: int = 10_000
+
+    # How long a cached completion stays valid, unless overridden per call site.
+    default_ttl_seconds: float = 24 * 60 * 60
+
+    # Per-call-site TTL overrides, keyed by call site. A TTL of 0 disables
+    # caching for that call site.
+    ttl_seconds: t.Dict[str, float] = {}
+
+    # Call sites whose completions are cached even with a non-zero temperature.
+    # Other call sites bypass the cache for non-zero temperatures, since their
+    # answers are expected to vary.
+    cache_nonzero_temperature: t.List[str] = []
+
+    def ttl_for(self, call_site: str) -> float:
+        return self.ttl_seconds.get(call_site, self.default_ttl_seconds)
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+
+    def to_dict(self) -> t.Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "saved_seconds": self.saved_seconds,
+            "saved_tokens": self.saved_tokens,
+        }
+
+
+class CompletionCache:
+    """
+    CompletionCache is a persistent, content-addressed cache of chat completions.
+    Completions are keyed by a hash of the request fields that determine the answer,
+    stored in sqlite and bounded by an LRU policy. Cache hits update recency in
+    memory, which is written to the database in batches, e.g. before evicting.
+    """
+
+    def __init__(self, config: CacheConfig) -> None:
+        self._config = config
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(config.path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                call_site TEXT NOT NULL,
+                response TEXT NOT NULL,
+                latency REAL NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS completions_last_used_at ON completions (last_used_at)"
+        )
+        self._db.commit()
+        (self._count,) = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()
+        # Last use of the completions that were hit since recency was last written.
+        self._last_used_at: t.Dict[str, float] = {}
+        self._stats: t.DefaultDict[str, CacheStats] = defaultdict(CacheStats)
+
+    @staticmethod
+    def key(request: t.Dict[str, t.Any]) -> str:
+        fields = {field: request.get(field) for field in KEY_FIELDS}
+        content = json.dumps(fields, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def should_cache(self, call_site: str, request: t.Dict[str, t.Any]) -> bool:
+        if self._config.ttl_for(call_site) <= 0:
+            return False
+
+        # The API defaults to a non-zero temperature if none is given.
+        temperature = request.get("temperature", 1)
+        return temperature == 0 or call_site in self._config.cache_nonzero_temperature
+
+    def get(self, call_site: str, request: t.Dict[str, t.Any]) -> t.Optional["ChatCompletion"]:
+        stats = self._stats[call_site]
+        if not self.should_cache(call_site, request):
+            stats.bypassed += 1
+            return None
+
+        key = self.key(request)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, latency, total_tokens, expires_at FROM completions WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[3] <= now:
+                stats.misses += 1
+                return None
+
+            self._last_used_at[key] = now
+            if len(self._last_used_at) >= RECENCY_FLUSH_SIZE:
+                self._flush_recency()
+                self._db.commit()
+
+        response, latency, total_tokens, _ = row
+        stats.hits += 1
+        stats.saved_seconds += latency
+        stats.saved_tokens += total_tokens
+        from openai.types.chat import ChatCompletion
+
+        return ChatCompletion.model_validate_json(response)
+
+    def set(
+        self,
+        call_site: str,
+        request: t.Dict[str, t.Any],
+        response: "ChatCompletion",
+        latency: float,
+    ) -> None:
+        from openai.types.chat import ChatCompletion
+
+        if not self.should_cache(call_site, request) or not isinstance(response, ChatCompletion):
+            return
+
+        key = self.key(request)
+        now = time.time()
+        total_tokens = response.usage.total_tokens if response.usage else 0
+        with self._lock:
+            exists = self._db.execute("SELECT 1 FROM completions WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    call_site,
+                    response.model_dump_json(),
+                    latency,
+                    total_tokens,
+                    now + self._config.ttl_for(call_site),
+                    now,
+                ),
+            )
+            self._last_used_at.pop(key, None)
+            if exists is None:
+                self._count += 1
+            if self._count > self._config.max_entries:
+                self._evict()
+            self._db.commit()
+
+    def stats(self) -> t.Dict[str, t.Dict[str, float]]:
+        return {call_site: stats.to_dict() for call_site, stats in self._stats.items()}
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_recency()
+            self._db.commit()
+            self._db.close()
+
+    def _flush_recency(self) -> None:
+        self._db.executemany(
+            "UPDATE completions SET last_used_at = ? WHERE key = ?",
+            [(last_used_at, key) for key, last_used_at in self._last_used_at.items()],
+        )
+        self._last_used_at.clear()
+
+    def _evict(self) -> None:
+        self._flush_recency()
+        self._db.execute("DELETE FROM completions WHERE expires_at <= ?", (time.time(),))
+        # Other processes may use the same database, so the count is refreshed here.
+        (self._count,) = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()
+        overflow = self._count - (self._config.max_entries - self._config.max_entries // 10)
+        if overflow > 0:
+            cursor = self._db.execute(
+                """
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions ORDER BY last_used_at ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+            self._count -= cursor.rowcount
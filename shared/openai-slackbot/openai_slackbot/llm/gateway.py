@@ -0,0 +1,250 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+import typing as t
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from logging import getLogger
+
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+# Token-per-minute budgets are enforced over a sliding window of this many seconds.
+TOKEN_WINDOW_SECONDS = 60.0
+
+
+class Priority(IntEnum):
+    # Work done while a user is waiting on the bot, e.g. handling an inbound request.
+    interactive = 0
+
+    # Work that can wait, e.g. periodic re-assessments.
+    background = 1
+
+
+class ModelLimits(BaseModel):
+    # Maximum number of in-flight completions for the model.
+    max_concurrency: int = 8
+
+    # Maximum number of tokens (prompt + completion) per minute for the model.
+    # If not set, only concurrency is limited.
+    tokens_per_minute: t.Optional[int] = None
+
+
+class GatewayConfig(BaseModel):
+    # Limits applied to models that are not listed in `models`.
+    default_limits: ModelLimits = ModelLimits()
+
+    # Per-model limits, keyed by model name.
+    models: t.Dict[str, ModelLimits] = {}
+
+    def limits_for(self, model: str) -> ModelLimits:
+        return self.models.get(model, self.default_limits)
+
+
+def estimate_tokens(request: t.Dict[str, t.Any]) -> int:
+    """Roughly estimates the number of tokens a chat completion request will use."""
+    prompt = json.dumps([request.get("messages", []), request.get("functions", [])])
+    return len(prompt) // 4 + (request.get("max_tokens") or 0)
+
+
+class Slot:
+    """A reserved place in a model lane, held for the duration of a completion."""
+
+    def __init__(self, estimated_tokens: int) -> None:
+        self.estimated_tokens = estimated_tokens
+        self.used_tokens: t.Optional[int] = None
+
+    def record_usage(self, total_tokens: t.Optional[int]) -> None:
+        self.used_tokens = total_tokens
+
+
+class _Waiter:
+    def __init__(self, priority: Priority, seq: int, tokens: int, future: asyncio.Future) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _WaitStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def to_dict(self) -> t.Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "max_seconds": self.max_seconds,
+        }
+
+
+class _ModelLane:
+    def __init__(self, model: str, limits: ModelLimits) -> None:
+        self.model = model
+        self.limits = limits
+        self.in_flight = 0
+        self._waiters: t.List[_Waiter] = []
+        self._seq = itertools.count()
+        # Sliding window of [timestamp, tokens] entries for the token budget.
+        self._token_window: t.Deque[t.List[float]] = deque()
+        self._wakeup: t.Optional[asyncio.TimerHandle] = None
+        self._wait_stats = {priority: _WaitStats() for priority in Priority}
+
+    async def acquire(self, priority: Priority, tokens: int) -> t.List[float]:
+        enqueued_at = time.monotonic()
+        if not self._waiters and self._can_admit(tokens):
+            entry = self._admit(tokens)
+            self._wait_stats[priority].record(0.0)
+            return entry
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, _Waiter(priority, next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            entry = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted right as the caller was cancelled, give the slot back.
+                self.release(future.result(), None)
+            else:
+                self._remove_waiter(future)
+            raise
+
+        self._wait_stats[priority].record(time.monotonic() - enqueued_at)
+        return entry
+
+    def release(self, entry: t.List[float], used_tokens: t.Optional[int]) -> None:
+        self.in_flight -= 1
+        if used_tokens is not None:
+            entry[1] = used_tokens
+        self._dispatch()
+
+    def queue_depth(self, priority: t.Optional[Priority] = None) -> int:
+        return sum(
+            1
+            for waiter in self._waiters
+            if not waiter.future.done() and (priority is None or waiter.priority == priority)
+        )
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        return {
+            "in_flight": self.in_flight,
+            "tokens_in_window": self._tokens_in_window(),
+            "queue_depth": {priority.name: self.queue_depth(priority) for priority in Priority},
+            "wait": {priority.name: s.to_dict() for priority, s in self._wait_stats.items()},
+        }
+
+    def _can_admit(self, tokens: int) -> bool:
+        if self.in_flight >= self.limits.max_concurrency:
+            return False
+
+        budget = self.limits.tokens_per_minute
+        if budget is None:
+            return True
+
+        used = self._tokens_in_window()
+        # Always let a request through on an idle budget, even if it alone exceeds the
+        # budget, otherwise it would wait forever.
+        return used == 0 or used + tokens <= budget
+
+    def _admit(self, tokens: int) -> t.List[float]:
+        self.in_flight += 1
+        entry = [time.monotonic(), tokens]
+        self._token_window.append(entry)
+        return entry
+
+    def _tokens_in_window(self) -> int:
+        cutoff = time.monotonic() - TOKEN_WINDOW_SECONDS
+        while self._token_window and self._token_window[0][0] <= cutoff:
+            self._token_window.popleft()
+        return int(sum(tokens for _, tokens in self._token_window))
+
+    def _dispatch(self) -> None:
+        while self._waiters:
+            waiter = self._waiters[0]
+            if waiter.future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_admit(waiter.tokens):
+                break
+            heapq.heappop(self._waiters)
+            waiter.future.set_result(self._admit(waiter.tokens))
+
+        if self._waiters and self.in_flight < self.limits.max_concurrency:
+            # Blocked on the token budget only, so nothing will release a slot.
+            # Wake up once the oldest window entry expires.
+            self._schedule_wakeup()
+
+    def _schedule_wakeup(self) -> None:
+        if self._wakeup is not None or not self._token_window:
+            return
+
+        def wakeup():
+            self._wakeup = None
+            self._dispatch()
+
+        delay = self._token_window[0][0] + TOKEN_WINDOW_SECONDS - time.monotonic()
+        self._wakeup = asyncio.get_running_loop().call_later(max(delay, 0.0), wakeup)
+
+    def _remove_waiter(self, future: asyncio.Future) -> None:
+        self._waiters = [w for w in self._waiters if w.future is not future]
+        heapq.heapify(self._waiters)
+        self._dispatch()
+
+
+class LLMGateway:
+    """
+    LLMGateway queues LLM requests per model so that a burst of work cannot
+    exceed the configured concurrency and token-per-minute budgets. Waiting
+    requests are admitted in priority order, so interactive work is never
+    stuck behind background work.
+    """
+
+    def __init__(self, config: t.Optional[GatewayConfig] = None) -> None:
+        self._config = config or GatewayConfig()
+        self._lanes: t.Dict[str, _ModelLane] = {}
+
+    @asynccontextmanager
+    async def slot(
+        self, *, model: str, priority: Priority, estimated_tokens: int
+    ) -> t.AsyncIterator[Slot]:
+        lane = self._lane(model)
+        entry = await lane.acquire(priority, estimated_tokens)
+        slot = Slot(estimated_tokens)
+        try:
+            yield slot
+        finally:
+            lane.release(entry, slot.used_tokens)
+
+    def queue_depth(
+        self, model: t.Optional[str] = None, priority: t.Optional[Priority] = None
+    ) -> int:
+        return sum(
+            lane.queue_depth(priority)
+            for name, lane in self._lanes.items()
+            if model is None or name == model
+        )
+
+    def stats(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        return {name: lane.stats() for name, lane in self._lanes.items()}
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _ModelLane(model, self._config.limits_for(model))
+        return lane
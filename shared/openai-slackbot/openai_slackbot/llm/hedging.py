@@ -0,0 +1,175 @@
+import asyncio
+import time
+import typing as t
+from collections import defaultdict, deque
+from logging import getLogger
+
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+T = t.TypeVar("T")
+
+# Number of recent primary latencies kept per call site to estimate percentiles.
+LATENCY_WINDOW_SIZE = 200
+
+
+class HedgePolicy(BaseModel):
+    # Total latency budget for the call, in seconds. The call fails with a
+    # timeout if no valid answer arrives within it.
+    deadline_seconds: float = 30.0
+
+    # Faster model to send a hedge request to when the primary request is slow.
+    # If not set, only the deadline applies.
+    fallback_model: t.Optional[str] = None
+
+    # Percentile of recent primary latencies after which the hedge request is sent.
+    hedge_percentile: float = 95.0
+
+    # Hedge delay to use until `min_samples` primary latencies have been observed.
+    hedge_after_seconds: float = 5.0
+
+    # Number of primary latencies to observe before using the percentile.
+    min_samples: int = 20
+
+
+class HedgingConfig(BaseModel):
+    # Policy for call sites that are not listed in `call_sites`. If not set,
+    # those call sites have no deadline and are never hedged.
+    default: t.Optional[HedgePolicy] = None
+
+    # Per-call-site policies, keyed by call site.
+    call_sites: t.Dict[str, HedgePolicy] = {}
+
+    def policy_for(self, call_site: str) -> t.Optional[HedgePolicy]:
+        return self.call_sites.get(call_site, self.default)
+
+
+class HedgeStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.timeouts = 0
+        self.latencies: t.Deque[float] = deque(maxlen=LATENCY_WINDOW_SIZE)
+
+    def percentile(self, percentile: float) -> t.Optional[float]:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        return latencies[index]
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "requests": self.requests,
+            "hedges_fired": self.hedges_fired,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "timeouts": self.timeouts,
+            "p95_seconds": self.percentile(95),
+        }
+
+
+class Hedger:
+    """
+    Hedger bounds LLM calls by a per-call-site deadline. If the primary request
+    takes longer than its usual tail latency, a hedge request is sent to a faster
+    fallback model; the first valid answer wins and the other request is cancelled.
+    """
+
+    def __init__(self, config: t.Optional[HedgingConfig] = None) -> None:
+        self._config = config or HedgingConfig()
+        self._stats: t.DefaultDict[str, HedgeStats] = defaultdict(HedgeStats)
+
+    def policy_for(self, call_site: str) -> t.Optional[HedgePolicy]:
+        return self._config.policy_for(call_site)
+
+    def hedge_delay(self, call_site: str, policy: HedgePolicy) -> float:
+        stats = self._stats[call_site]
+        if len(stats.latencies) < policy.min_samples:
+            return policy.hedge_after_seconds
+        return stats.percentile(policy.hedge_percentile) or policy.hedge_after_seconds
+
+    async def run(
+        self,
+        *,
+        call_site: str,
+        policy: HedgePolicy,
+        primary_model: str,
+        call: t.Callable[[str], t.Awaitable[T]],
+        is_valid: t.Callable[[T], bool] = lambda _: True,
+    ) -> T:
+        """Runs `call` with the primary model, hedging with the fallback model if needed."""
+        stats = self._stats[call_site]
+        stats.requests += 1
+
+        start = time.monotonic()
+        deadline = start + policy.deadline_seconds
+        primary = asyncio.ensure_future(call(primary_model))
+        pending = {primary}
+        hedge: t.Optional[asyncio.Future] = None
+        last_error: t.Optional[BaseException] = None
+
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    stats.timeouts += 1
+                    raise asyncio.TimeoutError(
+                        f"LLM call for {call_site} exceeded {policy.deadline_seconds}s deadline"
+                    )
+
+                timeout = deadline - now
+                if hedge is None and policy.fallback_model:
+                    timeout = min(
+                        timeout, max(0.0, start + self.hedge_delay(call_site, policy) - now)
+                    )
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    if task is primary and not task.exception():
+                        stats.latencies.append(time.monotonic() - start)
+
+                    if task.exception():
+                        last_error = task.exception()
+                        logger.warning(f"LLM call for {call_site} failed: {last_error!r}")
+                    elif is_valid(task.result()):
+                        if task is hedge:
+                            stats.hedge_wins += 1
+                        else:
+                            stats.primary_wins += 1
+                        return task.result()
+
+                # Send the hedge request once the primary is slower than usual, or
+                # as soon as it has failed without a valid answer.
+                if (
+                    hedge is None
+                    and policy.fallback_model
+                    and (
+                        not pending
+                        or time.monotonic() - start >= self.hedge_delay(call_site, policy)
+                    )
+                ):
+                    stats.hedges_fired += 1
+                    logger.info(f"Hedging LLM call for {call_site} with {policy.fallback_model}")
+                    hedge = asyncio.ensure_future(call(policy.fallback_model))
+                    pending.add(hedge)
+
+            if last_error is not None:
+                raise last_error
+            raise ValueError(f"No valid LLM answer for {call_site}")
+        finally:
+            if primary in pending:
+                # The primary took at least this long, which keeps the percentile
+                # from drifting down when slow primaries keep losing to hedges.
+                stats.latencies.append(time.monotonic() - start)
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        return {call_site: stats.to_dict() for call_site, stats in self._stats.items()}
@@ -0,0 +1,32 @@
+import typing as t
+
+from pydantic import BaseModel
+
+
+class ModelRoute(BaseModel):
+    # Model to use for the task.
+    model: str
+
+    # Maximum number of tokens to generate. If not set, the API default is used.
+    max_tokens: t.Optional[int] = None
+
+    # Sampling temperature. If not set, the API default is used.
+    temperature: t.Optional[float] = None
+
+    def completion_kwargs(self) -> t.Dict[str, t.Any]:
+        """Returns the chat completion arguments for this route."""
+        return self.model_dump(exclude_none=True)
+
+
+def with_default_routes(
+    defaults: t.Dict[str, ModelRoute]
+) -> t.Callable[[t.Dict[str, ModelRoute]], t.Dict[str, ModelRoute]]:
+    """
+    Returns a validator that fills in the routes for tasks that are missing
+    from a configured routing table.
+    """
+
+    def validate(routes: t.Dict[str, ModelRoute]) -> t.Dict[str, ModelRoute]:
+        return {**defaults, **routes}
+
+    return validate
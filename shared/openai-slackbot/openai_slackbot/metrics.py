@@ -0,0 +1,278 @@
+import bisect
+import typing as t
+from collections import defaultdict
+from logging import getLogger
+
+from aiohttp import web
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+LabelValues = t.Tuple[str, ...]
+
+# Default histogram buckets, in seconds. Sized for Slack API calls at the low
+# end and LLM completions at the high end.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_METRICS_RUNNER: t.Optional[web.AppRunner] = None
+
+
+class MetricsConfig(BaseModel):
+    # Whether to serve metrics over HTTP.
+    enabled: bool = False
+
+    # Address to serve metrics on. Defaults to local connections only.
+    host: str = "127.0.0.1"
+
+    # Port to serve metrics on, at the /metrics path.
+    port: int = 9100
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: t.Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _label_values(self, labels: t.Dict[str, t.Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: t.Sequence[t.Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> t.List[str]:
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: t.Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: t.DefaultDict[LabelValues, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self._values[self._label_values(labels)] += amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self) -> t.List[str]:
+        return [
+            f"{self.name}{self._format_labels(values)} {value}"
+            for values, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge whose values are read from a callback when metrics are collected."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: t.Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._functions: t.Dict[LabelValues, t.Callable[[], float]] = {}
+
+    def set_function(self, function: t.Callable[[], float], **labels) -> None:
+        self._functions[self._label_values(labels)] = function
+
+    def samples(self) -> t.List[str]:
+        samples = []
+        for values, function in sorted(self._functions.items(), key=lambda item: item[0]):
+            try:
+                samples.append(f"{self.name}{self._format_labels(values)} {float(function())}")
+            except Exception:
+                logger.exception(f"Failed to collect {self.name}")
+        return samples
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: t.Sequence[str] = (),
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        self._counts: t.Dict[LabelValues, t.List[int]] = {}
+        self._sums: t.DefaultDict[LabelValues, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels) -> None:
+        values = self._label_values(labels)
+        if values not in self._counts:
+            # One count per bucket, plus one for +Inf.
+            self._counts[values] = [0] * (len(self._buckets) + 1)
+        self._counts[values][bisect.bisect_left(self._buckets, value)] += 1
+        self._sums[values] += value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._label_values(labels), []))
+
+    def samples(self) -> t.List[str]:
+        samples = []
+        for values, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bucket, count in zip([*self._buckets, float("inf")], counts):
+                cumulative += count
+                le = "+Inf" if bucket == float("inf") else str(bucket)
+                samples.append(
+                    f"{self.name}_bucket{self._format_labels(values, [('le', le)])} {cumulative}"
+                )
+            samples.append(f"{self.name}_sum{self._format_labels(values)} {self._sums[values]}")
+            samples.append(f"{self.name}_count{self._format_labels(values)} {cumulative}")
+        return samples
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: t.List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        return "\n".join(metric.expose() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+HANDLER_EVENTS = REGISTRY.register(
+    Counter(
+        "slackbot_handler_events_total",
+        "Events received by each handler, by whether should_handle accepted them.",
+        ["handler", "handled"],
+    )
+)
+HANDLER_ERRORS = REGISTRY.register(
+    Counter("slackbot_handler_errors_total", "Events that failed in each handler.", ["handler"])
+)
+HANDLER_DURATION = REGISTRY.register(
+    Histogram(
+        "slackbot_handler_duration_seconds",
+        "Time spent handling accepted events, per handler.",
+        ["handler"],
+    )
+)
+SLACK_REQUESTS = REGISTRY.register(
+    Counter(
+        "slackbot_slack_requests_total",
+        "Slack Web API requests, by method and status (ok, error or ratelimited).",
+        ["method", "status"],
+    )
+)
+SLACK_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "slackbot_slack_request_duration_seconds",
+        "Latency of Slack Web API requests, per method.",
+        ["method"],
+    )
+)
+LLM_REQUESTS = REGISTRY.register(
+    Counter(
+        "slackbot_llm_requests_total",
+        "LLM chat completions, by call site and status (ok, error or cached).",
+        ["call_site", "status"],
+    )
+)
+LLM_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "slackbot_llm_request_duration_seconds",
+        "Latency of LLM chat completion requests, per call site.",
+        ["call_site"],
+    )
+)
+LLM_TOKENS = REGISTRY.register(
+    Counter(
+        "slackbot_llm_tokens_total",
+        "Tokens used by LLM chat completions, by call site and kind (prompt or completion).",
+        ["call_site", "kind"],
+    )
+)
+QUEUE_DEPTH = REGISTRY.register(
+    Gauge("slackbot_queue_depth", "Number of items waiting in each internal queue.", ["queue"])
+)
+JOB_QUEUE_LAG = REGISTRY.register(
+    Gauge(
+        "slackbot_job_queue_lag_seconds",
+        "Seconds the oldest available job has been waiting to run.",
+        [],
+    )
+)
+JOBS = REGISTRY.register(
+    Counter(
+        "slackbot_jobs_total",
+        "Jobs run, by handler and outcome (completed, retried or dead_lettered).",
+        ["handler", "outcome"],
+    )
+)
+SLACK_OUTBOX_WRITES = REGISTRY.register(
+    Counter(
+        "slackbot_slack_outbox_writes_total",
+        "Attempts to send Slack writes from the outbox, by method and status "
+        "(delivered, retried or dropped).",
+        ["method", "status"],
+    )
+)
+SOCKET_MODE_ENVELOPES = REGISTRY.register(
+    Counter(
+        "slackbot_socket_mode_envelopes_total",
+        "Socket Mode envelopes received, by connection and envelope type.",
+        ["connection", "type"],
+    )
+)
+SOCKET_MODE_RECONNECT_GAP = REGISTRY.register(
+    Histogram(
+        "slackbot_socket_mode_reconnect_gap_seconds",
+        "Time from a Socket Mode connection closing to its replacement saying hello.",
+        ["connection"],
+    )
+)
+
+
+async def start_metrics_server(config: MetricsConfig) -> web.AppRunner:
+    """Serves the metrics registry at http://<host>:<port>/metrics."""
+
+    async def handle_metrics(_: web.Request) -> web.Response:
+        return web.Response(text=REGISTRY.expose(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+
+    global _METRICS_RUNNER
+    _METRICS_RUNNER = web.AppRunner(app)
+    await _METRICS_RUNNER.setup()
+    await web.TCPSite(_METRICS_RUNNER, config.host, config.port).start()
+    logger.info(f"Serving metrics on http://{config.host}:{config.port}/metrics")
+    return _METRICS_RUNNER
+
+
+async def stop_metrics_server() -> None:
+    global _METRICS_RUNNER
+    if _METRICS_RUNNER is not None:
+        await _METRICS_RUNNER.cleanup()
+        _METRICS_RUNNER = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+import typing as t
+from enum import Enum
+from logging import getLogger
+
+from aiohttp import WSMessage, web
+from openai_slackbot.metrics import SOCKET_MODE_ENVELOPES, SOCKET_MODE_RECONNECT_GAP
+from pydantic import BaseModel
+from slack_bolt.app.async_app import AsyncApp
+from slack_sdk.socket_mode.aiohttp import SocketModeClient
+
+logger = getLogger(__name__)
+
+_STOP_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+
+
+class EventsMode(str, Enum):
+    # Receive events over a Socket Mode websocket, using SOCKET_APP_TOKEN.
+    socket_mode = "socket_mode"
+
+    # Receive events and interactions as HTTP requests from Slack, verified with
+    # SLACK_SIGNING_SECRET.
+    http = "http"
+
+
+class EventsConfig(BaseModel):
+    # How the bot receives events from Slack.
+    mode: EventsMode = EventsMode.socket_mode
+
+    # Address to serve the Events API on, in HTTP mode.
+    host: str = "0.0.0.0"
+
+    # Port to serve the Events API on, in HTTP mode.
+    port: int = 3000
+
+    # Path to configure as the Request URL of the Slack app, in HTTP mode.
+    path: str = "/slack/events"
+
+    # Number of worker processes serving the Events API, in HTTP mode. Workers
+    # share the port and each runs its own copy of the bot.
+    workers: int = 1
+
+    # Number of Socket Mode connections to open, in Socket Mode. Slack allows up
+    # to 10 per app and spreads envelopes across them, so events keep arriving
+    # while one connection reconnects.
+    connections: int = 1
+
+    # Seconds between opening each Socket Mode connection, so that Slack's
+    # periodic refreshes don't reconnect them all at the same time.
+    connection_stagger_seconds: float = 10
+
+
+class SocketModeMonitor:
+    """
+    SocketModeMonitor counts the envelopes received on a Socket Mode connection
+    and measures how long it takes to reconnect each time Slack closes it, e.g.
+    for its periodic refreshes.
+    """
+
+    def __init__(self, client: SocketModeClient, connection: str) -> None:
+        self._connection = connection
+        self._disconnected_at: t.Optional[float] = None
+        client.on_message_listeners.append(self._on_message)
+        client.on_close_listeners.append(self._on_close)
+
+    async def _on_message(self, message: WSMessage) -> None:
+        try:
+            data = json.loads(message.data)
+        except ValueError:
+            return
+
+        message_type = data.get("type")
+        if message_type == "hello":
+            if self._disconnected_at is not None:
+                gap = time.monotonic() - self._disconnected_at
+                SOCKET_MODE_RECONNECT_GAP.observe(gap, connection=self._connection)
+                logger.info(f"Socket Mode connection {self._connection} reconnected in {gap:.2f}s")
+                self._disconnected_at = None
+        elif message_type == "disconnect":
+            logger.info(
+                f"Slack is closing Socket Mode connection {self._connection} "
+                f"(reason: {data.get('reason')})"
+            )
+            self._mark_disconnected()
+        elif data.get("envelope_id"):
+            SOCKET_MODE_ENVELOPES.inc(connection=self._connection, type=message_type)
+
+    async def _on_close(self, message: WSMessage) -> None:
+        self._mark_disconnected()
+
+    def _mark_disconnected(self) -> None:
+        if self._disconnected_at is None:
+            self._disconnected_at = time.monotonic()
+
+
+async def start_http_app(app: AsyncApp, config: EventsConfig) -> None:
+    """
+    Serves Slack's Events API and interactivity requests to the app at
+    http://<host>:<port><path> until cancelled. With several workers, each one
+    binds the port with SO_REUSEPORT so that the kernel spreads connections
+    across them.
+    """
+    runner = web.AppRunner(app.web_app(path=config.path, port=config.port))
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, config.host, config.port, reuse_port=config.workers > 1)
+        await site.start()
+        logger.info(
+            f"Serving Slack events on http://{config.host}:{config.port}{config.path} "
+            f"(pid: {os.getpid()})"
+        )
+        await asyncio.sleep(float("inf"))
+    finally:
+        await runner.cleanup()
+
+
+def run_workers(
+    target: t.Callable[[int], None], workers: int, restart_delay_seconds: float = 1.0
+) -> None:
+    """
+    Forks `workers` processes that each call `target` with their worker index
+    from 0 to `workers - 1`, and restarts any that
+    exit until this process receives SIGINT or SIGTERM, which is passed on to
+    the workers as SIGINT. Returns once all workers have exited.
+    """
+    context = multiprocessing.get_context("fork")
+    processes: t.Dict[int, multiprocessing.process.BaseProcess] = {}
+    stopping = False
+
+    def start(index: int) -> None:
+        process = context.Process(target=_run_worker, args=(target, index), name=f"worker-{index}")
+        # Stop signals are blocked until the worker has replaced the handlers it
+        # inherits from this process.
+        signal.pthread_sigmask(signal.SIG_BLOCK, _STOP_SIGNALS)
+        try:
+            process.start()
+            processes[index] = process
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+
+    def stop(signum: int, _: t.Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.pid is not None and process.exitcode is None:
+                os.kill(process.pid, signal.SIGINT)
+
+    previous_handlers = {sig: signal.signal(sig, stop) for sig in _STOP_SIGNALS}
+    try:
+        for index in range(workers):
+            start(index)
+
+        while processes:
+            multiprocessing.connection.wait([process.sentinel for process in processes.values()])
+            for index, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+
+                process.join()
+                del processes[index]
+                if stopping:
+                    continue
+
+                logger.error(
+                    f"Worker {process.pid} exited with code {process.exitcode}, restarting it"
+                )
+                time.sleep(restart_delay_seconds)
+                if not stopping:
+                    start(index)
+    finally:
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+
+
+def _run_worker(target: t.Callable[[int], None], index: int) -> None:
+    # Leave the parent's process group, so that a Ctrl-C in the terminal only
+    # reaches the parent, which then stops each worker exactly once.
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+    try:
+        target(index)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,137 @@
+import asyncio
+import time
+import typing as t
+from logging import getLogger
+
+from openai_slackbot.clients.outbox import SlackOutbox
+from openai_slackbot.handlers import BaseHandler, InFlightEvents
+from openai_slackbot.jobs import JobRunner
+from openai_slackbot.utils.journal import EventJournal
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+_GRACEFUL_SHUTDOWN: t.Optional["GracefulShutdown"] = None
+
+
+class ShutdownConfig(BaseModel):
+    # Seconds to wait, once the bot stops receiving events, for the events it is
+    # still handling. Keep it under the time the bot is given to stop, e.g. 30s
+    # by default on Kubernetes.
+    drain_timeout_seconds: float = 20
+
+    # Path of a sqlite database that keeps the events that were not handled by
+    # the deadline, so that they are handled on the next startup. Each HTTP
+    # worker appends its number to it. If not set, they are dropped.
+    journal_path: t.Optional[str] = None
+
+
+class GracefulShutdown:
+    """
+    GracefulShutdown waits for the events that handlers are still handling when
+    the bot stops, journals the ones that don't finish in time, and replays the
+    journal when the bot starts again.
+    """
+
+    def __init__(self, config: t.Optional[ShutdownConfig] = None) -> None:
+        self._config = config or ShutdownConfig()
+        self._in_flight = InFlightEvents()
+        self._handlers: t.Dict[str, BaseHandler] = {}
+        self._journal = (
+            EventJournal(self._config.journal_path) if self._config.journal_path else None
+        )
+        self._replaying: t.Set[asyncio.Task] = set()
+        self._job_runner: t.Optional[JobRunner] = None
+        self._outbox: t.Optional[SlackOutbox] = None
+
+    def use_job_runner(self, job_runner: JobRunner) -> None:
+        """Also waits for the jobs `job_runner` is running, and returns the rest to its queue."""
+        self._job_runner = job_runner
+
+    def use_outbox(self, outbox: SlackOutbox) -> None:
+        """Also waits, once handlers are done, for the Slack writes they recorded in `outbox`."""
+        self._outbox = outbox
+
+    def register(self, handler: BaseHandler) -> None:
+        handler.use_in_flight_events(self._in_flight)
+        self._handlers[handler.__class__.__name__] = handler
+
+    def replay(self) -> int:
+        """
+        Starts handling the events journaled when the bot last stopped, in the
+        background, and returns how many there were.
+        """
+        if self._journal is None:
+            return 0
+
+        entries = self._journal.pop_all()
+        for handler_name, body in entries:
+            handler = self._handlers.get(handler_name)
+            if handler is None:
+                logger.warning(f"Dropped journaled event for unknown handler {handler_name}")
+                continue
+            task = asyncio.ensure_future(handler.replay(body))
+            self._replaying.add(task)
+            task.add_done_callback(self._replaying.discard)
+
+        if entries:
+            logger.info(f"Replaying {len(entries)} events journaled at shutdown")
+        return len(entries)
+
+    async def drain(self) -> bool:
+        """
+        Waits for the events being handled to finish, up to the drain timeout, then
+        cancels the rest and journals them. Returns whether all events finished.
+        """
+        timeout = self._config.drain_timeout_seconds
+        deadline = time.monotonic() + timeout
+        if self._job_runner is None:
+            finished = await self._drain_in_flight(timeout)
+        else:
+            jobs_finished, events_finished = await asyncio.gather(
+                self._job_runner.stop(timeout), self._drain_in_flight(timeout)
+            )
+            finished = jobs_finished and events_finished
+
+        if self._outbox is not None:
+            outbox_flushed = await self._outbox.flush(max(0.0, deadline - time.monotonic()))
+            finished = finished and outbox_flushed
+        return finished
+
+    async def _drain_in_flight(self, timeout: float) -> bool:
+        if len(self._in_flight):
+            logger.info(f"Waiting for {len(self._in_flight)} events to be handled")
+        if await self._in_flight.wait_idle(timeout):
+            return True
+
+        unfinished = self._in_flight.cancel()
+        if self._journal is not None:
+            self._journal.append(unfinished)
+            logger.warning(f"Journaled {len(unfinished)} events that were not handled in time")
+        else:
+            logger.error(
+                f"Dropped {len(unfinished)} events that were not handled in time, "
+                "set shutdown.journal_path to handle them on the next startup"
+            )
+        return False
+
+    def close(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+        if self._job_runner is not None:
+            self._job_runner.close()
+
+
+def init_graceful_shutdown(config: t.Optional[ShutdownConfig] = None) -> GracefulShutdown:
+    global _GRACEFUL_SHUTDOWN
+    if _GRACEFUL_SHUTDOWN is not None:
+        _GRACEFUL_SHUTDOWN.close()
+    _GRACEFUL_SHUTDOWN = GracefulShutdown(config)
+    return _GRACEFUL_SHUTDOWN
+
+
+def get_graceful_shutdown() -> GracefulShutdown:
+    global _GRACEFUL_SHUTDOWN
+    if _GRACEFUL_SHUTDOWN is None:
+        raise Exception("Graceful shutdown not initialized, call init_graceful_shutdown() first")
+    return _GRACEFUL_SHUTDOWN
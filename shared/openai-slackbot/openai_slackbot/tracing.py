@@ -0,0 +1,244 @@
+import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+import typing as t
+import uuid
+from contextvars import ContextVar
+from logging import getLogger
+
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+_TRACING_CONFIG: t.Optional["TracingConfig"] = None
+
+_CURRENT_SPAN: ContextVar[t.Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class TracingConfig(BaseModel):
+    # Whether to trace events. Spans are only recorded while handling an event.
+    enabled: bool = False
+
+    # Directory that traces are written to, one Chrome trace JSON file per event.
+    output_dir: str = "traces"
+
+    # Only traces of events that took at least this many seconds are written.
+    min_duration_seconds: float = 0
+
+    # Maximum number of spans recorded per trace. Further spans are dropped.
+    max_spans: int = 1000
+
+
+class Trace:
+    def __init__(self, config: TracingConfig) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.spans: t.List["Span"] = []
+        self.dropped_spans = 0
+        self.max_spans = config.max_spans
+        self.discarded = False
+        self._config = config
+        self._task_ids: t.Dict[t.Optional[asyncio.Task], int] = {}
+
+    def task_id(self) -> int:
+        """Returns a small id for the current asyncio task, so concurrent spans get their own row."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        return self._task_ids.setdefault(task, len(self._task_ids) + 1)
+
+    def to_chrome_trace(self) -> t.Dict[str, t.Any]:
+        """Returns the trace in the Chrome trace event format, e.g. for chrome://tracing or Perfetto."""
+        start = self.spans[0].start
+        return {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": round((span.start - start) * 1e6),
+                    "dur": round(span.duration * 1e6),
+                    "pid": 1,
+                    "tid": span.task_id,
+                    "args": {
+                        "span_id": span.span_id,
+                        "parent_id": span.parent_id,
+                        **span.attributes,
+                    },
+                }
+                for span in self.spans
+            ],
+            "otherData": {"trace_id": self.trace_id, "dropped_spans": self.dropped_spans},
+        }
+
+    def discard(self) -> None:
+        """Marks the trace as not worth writing, e.g. for an event the handler skipped."""
+        self.discarded = True
+
+    def write(self) -> t.Optional[str]:
+        root = self.spans[0]
+        if self.discarded or root.duration < self._config.min_duration_seconds:
+            return None
+
+        os.makedirs(self._config.output_dir, exist_ok=True)
+        path = os.path.join(
+            self._config.output_dir, f"{int(time.time())}-{root.name}-{self.trace_id}.json"
+        )
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        return path
+
+
+class Span:
+    def __init__(
+        self,
+        trace: Trace,
+        name: str,
+        parent_id: t.Optional[int],
+        attributes: t.Dict[str, t.Any],
+    ) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = len(trace.spans) + trace.dropped_spans + 1
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.task_id = trace.task_id()
+        self.start = time.perf_counter()
+        self.end: t.Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def set_attribute(self, name: str, value: t.Any) -> None:
+        self.attributes[name] = value
+
+    def finish(self) -> None:
+        if self.end is None:
+            self.end = time.perf_counter()
+
+
+def init_tracing(config: t.Optional[TracingConfig] = None) -> None:
+    global _TRACING_CONFIG
+    _TRACING_CONFIG = config or TracingConfig()
+    if _TRACING_CONFIG.enabled:
+        _install_log_record_factory()
+
+
+def start_trace(name: str, **attributes) -> t.Optional[Span]:
+    """
+    Starts a trace and returns its root span, or None if tracing is disabled.
+    The root span is made current with `resume`, possibly in another task.
+    """
+    if _TRACING_CONFIG is None or not _TRACING_CONFIG.enabled:
+        return None
+    trace = Trace(_TRACING_CONFIG)
+    root = Span(trace, name, None, attributes)
+    trace.spans.append(root)
+    return root
+
+
+@contextlib.contextmanager
+def resume(root: t.Optional[Span]) -> t.Iterator[t.Optional[Span]]:
+    """Makes `root` the current span, then finishes its trace and writes it out on exit."""
+    if root is None:
+        yield None
+        return
+
+    token = _CURRENT_SPAN.set(root)
+    try:
+        yield root
+    finally:
+        _CURRENT_SPAN.reset(token)
+        finish_trace(root)
+
+
+def finish_trace(root: t.Optional[Span]) -> None:
+    if root is None or root.end is not None:
+        return
+    root.finish()
+    try:
+        path = root.trace.write()
+    except Exception:
+        logger.exception(f"Failed to write trace {root.trace.trace_id}")
+        return
+    if path:
+        logger.info(f"Wrote {root.name} trace ({root.duration:.3f}s) to {path}")
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes) -> t.Iterator[t.Optional[Span]]:
+    """
+    Records a child span of the current span. Outside of a trace this does
+    nothing and yields None.
+    """
+    parent = _CURRENT_SPAN.get()
+    if parent is None or parent.end is not None:
+        yield None
+        return
+
+    trace = parent.trace
+    if len(trace.spans) >= trace.max_spans:
+        trace.dropped_spans += 1
+        yield None
+        return
+
+    child = Span(trace, name, parent.span_id, attributes)
+    trace.spans.append(child)
+    token = _CURRENT_SPAN.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_attribute("error", type(e).__name__)
+        raise
+    finally:
+        _CURRENT_SPAN.reset(token)
+        child.finish()
+
+
+def traced(name: t.Optional[str] = None) -> t.Callable:
+    """Decorates a coroutine function so that each call is recorded as a span."""
+
+    def decorator(func: t.Callable) -> t.Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls: t.Type) -> t.Type:
+    """Decorates a class so that calls to its public coroutine methods are recorded as spans."""
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+def current_trace_id() -> t.Optional[str]:
+    current = _CURRENT_SPAN.get()
+    return current.trace.trace_id if current else None
+
+
+def _install_log_record_factory() -> None:
+    """Adds the current trace_id to every log record, like a `extra={"trace_id": ...}` would."""
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "_adds_trace_id", False):
+        return
+
+    def record_factory(*args, **kwargs) -> logging.LogRecord:
+        record = factory(*args, **kwargs)
+        record.trace_id = current_trace_id()
+        return record
+
+    record_factory._adds_trace_id = True
+    logging.setLogRecordFactory(record_factory)
@@ -0,0 +1,12 @@
+import random
+
+
+def exponential_backoff(attempts: int, base_seconds: float, max_seconds: float) -> float:
+    """
+    Returns the delay before retrying something that failed `attempts` times.
+    The delay doubles with every attempt up to `max_seconds`, and half of it
+    is random so that things that failed together are not all retried at the
+    same time.
+    """
+    delay = min(max_seconds, base_seconds * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
@@ -0,0 +1,135 @@
+import sqlite3
+import time
+import typing as t
+from collections import OrderedDict, defaultdict
+from logging import getLogger
+
+from pydantic import BaseModel
+
+logger = getLogger(__name__)
+
+# Seconds between deletions of expired events from the database.
+SWEEP_INTERVAL_SECONDS = 60
+
+
+class DedupConfig(BaseModel):
+    # Seconds an event is remembered for. Slack retries unacknowledged events
+    # within a few minutes.
+    window_seconds: float = 600
+
+    # Path of a sqlite database that remembers events across restarts. Bots that
+    # share it, e.g. the HTTP workers of one host, drop each other's duplicates.
+    # If not set, events are only remembered in process memory.
+    path: t.Optional[str] = None
+
+
+class DedupStats:
+    def __init__(self) -> None:
+        self.checked = 0
+        self.duplicates = 0
+
+    def to_dict(self) -> t.Dict[str, int]:
+        return {"checked": self.checked, "duplicates": self.duplicates}
+
+
+class EventDeduplicator:
+    """
+    EventDeduplicator remembers the keys of recently handled Slack events, such
+    as their event_id, client_msg_id and (channel, ts), so that redelivered
+    events and other variants of the same message can be dropped.
+    """
+
+    def __init__(self, config: t.Optional[DedupConfig] = None) -> None:
+        self._config = config or DedupConfig()
+        # Keys are inserted with the same window, so they expire in insertion order.
+        self._seen: t.OrderedDict[str, float] = OrderedDict()
+        self._db: t.Optional[sqlite3.Connection] = None
+        self._next_sweep_at = 0.0
+        if self._config.path:
+            # Transactions are managed explicitly, so that claiming keys is atomic across processes.
+            self._db = sqlite3.connect(self._config.path, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            # Commits don't wait for the disk, at the risk of forgetting the last events
+            # on power loss.
+            self._db.execute("PRAGMA synchronous = NORMAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS seen_events (
+                    key TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS seen_events_expires_at ON seen_events (expires_at)"
+            )
+        self._stats: t.DefaultDict[str, DedupStats] = defaultdict(DedupStats)
+
+    def is_duplicate(self, handler_name: str, keys: t.Sequence[str]) -> bool:
+        """
+        Returns whether an event with any of `keys` was already seen by the handler,
+        and remembers the keys either way.
+        """
+        stats = self._stats[handler_name]
+        stats.checked += 1
+        if not keys:
+            return False
+
+        keys = [f"{handler_name}:{key}" for key in keys]
+        now = time.time()
+        self._expire(now)
+
+        expires_at = now + self._config.window_seconds
+        duplicate = any(key in self._seen for key in keys)
+        self._remember(keys, expires_at)
+        if self._db is not None:
+            duplicate = not self._claim_in_db(keys, now, expires_at) or duplicate
+        if duplicate:
+            stats.duplicates += 1
+            logger.info(f"Dropped duplicate event for {handler_name}: {keys}")
+        return duplicate
+
+    def stats(self) -> t.Dict[str, t.Dict[str, int]]:
+        return {handler_name: stats.to_dict() for handler_name, stats in self._stats.items()}
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+
+    def _expire(self, now: float) -> None:
+        while self._seen:
+            key, expires_at = next(iter(self._seen.items()))
+            if expires_at > now:
+                break
+            del self._seen[key]
+
+    def _remember(self, keys: t.List[str], expires_at: float) -> None:
+        for key in keys:
+            self._seen.pop(key, None)
+            self._seen[key] = expires_at
+
+    def _claim_in_db(self, keys: t.List[str], now: float, expires_at: float) -> bool:
+        """
+        Records the keys in the database. Returns whether none of them was seen
+        before, in which case this process is the one that handles the event.
+        """
+        assert self._db is not None
+        claimed = True
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            for key in keys:
+                # Keys that expired but were not swept yet are claimed again.
+                cursor = self._db.execute(
+                    "INSERT INTO seen_events VALUES (?, ?) ON CONFLICT (key) "
+                    "DO UPDATE SET expires_at = excluded.expires_at WHERE expires_at <= ?",
+                    (key, expires_at, now),
+                )
+                claimed = claimed and cursor.rowcount == 1
+            if now >= self._next_sweep_at:
+                self._db.execute("DELETE FROM seen_events WHERE expires_at <= ?", (now,))
+                self._next_sweep_at = now + SWEEP_INTERVAL_SECONDS
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return claimed
@@ -0,0 +1,43 @@
+import typing as t
+
+from pydantic import BaseModel
+
+
+class MessageFilter(BaseModel):
+    """
+    MessageFilter describes the message events a handler can handle. The
+    MessageRouter indexes handlers by the channels, or else the channel types,
+    of their filter, and drops the events that don't match before the handler
+    sees them. Fields that are not set match every event.
+    """
+
+    # Ids of the channels the messages are in.
+    channels: t.Optional[t.Set[str]] = None
+
+    # Types of the channels the messages are in, e.g. "channel", "group" or "im".
+    channel_types: t.Optional[t.Set[str]] = None
+
+    # Message subtypes, e.g. "file_share". None stands for plain messages,
+    # which have no subtype.
+    subtypes: t.Optional[t.Set[t.Optional[str]]] = None
+
+    # Whether to drop messages posted by bots, including this one.
+    exclude_bot_messages: bool = False
+
+    # Whether to drop replies in threads, except the ones also sent to the channel.
+    exclude_thread_replies: bool = False
+
+    def matches(self, event: t.Dict[str, t.Any]) -> bool:
+        if self.channels is not None and event.get("channel") not in self.channels:
+            return False
+        if self.channel_types is not None and event.get("channel_type") not in self.channel_types:
+            return False
+
+        subtype = event.get("subtype")
+        if self.subtypes is not None and subtype not in self.subtypes:
+            return False
+        if self.exclude_bot_messages and (event.get("bot_id") or subtype == "bot_message"):
+            return False
+        if self.exclude_thread_replies and event.get("thread_ts") and subtype != "thread_broadcast":
+            return False
+        return True
@@ -0,0 +1,51 @@
+import json
+import sqlite3
+import time
+import typing as t
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+JournalEntry = t.Tuple[str, t.Dict[str, t.Any]]
+
+
+class EventJournal:
+    """
+    EventJournal keeps the request bodies of Slack events, with the name of the
+    handler they are for, in a sqlite database so that they can be handled
+    after a restart.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS journaled_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                handler TEXT NOT NULL,
+                body TEXT NOT NULL,
+                journaled_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def append(self, entries: t.Sequence[JournalEntry]) -> None:
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO journaled_events (handler, body, journaled_at) VALUES (?, ?, ?)",
+                [(handler_name, json.dumps(body), now) for handler_name, body in entries],
+            )
+
+    def pop_all(self) -> t.List[JournalEntry]:
+        """Removes and returns all journaled events, in the order they were appended."""
+        with self._db:
+            rows = self._db.execute(
+                "SELECT handler, body FROM journaled_events ORDER BY id"
+            ).fetchall()
+            self._db.execute("DELETE FROM journaled_events")
+        return [(handler_name, json.loads(body)) for handler_name, body in rows]
+
+    def close(self) -> None:
+        self._db.close()
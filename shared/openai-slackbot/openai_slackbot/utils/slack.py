@@ -1,3 +1,4 @@
+import re
 import typing as t
 
 RenderedSlackBlock = t.NewType("RenderedSlackBlock", t.Dict[str, t.Any])
@@ -18,30 +19,208 @@ def get_block_by_id(blocks: t.Dict, block_id: str) -> t.Dict:
     return {}
 
 
-def extract_text_from_event(event) -> str:
-    """Extracts text from either plaintext and block message."""
-
-    # Extract text from plaintext message.
-    text = event.get("text")
-    if text:
-        return text
-
-    # Extract text from message blocks.
-    texts = []
-    attachments = event.get("attachments", [])
-    for attachment in attachments:
-        attachment_message_blocks = attachment.get("message_blocks", [])
-        for amb in attachment_message_blocks:
-            message_blocks = amb.get("message", {}).get("blocks", [])
-            for mb in message_blocks:
-                mb_elements = mb.get("elements", [])
-                for mbe in mb_elements:
-                    mbe_elements = mbe.get("elements", [])
-                    for mbee in mbe_elements:
-                        if mbee.get("type") == "text":
-                            texts.append(mbee["text"])
-
-    return " ".join(texts).strip()
+# Rough number of characters per token, the same estimate the LLM gateway uses.
+CHARS_PER_TOKEN = 4
+
+# Matches Slack's control sequences in mrkdwn text, e.g. <@U123>, <#C123|general>
+# and <https://example.com|example>.
+_CONTROL_SEQUENCE = re.compile(r"<([^<>]*)>")
+
+_URL_SCHEME = re.compile(r"^(https?://|mailto:)")
+
+# A text segment to yield, or a node of the message to expand into segments.
+_Node = t.Union[str, t.Tuple[str, t.Dict[str, t.Any]]]
+
+
+def iter_event_text(event: t.Dict[str, t.Any]) -> t.Iterator[str]:
+    """
+    Yields the text of a message event in reading order: its blocks, or its
+    text if it has none, then its attachments, including shared messages, and
+    its files. Mentions, channels and links are normalized to readable text,
+    and blocks end with a newline.
+    """
+    # Nodes are expanded from a stack rather than recursively, so deeply nested
+    # messages can't exhaust the recursion limit, and a caller that stops
+    # early doesn't walk the rest of the message.
+    stack: t.List[_Node] = [("message", event)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            if node:
+                yield node
+            continue
+        kind, value = node
+        stack.extend(reversed(_EXPANDERS[kind](value)))
+
+
+def extract_text_from_event(
+    event: t.Dict[str, t.Any],
+    max_chars: t.Optional[int] = None,
+    max_tokens: t.Optional[int] = None,
+) -> str:
+    """
+    Extracts the text of a message event, see iter_event_text, cut off at
+    `max_chars` characters or about `max_tokens` tokens, whichever is lower.
+    """
+    limit = max_chars
+    if max_tokens is not None:
+        token_chars = max_tokens * CHARS_PER_TOKEN
+        limit = token_chars if limit is None else min(limit, token_chars)
+
+    segments = []
+    length = 0
+    for segment in iter_event_text(event):
+        if limit is not None and length + len(segment) >= limit:
+            segments.append(segment[: limit - length])
+            break
+        segments.append(segment)
+        length += len(segment)
+    return "".join(segments).strip()
+
+
+def _expand_message(message: t.Dict[str, t.Any]) -> t.List[_Node]:
+    nodes: t.List[_Node] = []
+    if message.get("blocks"):
+        # The text of a message with blocks is a fallback rendering of them.
+        nodes.extend(("block", block) for block in message["blocks"])
+    elif message.get("text"):
+        nodes.extend([_normalize_mrkdwn(message["text"]), "\n"])
+    nodes.extend(("attachment", attachment) for attachment in message.get("attachments") or [])
+    nodes.extend(("file", file) for file in message.get("files") or [])
+    return nodes
+
+
+def _expand_attachment(attachment: t.Dict[str, t.Any]) -> t.List[_Node]:
+    nodes: t.List[_Node] = []
+    for field in ("pretext", "author_name", "title"):
+        if attachment.get(field):
+            nodes.extend([_normalize_mrkdwn(attachment[field]), "\n"])
+    if attachment.get("blocks"):
+        nodes.extend(("block", block) for block in attachment["blocks"])
+    elif not attachment.get("message_blocks"):
+        # The text and fallback of a shared message repeat it, and it's expanded below.
+        text = attachment.get("text") or attachment.get("fallback")
+        if text:
+            nodes.extend([_normalize_mrkdwn(text), "\n"])
+    for field in attachment.get("fields") or []:
+        title, value = field.get("title"), field.get("value")
+        nodes.append(f"{title}: " if title and value else title or "")
+        nodes.extend([_normalize_mrkdwn(value or ""), "\n"])
+    for message_block in attachment.get("message_blocks") or []:
+        nodes.append(("message", message_block.get("message") or {}))
+    return nodes
+
+
+def _expand_file(file: t.Dict[str, t.Any]) -> t.List[_Node]:
+    nodes: t.List[_Node] = []
+    title = file.get("title") or file.get("name")
+    if title:
+        nodes.extend([title, "\n"])
+    # Snippets and posts come with a preview of their content.
+    if file.get("preview"):
+        nodes.extend([file["preview"], "\n"])
+    return nodes
+
+
+def _expand_block(block: t.Dict[str, t.Any]) -> t.List[_Node]:
+    block_type = block.get("type")
+    nodes: t.List[_Node] = []
+    if block_type == "rich_text":
+        nodes.extend(("element", element) for element in block.get("elements") or [])
+    elif block_type in ("section", "header"):
+        texts = [block.get("text")] + (block.get("fields") or [])
+        nodes.extend(_text_object(text) + "\n" for text in texts if text)
+    elif block_type == "context":
+        texts = [_text_object(element) for element in block.get("elements") or []]
+        nodes.extend([" ".join(text for text in texts if text), "\n"])
+    elif block_type == "markdown":
+        nodes.extend([block.get("text") or "", "\n"])
+    elif block_type == "video":
+        nodes.extend([_text_object(block.get("title")), "\n"])
+    return nodes
+
+
+def _expand_element(element: t.Dict[str, t.Any]) -> t.List[_Node]:
+    """Expands the elements of rich_text blocks."""
+    element_type = element.get("type")
+    if element_type in ("rich_text_section", "rich_text_preformatted", "rich_text_quote"):
+        nodes: t.List[_Node] = ["> "] if element_type == "rich_text_quote" else []
+        nodes.extend(("element", child) for child in element.get("elements") or [])
+        nodes.append("\n")
+        return nodes
+    if element_type == "rich_text_list":
+        nodes = []
+        indent = "  " * (element.get("indent") or 0)
+        for i, item in enumerate(element.get("elements") or [], start=element.get("offset") or 0):
+            bullet = f"{i + 1}. " if element.get("style") == "ordered" else "- "
+            nodes.extend([indent + bullet, ("element", item)])
+        return nodes
+
+    if element_type == "text":
+        return [element.get("text") or ""]
+    if element_type == "link":
+        return [_format_link(element.get("url") or "", element.get("text"))]
+    if element_type == "user":
+        return [f"@{element.get('user_id')}"]
+    if element_type == "usergroup":
+        return [f"@{element.get('usergroup_id')}"]
+    if element_type == "channel":
+        return [f"#{element.get('channel_id')}"]
+    if element_type == "broadcast":
+        return [f"@{element.get('range')}"]
+    if element_type == "emoji":
+        return [f":{element.get('name')}:"]
+    if element_type == "date":
+        return [element.get("fallback") or str(element.get("timestamp") or "")]
+    if element_type == "color":
+        return [element.get("value") or ""]
+    return []
+
+
+_EXPANDERS: t.Dict[str, t.Callable[[t.Dict[str, t.Any]], t.List[_Node]]] = {
+    "message": _expand_message,
+    "attachment": _expand_attachment,
+    "file": _expand_file,
+    "block": _expand_block,
+    "element": _expand_element,
+}
+
+
+def _text_object(text: t.Optional[t.Dict[str, t.Any]]) -> str:
+    if not text or not isinstance(text.get("text"), str):
+        return ""
+    if text.get("type") == "mrkdwn":
+        return _normalize_mrkdwn(text["text"])
+    return text["text"]
+
+
+def _normalize_mrkdwn(text: str) -> str:
+    """Replaces Slack's control sequences with readable text, and unescapes the rest."""
+    text = _CONTROL_SEQUENCE.sub(_normalize_control_sequence, text)
+    return text.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
+
+
+def _normalize_control_sequence(match: t.Match[str]) -> str:
+    target, _, label = match.group(1).partition("|")
+    if target.startswith("@"):
+        return f"@{label}" if label else target
+    if target.startswith("#"):
+        return f"#{label}" if label else target
+    if target.startswith("!subteam^"):
+        return label or f"@{target[len('!subteam^'):]}"
+    if target.startswith("!date^"):
+        return label
+    if target.startswith("!"):
+        return f"@{target[1:]}"
+    return _format_link(target, label)
+
+
+def _format_link(url: str, label: t.Optional[str]) -> str:
+    # Links that Slack detects in text are labelled with the URL without its scheme.
+    bare_url = _URL_SCHEME.sub("", url)
+    if label and label not in (url, bare_url):
+        return f"{label} ({url})"
+    return bare_url if url.startswith("mailto:") else url
 
 
 def render_slack_id_to_mention(id: str):
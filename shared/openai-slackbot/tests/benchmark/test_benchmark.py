@@ -0,0 +1,96 @@
+import random
+from types import SimpleNamespace
+
+from openai_slackbot.benchmark.fakes import FaultProfile
+from openai_slackbot.benchmark.runner import BenchmarkConfig, run_benchmark
+from openai_slackbot.benchmark.scenarios import BotSetup, Scenario
+from openai_slackbot.benchmark.startup import StartupResult
+from openai_slackbot.clients.llm import get_llm_client
+from openai_slackbot.handlers import BaseMessageHandler, ExecutorConfig
+
+
+class EchoHandler(BaseMessageHandler):
+    async def should_handle(self, args):
+        return True
+
+    async def handle(self, args):
+        completion = await get_llm_client().create_chat_completion(
+            call_site="echo", model="gpt-4o-mini", messages=[]
+        )
+        await self._slack_client.post_message(
+            channel=args.event["channel"],
+            thread_ts=args.event["ts"],
+            text=completion.choices[0].message.content,
+        )
+
+
+class EchoScenario(Scenario):
+    name = "echo"
+
+    def setup(self, work_dir, slack):
+        config = SimpleNamespace(openai_organization_id="org", executor=ExecutorConfig())
+        return BotSetup(
+            message_handlers=[EchoHandler],
+            action_handlers=[],
+            template_path=work_dir,
+            config=config,
+        )
+
+    def make_event(self, i, slack):
+        # One channel per event, so that per-channel rate limits don't apply.
+        return {"type": "message", "channel": f"C{i:08d}", "user": "U1", "ts": slack.next_ts()}
+
+
+async def test_run_benchmark():
+    result = await run_benchmark(
+        EchoScenario(),
+        BenchmarkConfig(
+            events=10,
+            rate_per_second=None,
+            slack=FaultProfile(latency_ms=1),
+            openai=FaultProfile(latency_ms=1),
+        ),
+    )
+
+    assert result.completed == 10
+    assert result.slack_calls == {"chat.postMessage": 10}
+    summary = result.to_dict()
+    assert summary["openai_calls_per_event"] == 1
+    assert list(summary["latency_seconds"]) == ["p50", "p95", "p99"]
+    assert len(result.ack_latencies) == 10
+    assert "echo" in result.format()
+
+
+def test_fault_profile():
+    profile = FaultProfile(latency_ms=100, error_rate=0.1, rate_limit_rate=0.2)
+    rng = random.Random(0)
+
+    faults = [profile.sample_fault(rng) for _ in range(10_000)]
+    assert 0.08 < faults.count("error") / len(faults) < 0.12
+    assert 0.18 < faults.count("ratelimited") / len(faults) < 0.22
+
+    latencies = sorted(profile.sample_latency(rng) for _ in range(10_000))
+    assert 0.09 < latencies[len(latencies) // 2] < 0.11
+
+
+def test_startup_result():
+    samples = [
+        {"interpreter": 0.05, "import": 0.5, "init": 0.1, "connect": 0.01},
+        {"interpreter": 0.05, "import": 0.7, "init": 0.1, "connect": 0.01},
+        {"interpreter": 0.05, "import": 0.6, "init": 0.2, "connect": 0.01},
+    ]
+
+    result = StartupResult(scenario="echo", samples=samples, budget_seconds=1)
+    assert abs(result.time_to_ready - 0.86) < 1e-9
+    assert result.within_budget
+    assert result.to_dict()["phase_seconds"] == {
+        "interpreter": 0.05,
+        "import": 0.6,
+        "init": 0.1,
+        "connect": 0.01,
+    }
+    assert "budget:                 1000ms" in result.format()
+
+    result = StartupResult(scenario="echo", samples=samples, budget_seconds=0.5)
+    assert not result.within_budget
+    assert "EXCEEDED" in result.format()
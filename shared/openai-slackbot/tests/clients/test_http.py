@@ -0,0 +1,34 @@
+import pytest
+from openai_slackbot.clients.http import (
+    HTTPConfig,
+    close_http_session,
+    create_slack_web_client,
+    get_http_session,
+    init_http_session,
+)
+
+
+async def test_http_session_lifecycle():
+    session = await init_http_session(HTTPConfig(limit_per_host=5, timeout_seconds=10))
+    assert get_http_session() is session
+    assert session.connector.limit_per_host == 5
+
+    client = create_slack_web_client("xoxb-token")
+    assert client.session is session
+    assert client.timeout == 10
+
+    # Replacing the session closes the old one.
+    replaced = session
+    session = await init_http_session()
+    assert replaced.closed
+    assert get_http_session() is session
+
+    await close_http_session()
+    assert session.closed
+    with pytest.raises(Exception):
+        get_http_session()
+
+
+def test_get_http_session_not_initialized():
+    with pytest.raises(Exception):
+        get_http_session()
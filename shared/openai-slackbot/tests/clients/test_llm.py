@@ -0,0 +1,40 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from openai_slackbot.clients.llm import (
+    LazyAsyncOpenAI,
+    LLMClient,
+    get_llm_client,
+    init_llm_client,
+)
+
+
+async def test_create_chat_completion():
+    mock_openai_client = MagicMock()
+    mock_openai_client.chat.completions.create = AsyncMock(return_value="completion")
+    llm_client = LLMClient(mock_openai_client)
+
+    completion = await llm_client.create_chat_completion(
+        call_site="classify",
+        model="gpt-4-32k",
+        messages=[{"role": "user", "content": "hi"}],
+    )
+
+    assert completion == "completion"
+    mock_openai_client.chat.completions.create.assert_awaited_once_with(
+        model="gpt-4-32k", messages=[{"role": "user", "content": "hi"}]
+    )
+
+
+def test_init_llm_client():
+    llm_client = init_llm_client(api_key="mock-key", organization="org-id")
+    assert get_llm_client() is llm_client
+
+
+def test_lazy_openai_client():
+    client = LazyAsyncOpenAI(api_key="mock-key", organization="org-id")
+
+    openai_client = client.load()
+    assert client.load() is openai_client
+    assert client.chat is openai_client.chat
+    assert openai_client.organization == "org-id"
@@ -0,0 +1,124 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from openai_slackbot.clients.outbox import OutboxConfig, SlackOutbox
+
+
+class FakeSlack:
+    def __init__(self, failures=0, posted=False):
+        self.sent = []
+        self.failures = failures
+        self.posted = posted
+
+    async def send(self, method, kwargs):
+        await asyncio.sleep(0)
+        if self.failures:
+            self.failures -= 1
+            raise Exception("timed out")
+        self.sent.append((method, kwargs["channel"], kwargs.get("text")))
+
+    async def find_posted(self, kwargs, since):
+        return self.posted
+
+
+def make_outbox(slack, **kwargs):
+    config = OutboxConfig(**{"backoff_base_seconds": 0.001, **kwargs})
+    return SlackOutbox(slack.send, slack.find_posted, config)
+
+
+async def test_writes_are_delivered_in_order_per_channel():
+    slack = FakeSlack()
+    outbox = make_outbox(slack)
+
+    outbox.post_message(channel="C1", text="1")
+    outbox.post_message(channel="C2", text="2")
+    outbox.update_message(channel="C1", ts="1.0", text="3")
+    outbox.add_reaction(channel="C1", name="eyes", timestamp="1.0")
+    assert outbox.pending() == 4
+
+    assert await outbox.flush(timeout=1)
+    assert [write for write in slack.sent if write[1] == "C1"] == [
+        ("post_message", "C1", "1"),
+        ("update_message", "C1", "3"),
+        ("add_reaction", "C1", None),
+    ]
+    assert ("post_message", "C2", "2") in slack.sent
+    assert outbox.pending() == 0
+
+
+async def test_failed_writes_are_retried_then_dropped():
+    slack = FakeSlack(failures=1)
+    outbox = make_outbox(slack, max_attempts=2)
+    outbox.update_message(channel="C1", ts="1.0", text="1")
+    assert await outbox.flush(timeout=1)
+    assert slack.sent == [("update_message", "C1", "1")]
+
+    slack.failures = 2
+    outbox.update_message(channel="C1", ts="1.0", text="2")
+    outbox.update_message(channel="C1", ts="1.0", text="3")
+    assert await outbox.flush(timeout=1)
+    # The second write was dropped after two attempts, and didn't block the third.
+    assert slack.sent[1:] == [("update_message", "C1", "3")]
+
+
+async def test_posts_are_not_repeated_after_an_ambiguous_failure():
+    slack = FakeSlack(failures=1, posted=True)
+    outbox = make_outbox(slack)
+    outbox.post_message(channel="C1", text="1")
+    assert await outbox.flush(timeout=1)
+    assert slack.sent == []
+
+    slack.failures, slack.posted = 1, False
+    outbox.post_message(channel="C1", text="2")
+    assert await outbox.flush(timeout=1)
+    assert slack.sent == [("post_message", "C1", "2")]
+
+
+async def test_writes_recorded_again_in_the_same_scope_are_skipped():
+    slack = FakeSlack()
+    outbox = make_outbox(slack)
+
+    for _ in range(2):
+        with outbox.scope("Handler:event:Ev1"):
+            outbox.post_message(channel="C1", text="1")
+            outbox.post_message(channel="C1", text="2")
+    with outbox.scope(None):
+        outbox.post_message(channel="C1", text="3")
+        outbox.post_message(channel="C1", text="3")
+
+    assert await outbox.flush(timeout=1)
+    assert [text for _, _, text in slack.sent] == ["1", "2", "3", "3"]
+
+
+async def test_undelivered_writes_are_kept_across_restarts(tmp_path):
+    slack = FakeSlack(failures=1)
+    config = {"path": str(tmp_path / "outbox.sqlite3"), "backoff_max_seconds": 60}
+    outbox = make_outbox(slack, backoff_base_seconds=60, **config)
+    outbox.post_message(channel="C1", text="1")
+    assert not await outbox.flush(timeout=0.01)
+    outbox.close()
+
+    outbox = make_outbox(slack, **config)
+    assert outbox.pending() == 1
+    outbox.start()
+    assert await outbox.flush(timeout=1)
+    assert slack.sent == [("post_message", "C1", "1")]
+
+
+async def test_direct_writes_wait_for_recorded_writes(mock_slack_client):
+    texts = []
+
+    async def post_message(**kwargs):
+        await asyncio.sleep(0.01)
+        texts.append(kwargs["text"])
+        message = {"team": "T1", "text": kwargs["text"], "ts": "1.0", "type": "message"}
+        data = {"ok": True, "channel": kwargs["channel"], "ts": "1.0", "message": message}
+        response = MagicMock(data=data)
+        response.__getitem__.side_effect = data.__getitem__
+        return response
+
+    mock_slack_client._client.chat_postMessage = AsyncMock(side_effect=post_message)
+    mock_slack_client.outbox.post_message(channel="C1", text="recorded")
+    await mock_slack_client.post_message(channel="C1", text="direct")
+
+    assert texts == ["recorded", "direct"]
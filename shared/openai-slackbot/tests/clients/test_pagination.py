@@ -0,0 +1,81 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+
+def make_page(messages: list, next_cursor: str = "") -> MagicMock:
+    data = {
+        "ok": True,
+        "messages": messages,
+        "response_metadata": {"next_cursor": next_cursor},
+    }
+    response = MagicMock(data=data)
+    response.__getitem__.side_effect = data.__getitem__
+    return response
+
+
+def make_message(ts: str) -> dict:
+    return {"type": "message", "text": f"message {ts}", "ts": ts}
+
+
+@pytest.fixture
+def mock_replies(mock_slack_client):
+    mock_slack_client._client.conversations_replies = AsyncMock(
+        side_effect=[
+            make_page([make_message("1.0"), make_message("2.0")], next_cursor="page2"),
+            make_page([make_message("3.0")]),
+        ]
+    )
+    return mock_slack_client._client.conversations_replies
+
+
+async def test_iter_thread_messages_follows_cursors(mock_slack_client, mock_replies):
+    messages = [
+        message
+        async for message in mock_slack_client.iter_thread_messages("C1", "1.0", page_size=2)
+    ]
+    assert [message["ts"] for message in messages] == ["1.0", "2.0", "3.0"]
+    mock_replies.assert_any_await(channel="C1", ts="1.0", limit=2)
+    mock_replies.assert_any_await(channel="C1", ts="1.0", limit=2, cursor="page2")
+
+
+async def test_iter_thread_messages_stops_early(mock_slack_client, mock_replies):
+    async for message in mock_slack_client.iter_thread_messages("C1", "1.0"):
+        break
+    mock_replies.assert_awaited_once()
+
+
+async def test_iter_thread_messages_caps_bytes(mock_slack_client, mock_replies):
+    messages = [
+        message
+        async for message in mock_slack_client.iter_thread_messages("C1", "1.0", max_bytes=120)
+    ]
+    assert [message["ts"] for message in messages] == ["1.0", "2.0"]
+
+
+async def test_get_thread_messages_reads_all_pages(mock_slack_client, mock_replies):
+    messages = await mock_slack_client.get_thread_messages("C1", "1.0")
+    assert len(messages) == 3
+
+
+async def test_get_original_blocks_reads_first_page_only(mock_slack_client):
+    mock_slack_client._client.conversations_replies = AsyncMock(
+        return_value=make_page([{**make_message("1.0"), "blocks": [{"type": "divider"}]}], "next")
+    )
+    assert await mock_slack_client.get_original_blocks("1.0", "C1") == [{"type": "divider"}]
+    mock_slack_client._client.conversations_replies.assert_awaited_once_with(
+        channel="C1", ts="1.0", limit=1
+    )
+
+
+async def test_iter_channel_history(mock_slack_client):
+    mock_slack_client._client.conversations_history = AsyncMock(
+        return_value=make_page([make_message("2.0"), make_message("1.0")])
+    )
+    messages = [
+        message async for message in mock_slack_client.iter_channel_history("C1", oldest="1.0")
+    ]
+    assert [message["ts"] for message in messages] == ["2.0", "1.0"]
+    mock_slack_client._client.conversations_history.assert_awaited_once_with(
+        channel="C1", oldest="1.0", limit=200
+    )
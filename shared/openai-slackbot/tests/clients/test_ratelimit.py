@@ -0,0 +1,117 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from openai_slackbot.clients.ratelimit import SlackRateLimiter, TokenBucket
+from slack_sdk.errors import SlackApiError
+
+
+def make_rate_limited_error(retry_after: str) -> SlackApiError:
+    response = MagicMock(status_code=429, headers={"Retry-After": retry_after})
+    return SlackApiError("ratelimited", response)
+
+
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)
+    start = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    # The first token is available immediately, then one every 0.1s.
+    assert 0.18 <= time.monotonic() - start < 0.5
+
+
+async def test_post_message_is_limited_per_channel():
+    rate_limiter = SlackRateLimiter(channel_limits={"chat.postMessage": 600})
+    fn = AsyncMock(return_value={"ok": True})
+
+    start = time.monotonic()
+    for channel in ("C1", "C2", "C3"):
+        await rate_limiter.call("chat.postMessage", channel, fn)
+    assert time.monotonic() - start < 0.05
+
+    for _ in range(3):
+        await rate_limiter.call("chat.postMessage", "C1", fn)
+    assert time.monotonic() - start >= 0.25
+
+
+async def test_idle_channel_buckets_are_evicted():
+    rate_limiter = SlackRateLimiter(channel_limits={"chat.postMessage": 600}, max_channel_buckets=2)
+    fn = AsyncMock(return_value={"ok": True})
+
+    for channel in ("C1", "C2"):
+        await rate_limiter.call("chat.postMessage", channel, fn)
+    # Wait for the buckets to refill, then use C2 again so it is not idle.
+    await asyncio.sleep(0.15)
+    await rate_limiter.call("chat.postMessage", "C2", fn)
+    await rate_limiter.call("chat.postMessage", "C3", fn)
+
+    assert set(rate_limiter._buckets) == {
+        ("chat.postMessage", "C2"),
+        ("chat.postMessage", "C3"),
+        ("chat.postMessage", None),
+    }
+
+    # C2 is still limited.
+    start = time.monotonic()
+    await rate_limiter.call("chat.postMessage", "C2", fn)
+    assert time.monotonic() - start >= 0.05
+
+
+async def test_share_of_limits():
+    rate_limiter = SlackRateLimiter(channel_limits={"chat.postMessage": 1200}, share=0.5)
+    fn = AsyncMock(return_value={"ok": True})
+
+    start = time.monotonic()
+    for _ in range(3):
+        await rate_limiter.call("chat.postMessage", "C1", fn)
+    # Half of 1200 per minute is one call every 0.1s.
+    assert time.monotonic() - start >= 0.18
+
+
+async def test_retries_after_rate_limit():
+    rate_limiter = SlackRateLimiter()
+    fn = AsyncMock(side_effect=[make_rate_limited_error("0.1"), {"ok": True}])
+
+    start = time.monotonic()
+    response = await rate_limiter.call("chat.update", "C1", fn)
+    assert response == {"ok": True}
+    assert fn.await_count == 2
+    assert time.monotonic() - start >= 0.1
+
+
+async def test_gives_up_after_max_retries():
+    rate_limiter = SlackRateLimiter(max_retries=1)
+    fn = AsyncMock(side_effect=make_rate_limited_error("0"))
+
+    with pytest.raises(SlackApiError):
+        await rate_limiter.call("chat.update", "C1", fn)
+    assert fn.await_count == 2
+
+
+async def test_other_errors_are_not_retried():
+    rate_limiter = SlackRateLimiter()
+    fn = AsyncMock(side_effect=SlackApiError("failed", {"error": "channel_not_found"}))
+
+    with pytest.raises(SlackApiError):
+        await rate_limiter.call("chat.postMessage", "C1", fn)
+    fn.assert_awaited_once()
+
+
+async def test_slack_client_retries_rate_limited_post(mock_slack_client):
+    mock_response = MagicMock(
+        data={
+            "ok": True,
+            "channel": "C1",
+            "ts": "ts",
+            "message": {"team": "team", "text": "text", "ts": "ts", "type": "message"},
+        }
+    )
+    mock_response.__getitem__.side_effect = mock_response.data.__getitem__
+    mock_slack_client._client.chat_postMessage = AsyncMock(
+        side_effect=[make_rate_limited_error("0"), mock_response]
+    )
+
+    response = await mock_slack_client.post_message(channel="C1", text="text")
+    assert response.ts == "ts"
+    assert mock_slack_client._client.chat_postMessage.await_count == 2
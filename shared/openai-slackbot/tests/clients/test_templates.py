@@ -0,0 +1,67 @@
+import pytest
+from openai_slackbot.clients.templates import TemplateRenderer
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    (tmp_path / "blocks").mkdir()
+    (tmp_path / "blocks" / "warning.j2").write_text('{"type": "section", "text": "warning"}')
+    (tmp_path / "blocks" / "_body.j2").write_text('{"type": "section", "text": "{{ body }}"}')
+    (tmp_path / "blocks" / "message.j2").write_text(
+        '[{"type": "header", "text": "{{ title }}"}, {% include "blocks/_body.j2" %}]'
+    )
+    return str(tmp_path)
+
+
+def test_static_template_is_rendered_once(template_path):
+    renderer = TemplateRenderer(template_path)
+    assert "blocks/warning.j2" in renderer._static_renders
+    assert "blocks/_body.j2" not in renderer._static_renders
+
+    block = renderer.render("blocks/warning.j2", {})
+    block["text"] = "changed"
+    assert renderer.render("blocks/warning.j2", {}) == {"type": "section", "text": "warning"}
+
+
+def test_render_is_memoised_on_used_variables(template_path):
+    renderer = TemplateRenderer(template_path)
+    assert renderer._variables["blocks/message.j2"] == {"title", "body"}
+
+    blocks = renderer.render("blocks/message.j2", {"title": "a", "body": "b", "unused": [1]})
+    assert blocks == [{"type": "header", "text": "a"}, {"type": "section", "text": "b"}]
+    blocks.append({"type": "divider"})
+
+    assert renderer.render("blocks/message.j2", {"title": "a", "body": "b"}) == [
+        {"type": "header", "text": "a"},
+        {"type": "section", "text": "b"},
+    ]
+    assert len(renderer._renders) == 1
+
+    assert renderer.render("blocks/message.j2", {"title": "c", "body": "b"})[0]["text"] == "c"
+    assert renderer.render("blocks/message.j2", {"title": True, "body": "b"})[0]["text"] == "True"
+    assert renderer.render("blocks/message.j2", {"title": 1, "body": "b"})[0]["text"] == "1"
+    assert len(renderer._renders) == 4
+
+
+def test_render_cache_is_bounded(template_path):
+    renderer = TemplateRenderer(template_path, cache_size=2)
+    for title in ("a", "b", "c"):
+        renderer.render("blocks/message.j2", {"title": title, "body": "body"})
+    assert len(renderer._renders) == 2
+
+
+def test_unhashable_context_is_not_cached(template_path):
+    class Title:
+        def __str__(self):
+            return "title"
+
+    renderer = TemplateRenderer(template_path)
+    blocks = renderer.render("blocks/message.j2", {"title": Title(), "body": "b"})
+    assert blocks[0]["text"] == "title"
+    assert len(renderer._renders) == 0
+
+
+def test_invalid_static_template_fails_at_init(tmp_path):
+    (tmp_path / "broken.j2").write_text('{"type": ')
+    with pytest.raises(ValueError):
+        TemplateRenderer(str(tmp_path))
@@ -0,0 +1,108 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from openai_slackbot.clients.slack import SlackClient
+from openai_slackbot.clients.threads import ThreadCache
+
+
+def make_response(data: dict) -> MagicMock:
+    response = MagicMock(data=data)
+    response.__getitem__.side_effect = data.__getitem__
+    return response
+
+
+def make_message(ts: str, thread_ts: str = None, text: str = "text") -> dict:
+    message = {"type": "message", "team": "team", "text": text, "ts": ts}
+    if thread_ts:
+        message["thread_ts"] = thread_ts
+    return message
+
+
+async def test_thread_reads_are_cached(mock_slack_client):
+    messages = [make_message("1.0", "1.0"), make_message("2.0", "1.0")]
+    mock_slack_client._client.conversations_replies = AsyncMock(
+        return_value=make_response({"ok": True, "messages": messages})
+    )
+
+    assert await mock_slack_client.get_thread_messages(channel="C1", thread_ts="1.0") == messages
+    assert await mock_slack_client.get_thread_messages(channel="C1", thread_ts="1.0") == messages
+    mock_slack_client._client.conversations_replies.assert_awaited_once()
+
+    await mock_slack_client.get_thread_messages(channel="C1", thread_ts="1.0", refresh=True)
+    assert mock_slack_client._client.conversations_replies.await_count == 2
+
+
+async def test_posts_and_updates_are_written_through(mock_slack_client):
+    mock_slack_client._client.chat_postMessage = AsyncMock(
+        side_effect=[
+            make_response(
+                {"ok": True, "channel": "C1", "ts": "1.0", "message": make_message("1.0")}
+            ),
+            make_response(
+                {"ok": True, "channel": "C1", "ts": "2.0", "message": make_message("2.0", "1.0")}
+            ),
+        ]
+    )
+    mock_slack_client._client.chat_update = AsyncMock(
+        return_value=make_response(
+            {"ok": True, "channel": "C1", "ts": "1.0", "message": {"text": "updated"}}
+        )
+    )
+    mock_slack_client._client.conversations_replies = AsyncMock()
+
+    await mock_slack_client.post_message(channel="C1", text="text")
+    await mock_slack_client.post_message(channel="C1", text="text", thread_ts="1.0")
+    await mock_slack_client.update_message(channel="C1", ts="1.0", text="updated")
+
+    messages = await mock_slack_client.get_thread_messages(channel="C1", thread_ts="1.0")
+    assert [(m["ts"], m["text"]) for m in messages] == [("1.0", "updated"), ("2.0", "text")]
+    mock_slack_client._client.conversations_replies.assert_not_awaited()
+
+
+def test_message_events_are_written_through():
+    cache = ThreadCache()
+    cache.set("C1", "1.0", [make_message("1.0", "1.0")])
+
+    cache.observe_event({**make_message("2.0", "1.0"), "channel": "C1"})
+    cache.observe_event({**make_message("3.0", "5.0"), "channel": "C1"})
+    cache.observe_event(
+        {
+            "type": "message",
+            "subtype": "message_changed",
+            "channel": "C1",
+            "message": make_message("2.0", "1.0", text="edited"),
+        }
+    )
+    assert [(m["ts"], m["text"]) for m in cache.get("C1", "1.0")] == [
+        ("1.0", "text"),
+        ("2.0", "edited"),
+    ]
+    # Replies to threads that aren't cached are ignored.
+    assert cache.get("C1", "5.0") is None
+
+    cache.observe_event(
+        {"type": "message", "subtype": "message_deleted", "channel": "C1", "deleted_ts": "2.0"}
+    )
+    assert [m["ts"] for m in cache.get("C1", "1.0")] == ["1.0"]
+
+
+def test_thread_cache_is_bounded():
+    cache = ThreadCache(max_threads=2)
+    for ts in ("1.0", "2.0", "3.0"):
+        cache.set("C1", ts, [make_message(ts)])
+    assert cache.get("C1", "1.0") is None
+    assert cache.get("C1", "3.0") is not None
+
+
+async def test_thread_cache_can_be_disabled(mock_slack_asyncwebclient):
+    slack_client = SlackClient(
+        mock_slack_asyncwebclient, "template_path", thread_cache=ThreadCache(max_threads=0)
+    )
+    messages = [make_message("1.0", "1.0")]
+    slack_client._client.conversations_replies = AsyncMock(
+        return_value=make_response({"ok": True, "messages": messages})
+    )
+    slack_client.threads.observe_event({**make_message("2.0", "1.0"), "channel": "C1"})
+
+    assert await slack_client.get_thread_messages(channel="C1", thread_ts="1.0") == messages
+    assert await slack_client.get_thread_messages(channel="C1", thread_ts="1.0") == messages
+    assert slack_client._client.conversations_replies.await_count == 2
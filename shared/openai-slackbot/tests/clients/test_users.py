@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from openai_slackbot.clients.users import UserDirectory, UserDirectoryConfig
+from slack_sdk.errors import SlackApiError
+
+
+def make_user(user_id: str) -> dict:
+    return {"id": user_id, "profile": {"display_name": f"name-{user_id}"}}
+
+
+async def test_get_user_display_name_is_cached(mock_slack_client):
+    mock_slack_client._client.users_info = AsyncMock(
+        return_value={"ok": True, "user": make_user("U1")}
+    )
+
+    assert await mock_slack_client.get_user_display_name("U1") == "name-U1"
+    assert await mock_slack_client.get_user_display_name("U1") == "name-U1"
+    mock_slack_client._client.users_info.assert_awaited_once_with(user="U1")
+
+
+async def test_concurrent_lookups_are_coalesced():
+    async def users_info(method, user):
+        await asyncio.sleep(0.01)
+        return {"ok": True, "user": make_user(user)}
+
+    call = AsyncMock(side_effect=users_info)
+    directory = UserDirectory(call)
+
+    users = await asyncio.gather(*(directory.get_user("U1") for _ in range(5)))
+    assert all(user["id"] == "U1" for user in users)
+    call.assert_awaited_once()
+
+
+async def test_failed_lookups_are_cached():
+    call = AsyncMock(side_effect=SlackApiError("failed", {"error": "user_not_found"}))
+    directory = UserDirectory(call)
+
+    for _ in range(2):
+        with pytest.raises(Exception, match="user_not_found"):
+            await directory.get_user("U404")
+    call.assert_awaited_once()
+
+
+async def test_entries_expire():
+    call = AsyncMock(return_value={"ok": True, "user": make_user("U1")})
+    directory = UserDirectory(call, UserDirectoryConfig(ttl_seconds=10))
+
+    with patch("openai_slackbot.clients.users.time.monotonic", return_value=1000):
+        await directory.get_user("U1")
+    with patch("openai_slackbot.clients.users.time.monotonic", return_value=1005):
+        await directory.get_user("U1")
+    assert call.await_count == 1
+    with patch("openai_slackbot.clients.users.time.monotonic", return_value=1011):
+        await directory.get_user("U1")
+    assert call.await_count == 2
+
+
+async def test_prefetch_loads_all_pages():
+    call = AsyncMock(
+        side_effect=[
+            {
+                "ok": True,
+                "members": [make_user("U1"), make_user("U2")],
+                "response_metadata": {"next_cursor": "next"},
+            },
+            {"ok": True, "members": [make_user("U3")], "response_metadata": {"next_cursor": ""}},
+        ]
+    )
+    directory = UserDirectory(call, UserDirectoryConfig(page_size=2))
+
+    assert await directory.prefetch() == 3
+    call.assert_any_await("users.list", limit=2, cursor="next")
+    assert (await directory.get_user("U3"))["profile"]["display_name"] == "name-U3"
+    assert call.await_count == 2
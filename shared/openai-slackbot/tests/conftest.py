@@ -7,17 +7,19 @@ from openai_slackbot.handlers import BaseActionHandler, BaseMessageHandler
 
 @pytest.fixture
 def mock_slack_app():
-    with patch("slack_bolt.app.async_app.AsyncApp") as mock_app:
+    with patch("openai_slackbot.bot.AsyncApp") as mock_app:
+        mock_app.return_value.client.auth_test = AsyncMock(
+            return_value={"ok": True, "team": "team", "user": "bot"}
+        )
         yield mock_app.return_value
 
 
 @pytest.fixture
 def mock_socket_mode_handler():
-    with patch(
-        "slack_bolt.adapter.socket_mode.async_handler.AsyncSocketModeHandler"
-    ) as mock_handler:
+    with patch("openai_slackbot.bot.AsyncSocketModeHandler") as mock_handler:
         mock_handler_object = mock_handler.return_value
         mock_handler_object.start_async = AsyncMock()
+        mock_handler_object.close_async = AsyncMock()
         yield mock_handler_object
 
 
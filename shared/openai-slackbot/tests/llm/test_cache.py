@@ -0,0 +1,171 @@
+import asyncio
+import sqlite3
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from openai.types.chat import ChatCompletion
+from openai_slackbot.clients.llm import LLMClient
+from openai_slackbot.llm.cache import CacheConfig, CompletionCache
+from openai_slackbot.llm.hedging import Hedger, HedgePolicy, HedgingConfig
+
+
+def make_completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-123",
+            "object": "chat.completion",
+            "created": 1700000000,
+            "model": "gpt-4-32k",
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+        }
+    )
+
+
+def make_request(content: str = "hello", temperature: float = 0) -> dict:
+    return {
+        "model": "gpt-4-32k",
+        "messages": [{"role": "user", "content": content}],
+        "temperature": temperature,
+    }
+
+
+@pytest.fixture
+def cache_config():
+    return CacheConfig(path=":memory:", max_entries=2, cache_nonzero_temperature=["nudge"])
+
+
+@pytest.fixture
+def cache(cache_config):
+    cache = CompletionCache(cache_config)
+    yield cache
+    cache.close()
+
+
+def test_cache_hit_and_miss(cache):
+    assert cache.get("classify", make_request()) is None
+
+    cache.set("classify", make_request(), make_completion("appsec"), latency=2.0)
+    cached = cache.get("classify", make_request())
+    assert cached.choices[0].message.content == "appsec"
+    assert cache.get("classify", make_request("other")) is None
+
+    assert cache.stats()["classify"] == {
+        "hits": 1,
+        "misses": 2,
+        "bypassed": 0,
+        "saved_seconds": 2.0,
+        "saved_tokens": 15,
+    }
+
+
+def test_cache_bypasses_nonzero_temperature(cache):
+    request = make_request(temperature=0.5)
+    cache.set("greeting", request, make_completion("hi"), latency=1.0)
+    assert cache.get("greeting", request) is None
+    assert cache.stats()["greeting"]["bypassed"] == 1
+
+    # Call sites can opt in to caching non-zero temperature completions.
+    cache.set("nudge", request, make_completion("hi"), latency=1.0)
+    assert cache.get("nudge", request) is not None
+
+
+def test_cache_ttl():
+    cache = CompletionCache(CacheConfig(path=":memory:", ttl_seconds={"summary": 10}))
+    with patch("openai_slackbot.llm.cache.time.time", return_value=1000):
+        cache.set("summary", make_request(), make_completion("summary"), latency=1.0)
+    with patch("openai_slackbot.llm.cache.time.time", return_value=1005):
+        assert cache.get("summary", make_request()) is not None
+    with patch("openai_slackbot.llm.cache.time.time", return_value=1011):
+        assert cache.get("summary", make_request()) is None
+
+
+def test_cache_lru_eviction(cache):
+    cache.set("classify", make_request("a"), make_completion("a"), latency=1.0)
+    cache.set("classify", make_request("b"), make_completion("b"), latency=1.0)
+    # Touch "a" so that "b" is the least recently used.
+    assert cache.get("classify", make_request("a")) is not None
+    cache.set("classify", make_request("c"), make_completion("c"), latency=1.0)
+
+    assert cache.get("classify", make_request("a")) is not None
+    assert cache.get("classify", make_request("b")) is None
+    assert cache.get("classify", make_request("c")) is not None
+
+
+def test_cache_evicts_in_batches():
+    cache = CompletionCache(CacheConfig(path=":memory:", max_entries=10))
+    for i in range(11):
+        cache.set("classify", make_request(str(i)), make_completion(str(i)), latency=1.0)
+
+    # Eviction makes room for 10% of the entries, so it doesn't run on every insert.
+    cached = [cache.get("classify", make_request(str(i))) is not None for i in range(11)]
+    assert cached == [False] * 2 + [True] * 9
+
+
+def test_cache_writes_recency_in_batches(tmp_path):
+    config = CacheConfig(path=str(tmp_path / "cache.sqlite3"))
+    cache = CompletionCache(config)
+    with patch("openai_slackbot.llm.cache.time.time", return_value=1000):
+        cache.set("classify", make_request(), make_completion("appsec"), latency=1.0)
+    with patch("openai_slackbot.llm.cache.time.time", return_value=1005):
+        assert cache.get("classify", make_request()) is not None
+
+    def last_used_at():
+        db = sqlite3.connect(config.path)
+        try:
+            return db.execute("SELECT last_used_at FROM completions").fetchone()[0]
+        finally:
+            db.close()
+
+    # Hits don't write to the database until recency is flushed, at the latest on close.
+    assert last_used_at() == 1000
+    cache.close()
+    assert last_used_at() == 1005
+
+
+def test_cache_persists(tmp_path):
+    config = CacheConfig(path=str(tmp_path / "cache.sqlite3"))
+    cache = CompletionCache(config)
+    cache.set("classify", make_request(), make_completion("appsec"), latency=1.0)
+    cache.close()
+
+    assert CompletionCache(config).get("classify", make_request()) is not None
+
+
+async def test_llm_client_uses_cache(cache):
+    mock_openai_client = MagicMock()
+    mock_openai_client.chat.completions.create = AsyncMock(return_value=make_completion("appsec"))
+    llm_client = LLMClient(mock_openai_client, cache=cache)
+
+    for _ in range(2):
+        completion = await llm_client.create_chat_completion(call_site="classify", **make_request())
+        assert completion.choices[0].message.content == "appsec"
+
+    mock_openai_client.chat.completions.create.assert_awaited_once()
+
+
+async def test_llm_client_caches_hedged_answers_under_the_model_that_answered(cache):
+    async def create(**request):
+        if request["model"] == "gpt-4-32k":
+            await asyncio.sleep(1)
+        return make_completion(request["model"])
+
+    mock_openai_client = MagicMock()
+    mock_openai_client.chat.completions.create = AsyncMock(side_effect=create)
+    hedger = Hedger(
+        HedgingConfig(default=HedgePolicy(fallback_model="gpt-4o-mini", hedge_after_seconds=0.01))
+    )
+    llm_client = LLMClient(mock_openai_client, cache=cache, hedger=hedger)
+
+    completion = await llm_client.create_chat_completion(call_site="classify", **make_request())
+    assert completion.choices[0].message.content == "gpt-4o-mini"
+
+    # The fallback model's answer is not served as the primary model's.
+    assert cache.get("classify", make_request()) is None
+    assert cache.get("classify", {**make_request(), "model": "gpt-4o-mini"}) is not None
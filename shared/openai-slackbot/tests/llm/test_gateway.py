@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from openai_slackbot.llm.gateway import (
+    GatewayConfig,
+    LLMGateway,
+    ModelLimits,
+    Priority,
+    estimate_tokens,
+)
+
+
+@pytest.fixture
+def gateway():
+    return LLMGateway(
+        GatewayConfig(
+            models={
+                "small": ModelLimits(max_concurrency=1),
+                "budgeted": ModelLimits(max_concurrency=10, tokens_per_minute=100),
+            }
+        )
+    )
+
+
+async def test_concurrency_limit(gateway):
+    order = []
+    release = asyncio.Event()
+
+    async def work(name):
+        async with gateway.slot(model="small", priority=Priority.interactive, estimated_tokens=1):
+            order.append(name)
+            await release.wait()
+
+    tasks = [asyncio.create_task(work(i)) for i in range(3)]
+    await asyncio.sleep(0)
+
+    assert order == [0]
+    assert gateway.queue_depth("small") == 2
+    assert gateway.stats()["small"]["in_flight"] == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == [0, 1, 2]
+    assert gateway.queue_depth() == 0
+
+
+async def test_interactive_before_background(gateway):
+    order = []
+    release = asyncio.Event()
+
+    async def work(name, priority):
+        async with gateway.slot(model="small", priority=priority, estimated_tokens=1):
+            order.append(name)
+            await release.wait()
+
+    tasks = [asyncio.create_task(work("first", Priority.background))]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(work("background", Priority.background)))
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(work("interactive", Priority.interactive)))
+    await asyncio.sleep(0)
+
+    assert gateway.queue_depth("small", Priority.background) == 1
+    assert gateway.queue_depth("small", Priority.interactive) == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["first", "interactive", "background"]
+
+    wait_stats = gateway.stats()["small"]["wait"]
+    assert wait_stats["interactive"]["count"] == 1
+    assert wait_stats["background"]["count"] == 2
+    assert wait_stats["background"]["max_seconds"] > 0
+
+
+async def test_token_budget(gateway):
+    async with gateway.slot(
+        model="budgeted", priority=Priority.interactive, estimated_tokens=80
+    ) as slot:
+        slot.record_usage(90)
+
+    waiter = asyncio.create_task(
+        gateway.slot(
+            model="budgeted", priority=Priority.interactive, estimated_tokens=20
+        ).__aenter__()
+    )
+    await asyncio.sleep(0)
+
+    # 90 tokens used in the current window, so another 20 doesn't fit.
+    assert not waiter.done()
+    assert gateway.queue_depth("budgeted") == 1
+    assert gateway.stats()["budgeted"]["tokens_in_window"] == 90
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert gateway.queue_depth("budgeted") == 0
+
+
+def test_estimate_tokens():
+    request = {"messages": [{"role": "user", "content": "a" * 400}], "max_tokens": 10}
+    assert 100 < estimate_tokens(request) < 130
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from openai_slackbot.llm.hedging import Hedger, HedgePolicy, HedgingConfig
+
+
+def make_call(latencies, calls, errors=()):
+    async def call(model):
+        calls.append(model)
+        await asyncio.sleep(latencies[model])
+        if model in errors:
+            raise ValueError(f"{model} failed")
+        return model
+
+    return call
+
+
+@pytest.fixture
+def hedger():
+    return Hedger(
+        HedgingConfig(
+            call_sites={
+                "classify": HedgePolicy(
+                    deadline_seconds=0.5, fallback_model="fast", hedge_after_seconds=0.05
+                )
+            }
+        )
+    )
+
+
+async def test_primary_wins_without_hedge(hedger):
+    calls = []
+    result = await hedger.run(
+        call_site="classify",
+        policy=hedger.policy_for("classify"),
+        primary_model="primary",
+        call=make_call({"primary": 0.01, "fast": 0.01}, calls),
+    )
+
+    assert result == "primary"
+    assert calls == ["primary"]
+    assert hedger.stats()["classify"]["hedges_fired"] == 0
+    assert hedger.stats()["classify"]["primary_wins"] == 1
+
+
+async def test_hedge_wins_when_primary_is_slow(hedger):
+    calls = []
+    result = await hedger.run(
+        call_site="classify",
+        policy=hedger.policy_for("classify"),
+        primary_model="primary",
+        call=make_call({"primary": 1, "fast": 0.01}, calls),
+    )
+
+    assert result == "fast"
+    assert calls == ["primary", "fast"]
+    stats = hedger.stats()["classify"]
+    assert stats["hedges_fired"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+async def test_hedge_fires_when_primary_fails(hedger):
+    calls = []
+    result = await hedger.run(
+        call_site="classify",
+        policy=hedger.policy_for("classify"),
+        primary_model="primary",
+        call=make_call({"primary": 0, "fast": 0.01}, calls, errors={"primary"}),
+    )
+
+    assert result == "fast"
+    assert hedger.stats()["classify"]["hedge_wins"] == 1
+
+
+async def test_deadline_exceeded(hedger):
+    calls = []
+    with pytest.raises(asyncio.TimeoutError):
+        await hedger.run(
+            call_site="classify",
+            policy=hedger.policy_for("classify"),
+            primary_model="primary",
+            call=make_call({"primary": 1, "fast": 1}, calls),
+        )
+
+    assert hedger.stats()["classify"]["timeouts"] == 1
+
+
+def test_hedge_delay_uses_observed_percentile(hedger):
+    policy = HedgePolicy(fallback_model="fast", hedge_after_seconds=5, min_samples=10)
+    assert hedger.hedge_delay("summary", policy) == 5
+
+    hedger._stats["summary"].latencies.extend(i / 10 for i in range(1, 21))
+    assert hedger.hedge_delay("summary", policy) == 2.0
+
+
+def test_policy_for_unconfigured_call_site(hedger):
+    assert hedger.policy_for("greeting") is None
@@ -0,0 +1,29 @@
+import typing as t
+
+from openai_slackbot.llm.routing import ModelRoute, with_default_routes
+from pydantic import BaseModel
+from pydantic.functional_validators import AfterValidator
+
+DEFAULT_ROUTES = {
+    "classify": ModelRoute(model="gpt-4-32k", temperature=0),
+    "summary": ModelRoute(model="gpt-4-32k"),
+}
+
+
+class MockConfig(BaseModel):
+    model_routes: t.Annotated[
+        t.Dict[str, ModelRoute], AfterValidator(with_default_routes(DEFAULT_ROUTES))
+    ] = DEFAULT_ROUTES
+
+
+def test_completion_kwargs():
+    route = ModelRoute(model="gpt-4o-mini", max_tokens=50, temperature=0)
+    assert route.completion_kwargs() == {"model": "gpt-4o-mini", "max_tokens": 50, "temperature": 0}
+    assert ModelRoute(model="gpt-4-32k").completion_kwargs() == {"model": "gpt-4-32k"}
+
+
+def test_configured_routes_override_defaults():
+    config = MockConfig(model_routes={"classify": {"model": "gpt-4o-mini", "max_tokens": 50}})
+    assert config.model_routes["classify"] == ModelRoute(model="gpt-4o-mini", max_tokens=50)
+    assert config.model_routes["summary"] == DEFAULT_ROUTES["summary"]
+    assert MockConfig().model_routes == DEFAULT_ROUTES
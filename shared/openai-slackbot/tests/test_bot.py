@@ -1,3 +1,5 @@
+from unittest.mock import AsyncMock
+
 import pytest
 
 
@@ -5,14 +7,77 @@ async def test_start_bot(
     mock_slack_app, mock_socket_mode_handler, mock_message_handler, mock_action_handler
 ):
     from openai_slackbot.bot import start_bot
+    from openai_slackbot.clients.slack import get_slack_client
 
     await start_bot(
         openai_organization_id="org-id",
-        slack_message_handler=mock_message_handler.__class__,
+        slack_message_handlers=[mock_message_handler.__class__],
         slack_action_handlers=[mock_action_handler.__class__],
         slack_template_path="/path/to/templates",
     )
 
+    mock_slack_app.client.auth_test.assert_awaited_once()
+    # Code outside the handlers can share the client the handlers use.
+    assert get_slack_client()._client is mock_slack_app.client
+    mock_slack_app.use.assert_called_once_with(get_slack_client().observe_message_events)
     mock_slack_app.event.assert_called_once_with("message")
     mock_slack_app.action.assert_called_once_with("mock_action")
     mock_socket_mode_handler.start_async.assert_called_once()
+
+
+async def test_start_bot_http_mode(
+    monkeypatch, mock_slack_app, mock_socket_mode_handler, mock_message_handler
+):
+    from openai_slackbot import bot
+    from openai_slackbot.clients.slack import get_slack_client
+    from openai_slackbot.server import EventsConfig, EventsMode
+
+    monkeypatch.setenv("SLACK_SIGNING_SECRET", "signing-secret")
+    start_http_app = AsyncMock()
+    monkeypatch.setattr(bot, "start_http_app", start_http_app)
+    events_config = EventsConfig(mode=EventsMode.http, workers=2)
+
+    await bot.start_bot(
+        openai_organization_id="org-id",
+        slack_message_handlers=[mock_message_handler.__class__],
+        slack_action_handlers=[],
+        slack_template_path="/path/to/templates",
+        events_config=events_config,
+    )
+
+    assert bot.AsyncApp.call_args.kwargs["signing_secret"] == "signing-secret"
+    # Workers don't see each other's messages, so they don't cache threads.
+    threads = get_slack_client().threads
+    threads.set("C1", "1.0", [{"type": "message", "ts": "1.0"}])
+    assert threads.get("C1", "1.0") is None
+    start_http_app.assert_awaited_once_with(mock_slack_app, events_config)
+    mock_socket_mode_handler.start_async.assert_not_called()
+
+
+def test_run_bot_gives_workers_their_own_outbox_and_journal(monkeypatch):
+    from openai_slackbot import bot
+    from openai_slackbot.clients.outbox import OutboxConfig
+    from openai_slackbot.server import EventsConfig, EventsMode
+    from openai_slackbot.shutdown import ShutdownConfig
+
+    start_bot = AsyncMock()
+    monkeypatch.setattr(bot, "start_bot", start_bot)
+    monkeypatch.setattr(
+        bot, "run_workers", lambda run, workers: [run(worker) for worker in range(workers)]
+    )
+
+    bot.run_bot(
+        events_config=EventsConfig(mode=EventsMode.http, workers=2),
+        outbox_config=OutboxConfig(path="outbox.sqlite3"),
+        shutdown_config=ShutdownConfig(journal_path="journal.sqlite3"),
+    )
+
+    calls = [call.kwargs for call in start_bot.await_args_list]
+    assert [kwargs["outbox_config"].path for kwargs in calls] == [
+        "outbox.sqlite3.0",
+        "outbox.sqlite3.1",
+    ]
+    assert [kwargs["shutdown_config"].journal_path for kwargs in calls] == [
+        "journal.sqlite3.0",
+        "journal.sqlite3.1",
+    ]
@@ -1,6 +1,9 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from openai_slackbot.handlers import ExecutorConfig, KeyedExecutor, MessageRouter, OverflowPolicy
+from openai_slackbot.utils.filters import MessageFilter
 
 
 @pytest.mark.parametrize("subtype, should_handle", [("message", True), ("bot_message", False)])
@@ -42,3 +45,114 @@ async def test_action_handler(mock_action_handler):
         "action_type": "type",
         "action": "action",
     }
+
+
+async def test_handler_uses_executor(mock_message_handler):
+    executor = KeyedExecutor()
+    mock_message_handler.use_executor(executor)
+    args = MagicMock(
+        ack=AsyncMock(),
+        event={"type": "message", "subtype": "message", "channel": "channel", "ts": "ts"},
+    )
+
+    await mock_message_handler.maybe_handle(args)
+    args.ack.assert_awaited_once()
+    await executor.join()
+    mock_message_handler.mock_handler.assert_awaited_once_with(args)
+    assert mock_message_handler.ordering_key(args) == ("channel", "channel")
+
+
+def make_routed_handler(message_filter):
+    return MagicMock(
+        message_filter=MagicMock(return_value=message_filter), maybe_handle=AsyncMock()
+    )
+
+
+async def test_message_router():
+    channel_handler = make_routed_handler(MessageFilter(channels={"C1", "C2"}))
+    dm_handler = make_routed_handler(MessageFilter(channel_types={"im"}, exclude_bot_messages=True))
+    catch_all_handler = make_routed_handler(None)
+    router = MessageRouter()
+    for handler in (channel_handler, dm_handler, catch_all_handler):
+        router.add(handler)
+
+    assert router.route({"channel": "C1", "channel_type": "channel"}) == [
+        channel_handler,
+        catch_all_handler,
+    ]
+    assert router.route({"channel": "D1", "channel_type": "im"}) == [dm_handler, catch_all_handler]
+    assert router.route({"channel": "D1", "channel_type": "im", "bot_id": "B1"}) == [
+        catch_all_handler
+    ]
+    assert router.route({"channel": "C3", "channel_type": "channel"}) == [catch_all_handler]
+    # Filters are only built once, when the handlers are added.
+    channel_handler.message_filter.assert_called_once()
+
+    args = MagicMock(event={"channel": "C2", "channel_type": "channel"})
+    await router.dispatch(args)
+    channel_handler.maybe_handle.assert_awaited_once_with(args)
+    catch_all_handler.maybe_handle.assert_awaited_once_with(args)
+    dm_handler.maybe_handle.assert_not_awaited()
+
+
+async def test_executor_orders_work_per_key():
+    executor = KeyedExecutor(ExecutorConfig(max_workers=4))
+    events = []
+
+    def work(key, i, delay):
+        async def run():
+            await asyncio.sleep(delay)
+            events.append((key, i))
+
+        return run
+
+    executor.submit("a", "handler", work("a", 1, 0.03))
+    executor.submit("a", "handler", work("a", 2, 0))
+    executor.submit("b", "handler", work("b", 1, 0.01))
+    await executor.join()
+
+    # Work for "b" overtakes slow work for "a", but "a" keeps its order.
+    assert events == [("b", 1), ("a", 1), ("a", 2)]
+    assert executor.stats() == {"pending": 0, "active_keys": 0, "rejected": 0}
+
+
+async def test_executor_caps_handler_concurrency():
+    executor = KeyedExecutor()
+    executor.set_handler_concurrency("handler", 2)
+    running = []
+    max_running = 0
+
+    async def work():
+        nonlocal max_running
+        running.append(1)
+        max_running = max(max_running, len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    for i in range(6):
+        executor.submit(i, "handler", work)
+    await executor.join()
+    assert max_running == 2
+
+
+@pytest.mark.parametrize(
+    "overflow_policy, expected",
+    [(OverflowPolicy.reject, [0, 1]), (OverflowPolicy.drop_oldest, [0, 2])],
+)
+async def test_executor_overflow_policy(overflow_policy, expected):
+    executor = KeyedExecutor(ExecutorConfig(max_queue_size=1, overflow_policy=overflow_policy))
+    handled = []
+
+    def work(i):
+        async def run():
+            await asyncio.sleep(0.01)
+            handled.append(i)
+
+        return run
+
+    for i in range(3):
+        executor.submit("key", "handler", work(i))
+    await executor.join()
+
+    assert handled == expected
+    assert executor.stats()["rejected"] == 1
@@ -0,0 +1,150 @@
+import asyncio
+import sqlite3
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from openai_slackbot.jobs import JobQueue, JobQueueConfig, JobRunner
+from openai_slackbot.metrics import JOBS
+
+
+def make_queue(tmp_path, **kwargs) -> JobQueue:
+    return JobQueue(JobQueueConfig(path=str(tmp_path / "jobs.sqlite3"), **kwargs))
+
+
+def test_failed_jobs_are_retried_then_dead_lettered(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2, backoff_base_seconds=0.02)
+    queue.enqueue("Handler", {"event_id": "Ev1"})
+
+    job = queue.lease()
+    assert (job.handler, job.body, job.attempts) == ("Handler", {"event_id": "Ev1"}, 1)
+    assert queue.fail(job, "error 1")
+    # The job is not available again until its backoff is over.
+    assert queue.lease() is None
+    assert queue.stats() == {"available": 0, "waiting": 1, "dead": 0}
+
+    time.sleep(0.02)
+    job = queue.lease()
+    assert job.attempts == 2
+    assert not queue.fail(job, "error 2")
+    assert queue.lease() is None
+    assert queue.stats() == {"available": 0, "waiting": 0, "dead": 1}
+    [dead_letter] = queue.dead_letters()
+    assert (dead_letter.body, dead_letter.last_error) == ({"event_id": "Ev1"}, "error 2")
+
+    assert queue.retry_dead_letters() == 1
+    assert queue.lease().attempts == 1
+
+
+def test_backoff_grows_with_jitter(tmp_path):
+    queue = make_queue(tmp_path, backoff_base_seconds=2, backoff_max_seconds=10)
+    for attempts, delay in [(1, 2), (2, 4), (3, 8), (4, 10), (10, 10)]:
+        backoffs = [queue.backoff(attempts) for _ in range(100)]
+        assert all(delay / 2 <= backoff <= delay for backoff in backoffs)
+        assert len(set(backoffs)) > 1
+
+
+def test_jobs_with_the_same_key_run_in_order(tmp_path):
+    queue = make_queue(tmp_path)
+    for event_id, key in [("Ev1", ("channel", "C1")), ("Ev2", ("channel", "C1")), ("Ev3", None)]:
+        queue.enqueue("Handler", {"event_id": event_id}, key)
+
+    first = queue.lease()
+    assert first.body["event_id"] == "Ev1"
+    # Ev2 waits for Ev1, but Ev3 has no key.
+    assert queue.lease().body["event_id"] == "Ev3"
+    assert queue.lease() is None
+
+    queue.complete(first)
+    assert queue.lease().body["event_id"] == "Ev2"
+
+
+def test_jobs_are_run_again_when_their_lease_expires(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout_seconds=0)
+    queue.enqueue("Handler", {"event_id": "Ev1"})
+
+    expired = queue.lease()
+    job = queue.lease()
+    assert (job.id, job.attempts) == (expired.id, 2)
+    # A worker that lost its lease can't complete the job.
+    queue.complete(expired)
+    assert queue.stats()["available"] == 1
+    queue.complete(job)
+    assert queue.stats() == {"available": 0, "waiting": 0, "dead": 0}
+
+
+def test_lag(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.lag() == 0
+    queue.enqueue("Handler", {})
+    time.sleep(0.05)
+    assert queue.lag() >= 0.05
+
+
+def test_throughput(tmp_path):
+    queue = make_queue(tmp_path)
+    jobs = 500
+
+    start = time.monotonic()
+    for i in range(jobs):
+        queue.enqueue("Handler", {"event_id": f"Ev{i}"}, ("channel", f"C{i % 10}"))
+    for _ in range(jobs):
+        queue.complete(queue.lease())
+    elapsed = time.monotonic() - start
+
+    # Enqueuing, leasing and completing are three operations per job.
+    assert 3 * jobs / elapsed > 300
+    assert queue.stats() == {"available": 0, "waiting": 0, "dead": 0}
+
+
+async def test_job_runner_retries_failed_events(tmp_path, mock_message_handler):
+    queue = make_queue(tmp_path, backoff_base_seconds=0.01, poll_interval_seconds=0.01)
+    runner = JobRunner(queue, JobQueueConfig(workers=2, poll_interval_seconds=0.01))
+    runner.register(mock_message_handler)
+    mock_message_handler.mock_handler.side_effect = [Exception("transient"), None]
+    retried = JOBS.value(handler="MockMessageHandler", outcome="retried")
+
+    runner.start()
+    event = {"type": "message", "subtype": None, "channel": "C1", "ts": "1.0"}
+    await mock_message_handler.maybe_handle(
+        MagicMock(ack=AsyncMock(), body={"event_id": "Ev1", "event": event}, event=event)
+    )
+    for _ in range(200):
+        if mock_message_handler.mock_handler.await_count == 2 and not sum(queue.stats().values()):
+            break
+        await asyncio.sleep(0.01)
+
+    assert await runner.stop(timeout=1)
+    assert mock_message_handler.mock_handler.await_count == 2
+    assert mock_message_handler.mock_handler.await_args.args[0].event == event
+    assert JOBS.value(handler="MockMessageHandler", outcome="retried") == retried + 1
+    assert queue.stats() == {"available": 0, "waiting": 0, "dead": 0}
+
+
+async def test_job_runner_doesnt_block_while_the_database_is_locked(tmp_path, mock_message_handler):
+    queue = make_queue(tmp_path, busy_timeout_seconds=0.2)
+    runner = JobRunner(queue, JobQueueConfig(workers=2, poll_interval_seconds=0.01))
+    runner.register(mock_message_handler)
+
+    # Another process holds the write lock.
+    other = sqlite3.connect(str(tmp_path / "jobs.sqlite3"), isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    runner.start()
+    start = time.monotonic()
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+    assert time.monotonic() - start < 0.15
+    other.execute("COMMIT")
+    other.close()
+
+    event = {"type": "message", "subtype": None, "channel": "C1", "ts": "1.0"}
+    await mock_message_handler.maybe_handle(
+        MagicMock(ack=AsyncMock(), body={"event_id": "Ev1", "event": event}, event=event)
+    )
+    for _ in range(200):
+        if mock_message_handler.mock_handler.await_count == 1:
+            break
+        await asyncio.sleep(0.01)
+
+    assert await runner.stop(timeout=1)
+    assert mock_message_handler.mock_handler.await_count == 1
+    runner.close()
@@ -0,0 +1,127 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import aiohttp
+from openai.types.chat import ChatCompletion
+from openai_slackbot import metrics
+from openai_slackbot.clients.llm import LLMClient
+from openai_slackbot.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsConfig,
+    Registry,
+    start_metrics_server,
+    stop_metrics_server,
+)
+from slack_sdk.errors import SlackApiError
+
+
+def test_registry_exposition():
+    registry = Registry()
+    counter = registry.register(Counter("requests_total", "Requests.", ["method"]))
+    histogram = registry.register(
+        Histogram("latency_seconds", "Latency.", ["method"], buckets=(0.1, 1))
+    )
+    gauge = registry.register(Gauge("queue_depth", "Queue depth.", ["queue"]))
+
+    counter.inc(method='say "hi"')
+    histogram.observe(0.05, method="a")
+    histogram.observe(0.5, method="a")
+    histogram.observe(5, method="a")
+    gauge.set_function(lambda: 3, queue="q")
+
+    assert registry.expose() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{method="say \\"hi\\""} 1.0\n'
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{method="a",le="0.1"} 1\n'
+        'latency_seconds_bucket{method="a",le="1"} 2\n'
+        'latency_seconds_bucket{method="a",le="+Inf"} 3\n'
+        'latency_seconds_sum{method="a"} 5.55\n'
+        'latency_seconds_count{method="a"} 3\n'
+        "# HELP queue_depth Queue depth.\n"
+        "# TYPE queue_depth gauge\n"
+        'queue_depth{queue="q"} 3.0\n'
+    )
+
+
+async def test_handler_metrics(mock_message_handler):
+    def make_args(subtype):
+        event = {"type": "message", "subtype": subtype, "channel": "C1", "ts": "1.0"}
+        return MagicMock(ack=AsyncMock(), body={"event": event}, event=event)
+
+    handled = metrics.HANDLER_EVENTS.value(handler="MockMessageHandler", handled="true")
+    skipped = metrics.HANDLER_EVENTS.value(handler="MockMessageHandler", handled="false")
+    observed = metrics.HANDLER_DURATION.count(handler="MockMessageHandler")
+
+    await mock_message_handler.maybe_handle(make_args(None))
+    await mock_message_handler.maybe_handle(make_args("bot_message"))
+
+    assert metrics.HANDLER_EVENTS.value(handler="MockMessageHandler", handled="true") == handled + 1
+    assert (
+        metrics.HANDLER_EVENTS.value(handler="MockMessageHandler", handled="false") == skipped + 1
+    )
+    assert metrics.HANDLER_DURATION.count(handler="MockMessageHandler") == observed + 1
+
+
+async def test_slack_call_metrics(mock_slack_client, mock_slack_asyncwebclient):
+    rate_limited = SlackApiError(
+        "ratelimited", MagicMock(status_code=429, headers={"Retry-After": "0"})
+    )
+    mock_slack_asyncwebclient.chat_getPermalink = AsyncMock(
+        side_effect=[rate_limited, {"ok": True, "permalink": "https://slack.com/1"}]
+    )
+    ok = metrics.SLACK_REQUESTS.value(method="chat.getPermalink", status="ok")
+    limited = metrics.SLACK_REQUESTS.value(method="chat.getPermalink", status="ratelimited")
+
+    await mock_slack_client.get_message_link(channel="C1", message_ts="1.0")
+
+    assert metrics.SLACK_REQUESTS.value(method="chat.getPermalink", status="ok") == ok + 1
+    assert (
+        metrics.SLACK_REQUESTS.value(method="chat.getPermalink", status="ratelimited")
+        == limited + 1
+    )
+
+
+async def test_llm_call_metrics():
+    completion = ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-123",
+            "object": "chat.completion",
+            "created": 1700000000,
+            "model": "gpt-4-32k",
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "appsec"},
+                }
+            ],
+        }
+    )
+    mock_openai_client = MagicMock()
+    mock_openai_client.chat.completions.create = AsyncMock(return_value=completion)
+    llm_client = LLMClient(mock_openai_client)
+    prompt_tokens = metrics.LLM_TOKENS.value(call_site="metrics_test", kind="prompt")
+
+    await llm_client.create_chat_completion(
+        call_site="metrics_test", model="gpt-4-32k", messages=[]
+    )
+
+    assert metrics.LLM_REQUESTS.value(call_site="metrics_test", status="ok") >= 1
+    assert metrics.LLM_REQUEST_DURATION.count(call_site="metrics_test") >= 1
+    assert metrics.LLM_TOKENS.value(call_site="metrics_test", kind="prompt") == prompt_tokens + 10
+
+
+async def test_metrics_server(unused_tcp_port):
+    await start_metrics_server(MetricsConfig(enabled=True, port=unused_tcp_port))
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{unused_tcp_port}/metrics") as response:
+                assert response.status == 200
+                assert "# TYPE slackbot_handler_events_total counter" in await response.text()
+    finally:
+        await stop_metrics_server()
@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import signal
+import socket
+import time
+
+import aiohttp
+from openai_slackbot.benchmark.fake_slack import FakeSlackServer
+from openai_slackbot.bot import start_app
+from openai_slackbot.metrics import SOCKET_MODE_ENVELOPES, SOCKET_MODE_RECONNECT_GAP
+from openai_slackbot.server import EventsConfig, EventsMode, run_workers, start_http_app
+from slack_bolt.app.async_app import AsyncApp
+from slack_sdk.web.async_client import AsyncWebClient
+
+SIGNING_SECRET = "signing-secret"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _signature_headers(body, secret=SIGNING_SECRET):
+    timestamp = str(int(time.time()))
+    digest = hmac.new(
+        secret.encode(), f"v0:{timestamp}:{body}".encode(), hashlib.sha256
+    ).hexdigest()
+    return {
+        "Content-Type": "application/json",
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": f"v0={digest}",
+    }
+
+
+async def test_start_http_app():
+    app = AsyncApp(signing_secret=SIGNING_SECRET)
+    config = EventsConfig(mode=EventsMode.http, host="127.0.0.1", port=_free_port())
+    server = asyncio.create_task(start_http_app(app, config))
+    url = f"http://127.0.0.1:{config.port}{config.path}"
+    body = json.dumps({"type": "url_verification", "challenge": "challenge-value"})
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            for _ in range(100):
+                try:
+                    response = await session.post(url, data=body, headers=_signature_headers(body))
+                    break
+                except aiohttp.ClientConnectionError:
+                    await asyncio.sleep(0.01)
+            assert response.status == 200
+            assert await response.json() == {"challenge": "challenge-value"}
+
+            response = await session.post(
+                url, data=body, headers=_signature_headers(body, secret="wrong-secret")
+            )
+            assert response.status == 401
+    finally:
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+
+
+async def test_start_app_opens_several_connections():
+    slack = FakeSlackServer()
+    await slack.start()
+    app = AsyncApp(client=AsyncWebClient(token="xoxb-test", base_url=slack.api_url))
+    received = []
+
+    @app.event("message")
+    async def on_message(event):
+        received.append(event["text"])
+
+    envelopes = [SOCKET_MODE_ENVELOPES.value(connection=c, type="events_api") for c in "01"]
+    reconnects = SOCKET_MODE_RECONNECT_GAP.count(connection="0")
+    bot = asyncio.create_task(
+        start_app(app, EventsConfig(connections=2, connection_stagger_seconds=0.01))
+    )
+    try:
+        await slack.wait_connected(connections=2, timeout=5)
+        for connection in (0, 1):
+            await slack.send_event(
+                {"type": "message", "channel": "C1", "text": str(connection)}, connection
+            )
+
+        # Events keep arriving while connection 0 is refreshed.
+        await slack.refresh(connection=0)
+        await slack.send_event({"type": "message", "channel": "C1", "text": "refresh"})
+        for _ in range(500):
+            if SOCKET_MODE_RECONNECT_GAP.count(connection="0") > reconnects:
+                break
+            await asyncio.sleep(0.01)
+
+        assert SOCKET_MODE_RECONNECT_GAP.count(connection="0") == reconnects + 1
+        assert sorted(received) == ["0", "1", "refresh"]
+        received_per_connection = [
+            SOCKET_MODE_ENVELOPES.value(connection=c, type="events_api") - envelopes[i]
+            for i, c in enumerate("01")
+        ]
+        assert min(received_per_connection) >= 1
+        assert sum(received_per_connection) == 3
+    finally:
+        bot.cancel()
+        await asyncio.gather(bot, return_exceptions=True)
+        await slack.stop()
+
+
+def test_run_workers(tmp_path):
+    def target(worker):
+        (tmp_path / f"{worker}-{os.getpid()}").touch()
+        try:
+            # The first worker to start crashes once, and is restarted.
+            os.close(os.open(tmp_path / "crashed", os.O_CREAT | os.O_EXCL))
+            raise Exception("crash")
+        except FileExistsError:
+            pass
+
+        # Two workers plus the restarted one, and the crash marker.
+        if len(list(tmp_path.iterdir())) == 4:
+            os.kill(os.getppid(), signal.SIGTERM)
+        time.sleep(30)
+
+    started = time.monotonic()
+    run_workers(target, workers=2, restart_delay_seconds=0.01)
+
+    assert time.monotonic() - started < 10
+    workers = sorted(path.name.split("-")[0] for path in tmp_path.iterdir() if "-" in path.name)
+    assert len(workers) == 3
+    assert set(workers) == {"0", "1"}
+    assert signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
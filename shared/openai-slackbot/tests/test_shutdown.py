@@ -0,0 +1,94 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from openai_slackbot.handlers import ExecutorConfig, KeyedExecutor, OverflowPolicy
+from openai_slackbot.shutdown import GracefulShutdown, ShutdownConfig
+
+
+def make_args(ts: str) -> MagicMock:
+    event = {"type": "message", "subtype": None, "channel": "C1", "ts": ts}
+    return MagicMock(ack=AsyncMock(), body={"event_id": f"Ev{ts}", "event": event}, event=event)
+
+
+async def handle_slowly(args):
+    await asyncio.sleep(0.05)
+
+
+async def handle_forever(args):
+    await asyncio.Event().wait()
+
+
+async def test_drain_waits_for_events_being_handled(mock_message_handler):
+    handler = mock_message_handler
+    handler.use_executor(KeyedExecutor())
+    handler.mock_handler.side_effect = handle_slowly
+    graceful_shutdown = GracefulShutdown(ShutdownConfig(drain_timeout_seconds=5))
+    graceful_shutdown.register(handler)
+
+    await handler.maybe_handle(make_args("1.0"))
+    await handler.maybe_handle(make_args("2.0"))
+
+    assert await graceful_shutdown.drain()
+    assert handler.mock_handler.await_count == 2
+
+
+async def test_drain_does_not_wait_for_dropped_events(tmp_path, mock_message_handler):
+    config = ShutdownConfig(drain_timeout_seconds=5, journal_path=str(tmp_path / "journal.sqlite3"))
+    handler = mock_message_handler
+    handler.use_executor(
+        KeyedExecutor(ExecutorConfig(max_queue_size=1, overflow_policy=OverflowPolicy.drop_oldest))
+    )
+    handler.mock_handler.side_effect = handle_slowly
+    graceful_shutdown = GracefulShutdown(config)
+    graceful_shutdown.register(handler)
+
+    # The first event is handled and the last one queued, the rest are dropped.
+    for i in range(5):
+        await handler.maybe_handle(make_args(f"{i}.0"))
+
+    start = asyncio.get_running_loop().time()
+    assert await graceful_shutdown.drain()
+    assert asyncio.get_running_loop().time() - start < 1
+    assert [call.args[0].event["ts"] for call in handler.mock_handler.await_args_list] == [
+        "0.0",
+        "4.0",
+    ]
+    graceful_shutdown.close()
+    # Dropped events are not journaled.
+    assert GracefulShutdown(config).replay() == 0
+
+
+async def test_unfinished_events_are_replayed_after_restart(
+    tmp_path, mock_slack_client, mock_message_handler
+):
+    config = ShutdownConfig(
+        drain_timeout_seconds=0.05, journal_path=str(tmp_path / "journal.sqlite3")
+    )
+    handler = mock_message_handler
+    handler.use_executor(KeyedExecutor())
+    handler.mock_handler.side_effect = handle_forever
+    graceful_shutdown = GracefulShutdown(config)
+    graceful_shutdown.register(handler)
+
+    # The second event is queued behind the first, which never finishes.
+    args = [make_args("1.0"), make_args("2.0")]
+    for arg in args:
+        await handler.maybe_handle(arg)
+    assert not await graceful_shutdown.drain()
+    await asyncio.sleep(0)
+    assert handler.mock_handler.await_count == 1
+    graceful_shutdown.close()
+
+    restarted_handler = mock_message_handler.__class__(mock_slack_client)
+    restarted_handler.use_executor(executor := KeyedExecutor())
+    graceful_shutdown = GracefulShutdown(config)
+    graceful_shutdown.register(restarted_handler)
+    assert graceful_shutdown.replay() == 2
+    await asyncio.sleep(0)
+    await executor.join()
+
+    replayed = [call.args[0] for call in restarted_handler.mock_handler.await_args_list]
+    assert [args.body for args in replayed] == [arg.body for arg in args]
+    assert replayed[0].event == args[0].event
+    # The journal is emptied once replayed.
+    assert GracefulShutdown(config).replay() == 0
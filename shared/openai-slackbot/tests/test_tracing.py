@@ -0,0 +1,102 @@
+import json
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from openai_slackbot import tracing
+from openai_slackbot.tracing import TracingConfig, init_tracing
+from openai_slackbot.utils.dedup import EventDeduplicator
+
+
+@pytest.fixture
+def trace_dir(tmp_path):
+    init_tracing(TracingConfig(enabled=True, output_dir=str(tmp_path)))
+    yield tmp_path
+    init_tracing()
+
+
+def make_args(subtype=None):
+    event = {"type": "message", "subtype": subtype, "channel": "C1", "ts": "1.0"}
+    return MagicMock(ack=AsyncMock(), body={"event": event}, event=event)
+
+
+def read_traces(trace_dir):
+    return [json.loads(path.read_text()) for path in sorted(trace_dir.glob("*.json"))]
+
+
+async def test_handled_event_is_traced(
+    trace_dir, mock_message_handler, mock_slack_client, mock_slack_asyncwebclient
+):
+    mock_slack_asyncwebclient.chat_getPermalink = AsyncMock(
+        return_value={"ok": True, "permalink": "https://slack.com/1"}
+    )
+    trace_ids = []
+
+    async def handle(args):
+        trace_ids.append(tracing.current_trace_id())
+        with tracing.span("stage", step=1):
+            await mock_slack_client.get_message_link(channel="C1", message_ts="1.0")
+
+    mock_message_handler.mock_handler.side_effect = handle
+    await mock_message_handler.maybe_handle(make_args())
+
+    (trace,) = read_traces(trace_dir)
+    assert trace["otherData"]["trace_id"] == trace_ids[0]
+    events = {event["name"]: event for event in trace["traceEvents"]}
+    assert list(events) == [
+        "MockMessageHandler",
+        "should_handle",
+        "handle",
+        "stage",
+        "SlackClient.get_message_link",
+        "chat.getPermalink",
+    ]
+    assert events["stage"]["args"]["step"] == 1
+    assert events["chat.getPermalink"]["args"]["parent_id"] == (
+        events["SlackClient.get_message_link"]["args"]["span_id"]
+    )
+    assert tracing.current_trace_id() is None
+
+
+async def test_skipped_event_is_not_written(trace_dir, mock_message_handler):
+    await mock_message_handler.maybe_handle(make_args("bot_message"))
+    assert read_traces(trace_dir) == []
+
+
+async def test_queued_and_duplicate_events_dont_leave_traces_open(trace_dir, mock_message_handler):
+    mock_message_handler.use_deduplicator(EventDeduplicator())
+    mock_message_handler.use_job_runner(AsyncMock())
+    args = make_args()
+    args.body["event_id"] = "Ev1"
+
+    await mock_message_handler.maybe_handle(args)
+    # A duplicate delivery is dropped before a trace is started.
+    await mock_message_handler.maybe_handle(args)
+
+    (trace,) = read_traces(trace_dir)
+    (event,) = trace["traceEvents"]
+    assert event["name"] == "MockMessageHandler"
+    assert event["args"]["queued"] is True
+
+
+async def test_trace_id_is_added_to_log_records(trace_dir, mock_message_handler, caplog):
+    async def handle(args):
+        logging.getLogger("test").warning("handling")
+
+    mock_message_handler.mock_handler.side_effect = handle
+    with caplog.at_level(logging.WARNING, logger="test"):
+        await mock_message_handler.maybe_handle(make_args())
+
+    (trace,) = read_traces(trace_dir)
+    (record,) = [record for record in caplog.records if record.name == "test"]
+    assert record.trace_id == trace["otherData"]["trace_id"]
+
+
+async def test_spans_are_noops_when_disabled(tmp_path, mock_message_handler):
+    init_tracing(TracingConfig(enabled=False, output_dir=str(tmp_path)))
+    assert tracing.start_trace("handler") is None
+    with tracing.span("stage") as span:
+        assert span is None
+
+    await mock_message_handler.maybe_handle(make_args())
+    assert not tmp_path.exists() or read_traces(tmp_path) == []
@@ -0,0 +1,93 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from openai_slackbot.utils.dedup import DedupConfig, EventDeduplicator
+
+
+def make_args(event_id: str, event: dict) -> MagicMock:
+    return MagicMock(ack=AsyncMock(), body={"event_id": event_id, "event": event}, event=event)
+
+
+async def test_redelivered_events_are_dropped(mock_message_handler):
+    deduplicator = EventDeduplicator()
+    mock_message_handler.use_deduplicator(deduplicator)
+    event = {
+        "type": "message",
+        "subtype": None,
+        "channel": "C1",
+        "ts": "1.0",
+        "client_msg_id": "msg-1",
+    }
+
+    await mock_message_handler.maybe_handle(make_args("Ev1", event))
+    await mock_message_handler.maybe_handle(make_args("Ev1", event))
+    # An edit of the same message arrives as a new event carrying the original message.
+    await mock_message_handler.maybe_handle(
+        make_args(
+            "Ev2",
+            {"type": "message", "subtype": "message_changed", "channel": "C1", "message": event},
+        )
+    )
+
+    mock_message_handler.mock_handler.assert_awaited_once()
+    assert deduplicator.stats()["MockMessageHandler"] == {"checked": 3, "duplicates": 2}
+
+
+def test_keys_expire():
+    deduplicator = EventDeduplicator(DedupConfig(window_seconds=10))
+    with patch("openai_slackbot.utils.dedup.time.time", return_value=1000):
+        assert not deduplicator.is_duplicate("handler", ["event:Ev1"])
+    with patch("openai_slackbot.utils.dedup.time.time", return_value=1005):
+        assert deduplicator.is_duplicate("handler", ["event:Ev1"])
+        # Other handlers see the event independently.
+        assert not deduplicator.is_duplicate("other_handler", ["event:Ev1"])
+    with patch("openai_slackbot.utils.dedup.time.time", return_value=1016):
+        assert not deduplicator.is_duplicate("handler", ["event:Ev1"])
+
+
+def test_seen_events_persist(tmp_path):
+    config = DedupConfig(path=str(tmp_path / "seen_events.sqlite3"))
+    deduplicator = EventDeduplicator(config)
+    assert not deduplicator.is_duplicate("handler", ["event:Ev1"])
+    deduplicator.close()
+
+    assert EventDeduplicator(config).is_duplicate("handler", ["event:Ev1"])
+
+
+def test_shared_database_lets_one_process_claim_an_event(tmp_path):
+    config = DedupConfig(path=str(tmp_path / "seen_events.sqlite3"))
+    EventDeduplicator(config).close()
+    workers, events = 8, 50
+    barrier = threading.Barrier(workers)
+
+    def claimed_events(_):
+        deduplicator = EventDeduplicator(config)
+        claimed = []
+        for i in range(events):
+            # Each worker receives the event with its keys in a different order.
+            keys = random.sample([f"event:Ev{i}", f"client_msg:{i}", f"message:C1:{i}"], 3)
+            barrier.wait()
+            if not deduplicator.is_duplicate("handler", keys):
+                claimed.append(i)
+        deduplicator.close()
+        return claimed
+
+    with ThreadPoolExecutor(workers) as pool:
+        claimed = [
+            i for worker_claimed in pool.map(claimed_events, range(workers)) for i in worker_claimed
+        ]
+    assert sorted(claimed) == list(range(events))
+
+
+def test_expired_events_in_database_are_claimed_again(tmp_path):
+    deduplicator = EventDeduplicator(
+        DedupConfig(window_seconds=10, path=str(tmp_path / "seen_events.sqlite3"))
+    )
+    with patch("openai_slackbot.utils.dedup.time.time", return_value=1000):
+        assert not deduplicator.is_duplicate("handler", ["event:Ev1"])
+    # The key expired but is only swept from the database once a minute.
+    with patch("openai_slackbot.utils.dedup.time.time", return_value=1011):
+        assert not deduplicator.is_duplicate("handler", ["event:Ev1"])
+        assert deduplicator.is_duplicate("handler", ["event:Ev1"])
@@ -0,0 +1,104 @@
+import json
+import logging
+
+import pytest
+from openai_slackbot.bot import register_app_handlers
+from openai_slackbot.utils.filters import MessageFilter
+from slack_bolt.app.async_app import AsyncApp
+from slack_bolt.authorization import AuthorizeResult
+from slack_bolt.request.async_request import AsyncBoltRequest
+from slack_sdk.web.async_client import AsyncWebClient
+
+
+@pytest.mark.parametrize(
+    "event, matches",
+    [
+        ({"channel": "C1", "channel_type": "channel", "ts": "1.0"}, True),
+        ({"channel": "C1", "channel_type": "channel", "subtype": "file_share"}, True),
+        # Another channel
+        ({"channel": "C2", "channel_type": "channel"}, False),
+        # Another channel type
+        ({"channel": "C1", "channel_type": "group"}, False),
+        # Subtype that is not allowed
+        ({"channel": "C1", "channel_type": "channel", "subtype": "message_changed"}, False),
+        # Bot messages
+        ({"channel": "C1", "channel_type": "channel", "bot_id": "B1"}, False),
+        ({"channel": "C1", "channel_type": "channel", "subtype": "bot_message"}, False),
+        # Thread replies, unless they are also sent to the channel
+        ({"channel": "C1", "channel_type": "channel", "ts": "2.0", "thread_ts": "1.0"}, False),
+        (
+            {
+                "channel": "C1",
+                "channel_type": "channel",
+                "subtype": "thread_broadcast",
+                "ts": "2.0",
+                "thread_ts": "1.0",
+            },
+            True,
+        ),
+    ],
+)
+def test_message_filter(event, matches):
+    message_filter = MessageFilter(
+        channels={"C1"},
+        channel_types={"channel"},
+        subtypes={None, "file_share", "thread_broadcast"},
+        exclude_bot_messages=True,
+        exclude_thread_replies=True,
+    )
+    assert message_filter.matches(event) == matches
+
+
+def test_empty_message_filter_matches_everything():
+    assert MessageFilter().matches({"channel": "C1", "subtype": "bot_message", "thread_ts": "1.0"})
+
+
+async def test_filtered_events_are_dropped_before_the_handler(mock_message_handler, caplog):
+    async def authorize():
+        return AuthorizeResult(enterprise_id=None, team_id="T1", bot_token="xoxb-test")
+
+    app = AsyncApp(
+        client=AsyncWebClient(token="xoxb-test"),
+        authorize=authorize,
+        request_verification_enabled=False,
+        process_before_response=True,
+    )
+    handler_class = mock_message_handler.__class__
+    filtered_handler_class = type(
+        handler_class.__name__,
+        (handler_class,),
+        {"message_filter": lambda self: MessageFilter(channels={"C1"})},
+    )
+    handlers = []
+
+    def make_handler(slack_client):
+        handlers.append(filtered_handler_class(slack_client))
+        return handlers[-1]
+
+    await register_app_handlers(
+        app=app,
+        message_handlers=[make_handler],
+        action_handlers=[],
+        slack_client=mock_message_handler._slack_client,
+    )
+
+    caplog.set_level(logging.INFO)
+    for channel in ("C1", "C2"):
+        body = {
+            "type": "event_callback",
+            "team_id": "T1",
+            "event_id": f"Ev{channel}",
+            "event": {"type": "message", "subtype": None, "channel": channel, "ts": "1.0"},
+        }
+        response = await app.async_dispatch(
+            AsyncBoltRequest(body=json.dumps(body), mode="socket_mode")
+        )
+        assert response.status == 200
+
+    handlers[0].mock_handler.assert_awaited_once()
+    assert handlers[0].mock_handler.await_args.args[0].event["channel"] == "C1"
+    # The dropped event is neither logged by the handler nor as unhandled by Bolt.
+    assert [r.getMessage() for r in caplog.records if "MockMessageHandler" in r.getMessage()] == [
+        "Handler: MockMessageHandler, should handle: True"
+    ]
+    assert not [r for r in caplog.records if "Unhandled request" in r.getMessage()]
@@ -0,0 +1,15 @@
+from openai_slackbot.utils.journal import EventJournal
+
+
+def test_journal_persists_events(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    journal = EventJournal(path)
+    journal.append([("Handler", {"event_id": "Ev1"}), ("OtherHandler", {"event_id": "Ev2"})])
+    journal.close()
+
+    journal = EventJournal(path)
+    assert journal.pop_all() == [
+        ("Handler", {"event_id": "Ev1"}),
+        ("OtherHandler", {"event_id": "Ev2"}),
+    ]
+    assert journal.pop_all() == []
@@ -0,0 +1,143 @@
+import pytest
+from openai_slackbot.utils.slack import extract_text_from_event, iter_event_text
+
+
+def rich_text(*elements):
+    return {"type": "rich_text", "elements": list(elements)}
+
+
+def section(*elements):
+    return {"type": "rich_text_section", "elements": list(elements)}
+
+
+def text(value):
+    return {"type": "text", "text": value}
+
+
+@pytest.mark.parametrize(
+    "mrkdwn, expected",
+    [
+        ("Hi <@U1>, see <#C1|general>", "Hi @U1, see #general"),
+        ("<@U1|alice> and <!subteam^S1|@security> <!here>", "@alice and @security @here"),
+        ("Read <https://example.com/doc|the doc>", "Read the doc (https://example.com/doc)"),
+        (
+            "<https://example.com> <https://example.com|example.com> <mailto:a@example.com|a@example.com>",
+            "https://example.com https://example.com a@example.com",
+        ),
+        ("1 &lt; 2 &amp;&amp; 3 &gt; 2", "1 < 2 && 3 > 2"),
+    ],
+)
+def test_extract_text_from_plain_text(mrkdwn, expected):
+    assert extract_text_from_event({"text": mrkdwn}) == expected
+
+
+def test_extract_text_from_rich_text_blocks():
+    event = {
+        # The text is a fallback rendering of the blocks, so it's not repeated.
+        "text": "fallback",
+        "blocks": [
+            rich_text(
+                section(
+                    text("Hello "),
+                    {"type": "user", "user_id": "U1"},
+                    text(", please check "),
+                    {"type": "link", "url": "https://example.com", "text": "this"},
+                    text(" in "),
+                    {"type": "channel", "channel_id": "C1"},
+                ),
+                {
+                    "type": "rich_text_list",
+                    "style": "ordered",
+                    "elements": [section(text("first")), section(text("second"))],
+                },
+                {
+                    "type": "rich_text_list",
+                    "style": "bullet",
+                    "indent": 1,
+                    "elements": [section(text("nested"))],
+                },
+                {"type": "rich_text_quote", "elements": [text("quoted")]},
+                {"type": "rich_text_preformatted", "elements": [text("print(1)")]},
+            ),
+            {"type": "header", "text": {"type": "plain_text", "text": "Header"}},
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": "Owner: <@U2>"},
+                "fields": [{"type": "mrkdwn", "text": "*Priority*"}],
+            },
+            {"type": "context", "elements": [{"type": "mrkdwn", "text": "a"}, {"type": "image"}]},
+            {"type": "divider"},
+        ],
+    }
+
+    assert extract_text_from_event(event) == (
+        "Hello @U1, please check this (https://example.com) in #C1\n"
+        "1. first\n"
+        "2. second\n"
+        "  - nested\n"
+        "> quoted\n"
+        "print(1)\n"
+        "Header\n"
+        "Owner: @U2\n"
+        "*Priority*\n"
+        "a"
+    )
+
+
+def test_extract_text_from_attachments_and_files():
+    event = {
+        "text": "Forwarding this",
+        "attachments": [
+            {
+                "message_blocks": [
+                    {"message": {"blocks": [rich_text(section(text("shared message")))]}}
+                ],
+                # The text and fallback of a share repeat the shared message.
+                "text": "shared message",
+                "fallback": "[shared message]",
+                "author_name": "bob",
+            },
+            {
+                "pretext": "Alert",
+                "title": "Disk full",
+                "text": "on <https://host.example.com|host>",
+                "fields": [{"title": "Severity", "value": "high"}],
+            },
+        ],
+        "files": [{"title": "notes.txt", "preview": "file content"}],
+    }
+
+    assert extract_text_from_event(event) == (
+        "Forwarding this\n"
+        "bob\n"
+        "shared message\n"
+        "Alert\n"
+        "Disk full\n"
+        "on host (https://host.example.com)\n"
+        "Severity: high\n"
+        "notes.txt\n"
+        "file content"
+    )
+
+
+def test_extract_text_budget():
+    event = {"blocks": [rich_text(section(text("a" * 10)), section(text("b" * 10)))]}
+
+    assert extract_text_from_event(event, max_chars=15) == "a" * 10 + "\n" + "b" * 4
+    # Tokens are estimated at 4 characters each.
+    assert extract_text_from_event(event, max_tokens=2) == "a" * 8
+    assert extract_text_from_event(event, max_chars=100, max_tokens=2) == "a" * 8
+
+
+def test_iter_event_text_is_lazy_and_handles_deep_nesting():
+    # Shared messages nested deeper than the recursion limit.
+    event = {"text": "innermost"}
+    for i in range(5000):
+        event = {
+            "blocks": [rich_text(section(text(f"{i} ")))],
+            "attachments": [{"message_blocks": [{"message": event}]}],
+        }
+
+    segments = iter_event_text(event)
+    assert next(segments) == "4999 "
+    assert extract_text_from_event(event).endswith("innermost")